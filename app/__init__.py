@@ -3,4 +3,8 @@ Digital Legacy Management System
 A secure platform for managing digital assets and legacy using blockchain technology.
 """
 
-__version__ = "1.0.0" 
\ No newline at end of file
+__version__ = "1.0.0"
+
+# Heavy dependencies that importing app.main must not load; they are imported on first use.
+# Checked by tests/test_startup.py and benchmarks/bench_startup.py.
+DEFERRED_MODULES = ("web3", "eth_abi", "aiohttp", "passlib", "jose", "cryptography")
@@ -1,111 +1,150 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import Response, StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy import func
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.db.session import get_db
+from app.core.security import CurrentUser, ensure_same_user, get_current_user
+from app.core.config import settings
+from app.core.http_cache import is_not_modified, validator_headers
+from app.core.metrics import ASSET_BYTES
 from app.services.encryption import encryption_service
+from app.services.ingest import PROCESSING, READY, asset_summary, encrypt_and_store, ingest_queue
+from app.services.key_manager import key_manager
+from app.services.realtime import ASSET_CREATED, realtime
+from app.services.storage import fsync_path, object_store
+from app.services.upload_stream import StreamedUpload
 from app.blockchain.web3_client import web3_client
+from app.blockchain.anchoring import ASSET, anchor_batcher
+from app.blockchain.merkle import verify_proof
 from app.db import models
 from datetime import datetime
+import asyncio
 import os
 import logging
 import mimetypes
-import shutil
+import time
 from io import BytesIO
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/upload")
+STATUS_POLL_SECONDS = 0.5
+
+# The upload body is parsed by hand, so describe the form for the API docs
+UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {
+                "file": {"type": "string", "format": "binary"},
+                "title": {"type": "string"},
+                "description": {"type": "string"},
+                "user_id": {"type": "string"}
+            }
+        }}}
+    }
+}
+
+def wants_async(request: Request) -> bool:
+    """Clients opt in to 202 Accepted with `Prefer: respond-async` (RFC 7240)."""
+    return settings.INGEST_ASYNC_DEFAULT or "respond-async" in request.headers.get("prefer", "").lower()
+
+def storage_used(db: Session, user_id: int) -> int:
+    return db.query(func.coalesce(func.sum(models.DigitalAsset.file_size), 0)).filter(
+        models.DigitalAsset.owner_id == user_id
+    ).scalar()
+
+def upload_limit(db: Session, user_id: int) -> int:
+    """Bytes this user may upload now: the per-file limit, capped by what is left of their quota."""
+    limit = settings.MAX_UPLOAD_SIZE
+    if settings.USER_STORAGE_QUOTA_BYTES > 0:
+        remaining = settings.USER_STORAGE_QUOTA_BYTES - storage_used(db, user_id)
+        if remaining <= 0:
+            raise HTTPException(status_code=413, detail="Storage quota exceeded")
+        limit = min(limit, remaining)
+    return limit
+
+def commit_within_quota(db: Session, asset: models.DigitalAsset) -> None:
+    """Insert the asset and commit, unless that takes its owner over quota.
+
+    upload_limit() only bounds the stream; concurrent uploads could each
+    fit the remaining quota yet exceed it together. So the sum is checked
+    again after the insert, in the same transaction: the owner's row lock
+    serialises their uploads on Postgres/MySQL, and SQLite holds its write
+    lock from the insert on.
+    """
+    quota = settings.USER_STORAGE_QUOTA_BYTES
+    if quota > 0:
+        db.query(models.User.id).filter(models.User.id == asset.owner_id).with_for_update().first()
+    db.add(asset)
+    db.flush()
+    if quota > 0 and storage_used(db, asset.owner_id) > quota:
+        db.rollback()
+        raise HTTPException(status_code=413, detail="Storage quota exceeded")
+    db.commit()
+
+@router.post("/upload", openapi_extra=UPLOAD_FORM)
 async def upload_asset(
-    file: UploadFile = File(...),
-    title: str = Form(None),
-    description: str = Form(None),
-    user_id: str = Form(...),
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Upload and encrypt a digital asset."""
+    """Upload and encrypt a digital asset.
+
+    The body is streamed to disk rather than spooled first, so size and
+    quota limits (413) and the sniffed file type (415) are enforced while
+    it arrives. With `Prefer: respond-async` the answer is 202 as soon as
+    the upload is safely on disk, and GET /{asset_id}/status reports when
+    it has been encrypted and stored.
+    """
+    upload = None
+    # Progress goes to the uploader's realtime sessions; X-Upload-ID lets the client match it up
+    report = realtime.progress(current_user.id, upload_id=request.headers.get("x-upload-id"))
+    content_length = request.headers.get("content-length")
+    total = int(content_length) if content_length and content_length.isdigit() else None
     try:
-        logger.info(f"Received upload request for user {user_id}")
-        
-        if not user_id:
-            raise HTTPException(status_code=400, detail="User ID is required")
+        upload = await StreamedUpload(
+            object_store.root,
+            upload_limit(db, current_user.id),
+            on_progress=lambda done: report("receiving", done, total)
+        ).receive(request)
+        title = upload.fields.get("title")
+        description = upload.fields.get("description")
         
         # Convert user_id to integer
-        try:
-            user_id = int(user_id)
-        except ValueError:
-            logger.error(f"Invalid user_id format: {user_id}")
-            raise HTTPException(status_code=400, detail="Invalid user ID format")
+        user_id = upload.fields.get("user_id")
+        if user_id:
+            try:
+                user_id = int(user_id)
+            except ValueError:
+                logger.error(f"Invalid user_id format: {user_id}")
+                raise HTTPException(status_code=400, detail="Invalid user ID format")
         
-        # Verify user exists
-        user = db.query(models.User).filter(models.User.id == user_id).first()
-        if not user:
-            logger.error(f"User not found with ID: {user_id}")
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Create uploads directory if it doesn't exist
-        upload_dir = "uploads"
-        os.makedirs(upload_dir, exist_ok=True)
+        # The token identifies the uploader; a user_id field is only accepted if it matches
+        user_id = ensure_same_user(current_user, user_id or None)
+        logger.debug(f"Received upload request for user {user_id}")
         
         # Get original filename and ensure it has an extension
-        original_filename = file.filename
+        original_filename = upload.filename or "upload"
         if not os.path.splitext(original_filename)[1]:
-            # If no extension, try to determine it from content type
-            ext = mimetypes.guess_extension(file.content_type)
+            # If no extension, use the sniffed content type
+            ext = mimetypes.guess_extension(upload.content_type)
             if ext:
                 original_filename = f"{original_filename}{ext}"
         
-        # Generate a unique filename while preserving extension
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        name, ext = os.path.splitext(original_filename)
-        safe_filename = f"{timestamp}_{name}{ext}"
-        file_path = os.path.join(upload_dir, safe_filename)
-        
-        # Save the uploaded file
-        try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-        except Exception as e:
-            logger.error(f"Error saving uploaded file: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to save uploaded file")
-        finally:
-            file.file.close()
-        
-        # Encrypt the file
-        try:
-            encrypted_path, encryption_key = encryption_service.encrypt_file(file_path)
-        except Exception as e:
-            logger.error(f"Error encrypting file: {str(e)}")
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            raise HTTPException(status_code=500, detail="Failed to encrypt file")
-        
-        # Get file metadata
-        file_size = os.path.getsize(file_path)
-        content_type = file.content_type or mimetypes.guess_type(original_filename)[0] or 'application/octet-stream'
-        
-        # Create blockchain hash
-        try:
-            with open(file_path, 'rb') as f:
-                content = f.read()
-            content_hash = web3_client.hash_content(str(content))
-            blockchain_hash = await web3_client.anchor_hash(content_hash, str(user_id))
-        except Exception as e:
-            logger.error(f"Error creating blockchain hash: {str(e)}")
-            blockchain_hash = None
-        
-        # Create database record
+        # Get file metadata; the sniffed type wins over what the client declared
+        file_size = upload.size
+        content_type = upload.content_type
         asset = models.DigitalAsset(
             owner_id=user_id,
             title=title or original_filename,
             description=description,
-            file_path=encrypted_path,
             asset_type=content_type,
-            blockchain_hash=blockchain_hash,
-            encryption_key=encryption_key.decode(),
+            file_size=file_size,
             asset_metadata={
                 "original_name": original_filename,
                 "content_type": content_type,
@@ -115,75 +154,145 @@ async def upload_asset(
             }
         )
         
+        if wants_async(request):
+            # Acknowledge once the plaintext and its row are durable; the ingest queue does the rest
+            fsync_path(upload.path)
+            asset.file_path = upload.path
+            asset.ingest_status = PROCESSING
+            commit_within_quota(db, asset)
+            db.refresh(asset)
+            upload.path = None
+            ingest_queue.enqueue(asset.id)
+            ASSET_BYTES.inc(file_size, direction="upload")
+            logger.info(f"Accepted asset {asset.id} for user {user_id}, processing in the background")
+            status_url = f"{request.url.path.rsplit('/', 1)[0]}/{asset.id}/status"
+            return JSONResponse(
+                {**asset_summary(asset), "status": PROCESSING, "status_url": status_url},
+                status_code=202,
+                headers={"Location": status_url}
+            )
+        
         try:
-            db.add(asset)
-            db.commit()
+            stored = await run_in_threadpool(
+                encrypt_and_store, upload.path, lambda done: report("encrypting", done, upload.size)
+            )
+        except Exception as e:
+            logger.error(f"Error encrypting file: {str(e)}")
+            raise HTTPException(status_code=500, detail="Failed to encrypt file")
+        for column, value in stored.items():
+            setattr(asset, column, value)
+        
+        try:
+            commit_within_quota(db, asset)
             db.refresh(asset)
         except Exception as e:
+            if os.path.exists(stored["file_path"]):
+                os.remove(stored["file_path"])
+            if isinstance(e, HTTPException):
+                raise
             logger.error(f"Error saving to database: {str(e)}")
-            if os.path.exists(encrypted_path):
-                os.remove(encrypted_path)
             raise HTTPException(status_code=500, detail="Failed to save asset to database")
         
-        # Clean up the original file
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        if asset.blockchain_hash:
+            anchor_batcher.submit(ASSET, asset.id, asset.blockchain_hash)
         
+        ASSET_BYTES.inc(file_size, direction="upload")
         logger.info(f"Successfully uploaded asset {asset.id} for user {user_id}")
-        return {
-            "asset_id": asset.id,
-            "title": asset.title,
-            "file_size": file_size,
-            "content_type": content_type,
-            "original_filename": original_filename
-        }
+        result = asset_summary(asset)
+        realtime.publish(user_id, ASSET_CREATED, result)
+        return result
         
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Unexpected error during upload: {str(e)}")
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
+    finally:
+        if upload is not None:
+            upload.discard()
 
 @router.get("/list")
 async def list_assets(
     user_id: int = None,
+    verify_anchors: bool = False,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """List all assets owned by the user."""
-    if not user_id:
-        raise HTTPException(status_code=400, detail="User ID is required")
+    """List all assets owned by the user, optionally checking their anchors on-chain."""
+    user_id = ensure_same_user(current_user, user_id)
         
     assets = db.query(models.DigitalAsset).filter(
         models.DigitalAsset.owner_id == user_id
     ).all()
     
-    return [
+    results = [
         {
             "id": asset.id,
             "title": asset.title,
             "description": asset.description,
             "asset_type": asset.asset_type,
+            "status": asset.ingest_status or READY,
             "created_at": asset.created_at.isoformat() if asset.created_at else None
         }
         for asset in assets
     ]
+    
+    if verify_anchors:
+        batch_ids = {asset.anchor_batch_id for asset in assets if asset.anchor_batch_id is not None}
+        roots = dict(db.query(models.AnchorBatch.id, models.AnchorBatch.merkle_root).filter(
+            models.AnchorBatch.id.in_(batch_ids)
+        ).all()) if batch_ids else {}
+        # One lookup per batch root, all sent together as a single batched request
+        anchored = await web3_client.verify_hashes(list(roots.values()))
+        for asset, result in zip(assets, results):
+            root = roots.get(asset.anchor_batch_id)
+            result["anchor_status"] = "pending" if root is None else ("anchored" if anchored[root] else "unverified")
+    
+    return results
+
+@router.get("/{asset_id}/status")
+async def asset_status(
+    asset_id: int,
+    wait: int = 0,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Processing state of an upload; with `wait`, long-poll up to that many seconds for it to finish."""
+    deadline = time.monotonic() + min(max(wait, 0), settings.INGEST_STATUS_MAX_WAIT_SECONDS)
+    while True:
+        row = db.query(models.DigitalAsset.ingest_status).filter(
+            models.DigitalAsset.id == asset_id,
+            models.DigitalAsset.owner_id == current_user.id
+        ).first()
+        if row is None:
+            raise HTTPException(status_code=404, detail="Asset not found")
+        if row.ingest_status != PROCESSING or time.monotonic() >= deadline:
+            break
+        # End the transaction so the next read sees the worker's commit
+        db.commit()
+        await asyncio.sleep(STATUS_POLL_SECONDS)
+    return {"asset_id": asset_id, "status": row.ingest_status or READY}
+
+def asset_validators(asset: models.DigitalAsset):
+    """ETag and Last-Modified for an asset; stored content never changes after upload."""
+    digest = asset.ciphertext_digest or asset.blockchain_hash
+    return (f'"{digest}"' if digest else None), asset.created_at
+
+def asset_cache_control() -> str:
+    max_age = settings.ASSET_CACHE_MAX_AGE_SECONDS
+    return f"private, max-age={max_age}, immutable" if max_age > 0 else "private, no-cache"
 
 @router.get("/{asset_id}/download")
 async def download_asset(
     asset_id: int,
+    request: Request,
     user_id: int = None,
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Download a digital asset."""
     try:
-        logger.info(f"Processing download request for asset {asset_id} and user_id {user_id}")
-        
-        if not user_id:
-            logger.error("user_id parameter is required")
-            raise HTTPException(
-                status_code=400, 
-                detail="user_id parameter is required. Please add ?user_id=YOUR_USER_ID to the URL"
-            )
+        user_id = ensure_same_user(current_user, user_id)
         
         # Get the asset
         asset = db.query(models.DigitalAsset).filter(
@@ -192,29 +301,35 @@ async def download_asset(
         ).first()
         
         if not asset:
-            logger.error(f"Asset not found: asset_id={asset_id}, user_id={user_id}")
+            logger.warning(f"Asset not found: asset_id={asset_id}, user_id={user_id}")
             raise HTTPException(
                 status_code=404, 
                 detail=f"Asset not found or not owned by user. Please verify asset_id={asset_id} and user_id={user_id}"
             )
         
-        logger.info(f"Found asset: {asset.id}, file_path: {asset.file_path}")
+        if asset.ingest_status:
+            raise HTTPException(status_code=409, detail=f"Asset is {asset.ingest_status}, not yet available")
+        
+        # Answer revalidations before touching the file or unwrapping its key
+        etag, last_modified = asset_validators(asset)
+        cache_headers = validator_headers(etag, last_modified, asset_cache_control())
+        if is_not_modified(request.headers, etag, last_modified):
+            return Response(status_code=304, headers=cache_headers)
         
         # Verify file exists
         if not os.path.exists(asset.file_path):
-            logger.error(f"Asset file not found at path: {asset.file_path}")
+            logger.error(f"Stored file missing for asset {asset.id}")
             raise HTTPException(
                 status_code=404, 
-                detail=f"Asset file not found at path: {asset.file_path}"
+                detail="Asset file not found"
             )
         
         # Decrypt the file
         try:
             decrypted_path = encryption_service.decrypt_file(
                 asset.file_path,
-                asset.encryption_key.encode()
+                key_manager.data_key_for(asset)
             )
-            logger.info(f"Successfully decrypted file to: {decrypted_path}")
         except Exception as e:
             logger.error(f"Error decrypting file: {str(e)}")
             raise HTTPException(status_code=500, detail="Failed to decrypt file")
@@ -229,20 +344,19 @@ async def download_asset(
                 ext = mimetypes.guess_extension(content_type) or ''
                 original_filename += ext
 
-            logger.info(f"Decrypted file path: {decrypted_path}")
-            logger.info(f"Original filename: {original_filename}")
-            logger.info(f"Content type: {content_type}")
-
             # Read the decrypted file
             with open(decrypted_path, 'rb') as f:
                 file_content = f.read()
+            ASSET_BYTES.inc(len(file_content), direction="download")
+            logger.info(f"Asset {asset.id} downloaded ({len(file_content)} bytes)")
 
             # Send file using StreamingResponse
             return StreamingResponse(
                 BytesIO(file_content),
                 media_type=content_type,
                 headers={
-                    "Content-Disposition": f'attachment; filename="{original_filename}"'
+                    "Content-Disposition": f'attachment; filename="{original_filename}"',
+                    **cache_headers
                 }
             )
 
@@ -260,3 +374,32 @@ async def download_asset(
     except Exception as e:
         logger.error(f"Unexpected error during download: {str(e)}")
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
+
+@router.get("/{asset_id}/proof")
+async def get_asset_proof(
+    asset_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Return the asset's Merkle inclusion proof and check it locally."""
+    asset = db.query(models.DigitalAsset).filter(
+        models.DigitalAsset.id == asset_id,
+        models.DigitalAsset.owner_id == current_user.id
+    ).first()
+    if not asset:
+        raise HTTPException(status_code=404, detail="Asset not found or not owned by user")
+    
+    if asset.anchor_batch_id is None:
+        return {"asset_id": asset.id, "content_hash": asset.blockchain_hash, "status": "pending"}
+    
+    batch = db.query(models.AnchorBatch).filter(models.AnchorBatch.id == asset.anchor_batch_id).first()
+    return {
+        "asset_id": asset.id,
+        "content_hash": asset.blockchain_hash,
+        "status": "anchored",
+        "merkle_root": batch.merkle_root,
+        "transaction_hash": batch.transaction_hash,
+        "leaf_index": asset.merkle_leaf_index,
+        "proof": asset.merkle_proof,
+        "verified": verify_proof(asset.blockchain_hash, asset.merkle_proof or [], batch.merkle_root)
+    }
@@ -1,29 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.db import models
+from app.core.security import ACCESS_TOKEN_COOKIE, bearer_scheme, create_user_token, get_current_user, set_auth_cookie
+from app.core.rate_limit import (
+    LOGIN_PER_EMAIL, LOGIN_PER_IP, OTP_PER_EMAIL, OTP_PER_IP,
+    WALLET_PER_ADDRESS, WALLET_PER_IP, rate_limiter
+)
 from app.services.email_service import email_service
+from app.services.inactivity import inactivity_service
+from app.services.password_hasher import password_hasher, PasswordHasherBusy
+from app.blockchain.signatures import wallet_challenges
 from pydantic import BaseModel, EmailStr
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
-import jwt
+from datetime import datetime
 from typing import Optional
 import logging
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# JWT settings
-SECRET_KEY = "your-secret-key-here"  # Change this to a secure secret key
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class EmailSignupRequest(BaseModel):
     email: EmailStr
+    password: str
     username: Optional[str] = None
     full_name: Optional[str] = None
     phone_number: Optional[str] = None
@@ -61,27 +59,32 @@ class OTPVerify(BaseModel):
 class WalletConnectRequest(BaseModel):
     wallet_address: str
     signature: str
+    nonce: str
     email: Optional[EmailStr] = None
+    username: Optional[str] = None
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def server_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server busy, please retry",
+        headers={"Retry-After": "1"}
+    )
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def verify_password(plain_password: str, hashed_password: Optional[str]):
+    try:
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+    except PasswordHasherBusy:
+        raise server_busy()
 
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+async def get_password_hash(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise server_busy()
 
 router = APIRouter()
 
-@router.post("/email-signup")
+@router.post("/email-signup", dependencies=[Depends(rate_limiter.per_ip(LOGIN_PER_IP))])
 async def email_signup(request: EmailSignupRequest, db: Session = Depends(get_db)):
     """Register a new user with email and password."""
     # Check if email already exists
@@ -89,7 +92,7 @@ async def email_signup(request: EmailSignupRequest, db: Session = Depends(get_db
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    hashed_password = get_password_hash(request.password)
+    hashed_password = await get_password_hash(request.password)
     user = models.User(
         email=request.email,
         password_hash=hashed_password,
@@ -103,24 +106,30 @@ async def email_signup(request: EmailSignupRequest, db: Session = Depends(get_db
     
     return {"message": "User registered successfully", "user_id": user.id}
 
-@router.post("/email-login")
-async def email_login(request: EmailLoginRequest, db: Session = Depends(get_db)):
+@router.post("/email-login", dependencies=[Depends(rate_limiter.per_ip(LOGIN_PER_IP))])
+async def email_login(request: EmailLoginRequest, response: Response, db: Session = Depends(get_db)):
     """Login with email and password."""
+    rate_limiter.check(LOGIN_PER_EMAIL, request.email)
+    
     # Find user by email
     user = db.query(models.User).filter(models.User.email == request.email).first()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     # Verify password
-    if not verify_password(request.password, user.password_hash or ""):
+    valid, new_hash = await verify_password(request.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
+    # Transparently upgrade hashes made with a different bcrypt cost
+    if new_hash:
+        user.password_hash = new_hash
+    inactivity_service.record_checkin(user)
+    db.commit()
+    
     # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email},
-        expires_delta=access_token_expires
-    )
+    access_token = create_user_token(user)
+    set_auth_cookie(response, access_token)
     
     return {
         "access_token": access_token,
@@ -129,9 +138,10 @@ async def email_login(request: EmailLoginRequest, db: Session = Depends(get_db))
         "email": user.email
     }
 
-@router.post("/request-otp")
+@router.post("/request-otp", dependencies=[Depends(rate_limiter.per_ip(OTP_PER_IP))])
 async def request_otp(request: OTPRequest, db: Session = Depends(get_db)):
     """Request OTP for login or signup"""
+    rate_limiter.check(OTP_PER_EMAIL, request.email)
     logger.info(f"Requesting OTP for email: {request.email}")
     
     # Check if user exists
@@ -163,8 +173,8 @@ async def request_otp(request: OTPRequest, db: Session = Depends(get_db)):
             detail="Failed to send OTP"
         )
 
-@router.post("/verify-otp")
-async def verify_otp(request: OTPVerify, db: Session = Depends(get_db)):
+@router.post("/verify-otp", dependencies=[Depends(rate_limiter.per_ip(LOGIN_PER_IP))])
+async def verify_otp(request: OTPVerify, response: Response, db: Session = Depends(get_db)):
     """Verify OTP for login"""
     logger.info(f"Verifying OTP for email: {request.email}")
     
@@ -182,7 +192,7 @@ async def verify_otp(request: OTPVerify, db: Session = Depends(get_db)):
         )
     
     # Update last login time and profile data if provided
-    user.last_login = datetime.utcnow()
+    inactivity_service.record_checkin(user)
     if request.username:
         user.username = request.username
     if request.full_name:
@@ -200,11 +210,8 @@ async def verify_otp(request: OTPVerify, db: Session = Depends(get_db)):
     db.refresh(user)
     
     # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email},
-        expires_delta=access_token_expires
-    )
+    access_token = create_user_token(user)
+    set_auth_cookie(response, access_token)
     
     return {
         "message": "Login successful",
@@ -224,8 +231,8 @@ async def verify_otp(request: OTPVerify, db: Session = Depends(get_db)):
         }
     }
 
-@router.post("/verify-signup-otp")
-async def verify_signup_otp(request: OTPVerify, db: Session = Depends(get_db)):
+@router.post("/verify-signup-otp", dependencies=[Depends(rate_limiter.per_ip(LOGIN_PER_IP))])
+async def verify_signup_otp(request: OTPVerify, response: Response, db: Session = Depends(get_db)):
     """Verify OTP for signup"""
     # Check if user already exists
     user = db.query(models.User).filter(models.User.email == request.email).first()
@@ -257,8 +264,13 @@ async def verify_signup_otp(request: OTPVerify, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(new_user)
     
+    access_token = create_user_token(new_user)
+    set_auth_cookie(response, access_token)
+    
     return {
         "message": "Account created successfully",
+        "access_token": access_token,
+        "token_type": "bearer",
         "user": {
             "id": new_user.id,
             "email": new_user.email,
@@ -272,11 +284,34 @@ async def verify_signup_otp(request: OTPVerify, db: Session = Depends(get_db)):
         }
     }
 
-@router.post("/connect-wallet")
-async def connect_wallet(request: WalletConnectRequest, db: Session = Depends(get_db)):
-    """Connect wallet to existing account or create new account"""
+@router.get("/wallet-challenge", dependencies=[Depends(rate_limiter.per_ip(WALLET_PER_IP))])
+async def wallet_challenge(wallet_address: str):
+    """Issue a one-time message for the wallet to sign"""
+    nonce, message = wallet_challenges.issue(wallet_address)
+    return {
+        "nonce": nonce,
+        "message": message,
+        "expires_in": int(wallet_challenges.ttl.total_seconds())
+    }
+
+@router.post("/connect-wallet", dependencies=[Depends(rate_limiter.per_ip(WALLET_PER_IP))])
+async def connect_wallet(
+    request: WalletConnectRequest,
+    response: Response,
+    http_request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+    db: Session = Depends(get_db)
+):
+    """Connect wallet to existing account, or log in (creating the account if needed) with a signed challenge"""
+    rate_limiter.check(WALLET_PER_ADDRESS, request.wallet_address)
     logger.info(f"Connecting wallet: {request.wallet_address}")
     
+    if not wallet_challenges.verify(request.wallet_address, request.nonce, request.signature):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid signature or expired challenge"
+        )
+    
     # Check if wallet is already connected to another account
     existing_wallet = db.query(models.User).filter(
         models.User.wallet_address == request.wallet_address
@@ -291,25 +326,25 @@ async def connect_wallet(request: WalletConnectRequest, db: Session = Depends(ge
     
     # If email is provided, connect wallet to existing account
     if request.email:
+        # Linking is only for the signed-in owner of that account; the wallet signature proves nothing about the email
+        current_user = await get_current_user(http_request, credentials)
         user = db.query(models.User).filter(models.User.email == request.email).first()
-        if not user:
+        if not user or user.id != current_user.id:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Can only connect a wallet to your own account"
             )
         
         # Update user's wallet address
         user.wallet_address = request.wallet_address
         user.updated_at = datetime.utcnow()
+        inactivity_service.record_checkin(user)
         db.commit()
         db.refresh(user)
         
         # Create access token
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": user.email},
-            expires_delta=access_token_expires
-        )
+        access_token = create_user_token(user)
+        set_auth_cookie(response, access_token)
         
         return {
             "message": "Wallet connected successfully",
@@ -331,12 +366,14 @@ async def connect_wallet(request: WalletConnectRequest, db: Session = Depends(ge
     
     # If no email provided, check if wallet exists
     if existing_wallet:
+        inactivity_service.record_checkin(existing_wallet)
+        if request.username:
+            existing_wallet.username = request.username
+        db.commit()
+        
         # Create access token for existing wallet user
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": existing_wallet.email},
-            expires_delta=access_token_expires
-        )
+        access_token = create_user_token(existing_wallet)
+        set_auth_cookie(response, access_token)
         
         return {
             "message": "Login successful",
@@ -359,19 +396,18 @@ async def connect_wallet(request: WalletConnectRequest, db: Session = Depends(ge
     # If wallet doesn't exist, create new account
     new_user = models.User(
         wallet_address=request.wallet_address,
+        username=request.username,
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow()
     )
+    inactivity_service.record_checkin(new_user)
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
     
     # Create access token for new user
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": new_user.email},
-        expires_delta=access_token_expires
-    )
+    access_token = create_user_token(new_user)
+    set_auth_cookie(response, access_token)
     
     return {
         "message": "Account created successfully",
@@ -389,4 +425,10 @@ async def connect_wallet(request: WalletConnectRequest, db: Session = Depends(ge
             "profile_picture": new_user.profile_picture,
             "wallet_address": new_user.wallet_address
         }
-    } 
\ No newline at end of file
+    }
+
+@router.post("/logout")
+async def logout(response: Response):
+    """Clear the auth cookie"""
+    response.delete_cookie(ACCESS_TOKEN_COOKIE)
+    return {"message": "Logged out"}
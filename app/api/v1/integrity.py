@@ -0,0 +1,50 @@
+import asyncio
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.db.session import get_db
+from app.core.security import require_admin
+from app.db import models
+from app.services.reconcile import reconciler
+from app.services.scrubber import OK, integrity_scrubber
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/report")
+async def integrity_report(limit: int = 100, db: Session = Depends(get_db)):
+    """Summarise scrub progress and list assets that failed their last check"""
+    checkpoint = db.query(models.ScrubCheckpoint).filter(
+        models.ScrubCheckpoint.name == integrity_scrubber.name
+    ).first()
+    failures = db.query(
+        models.DigitalAsset.id,
+        models.DigitalAsset.owner_id,
+        models.DigitalAsset.integrity_status,
+        models.DigitalAsset.integrity_checked_at
+    ).filter(
+        models.DigitalAsset.integrity_status.isnot(None),
+        models.DigitalAsset.integrity_status != OK
+    ).order_by(models.DigitalAsset.id).limit(min(limit, 1000)).all()
+
+    return {
+        "stats": integrity_scrubber.stats(),
+        "checkpoint": {
+            "last_asset_id": checkpoint.last_asset_id,
+            "pass_started_at": checkpoint.pass_started_at,
+            "last_pass_completed_at": checkpoint.last_pass_completed_at
+        } if checkpoint else None,
+        "failures": [
+            {
+                "asset_id": asset_id,
+                "owner_id": owner_id,
+                "status": integrity_status,
+                "checked_at": checked_at
+            }
+            for asset_id, owner_id, integrity_status, checked_at in failures
+        ]
+    }
+
+@router.post("/reconcile")
+async def reconcile_storage(apply: bool = False):
+    """Report (or with apply=true, clean up) stored files without rows and rows without files"""
+    return await asyncio.to_thread(reconciler.run, apply)
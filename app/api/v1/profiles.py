@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from app.core.profiling import profile_store
+from app.core.security import require_admin
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("")
+async def list_profiles():
+    """List stored request profiles, newest first"""
+    return {"profiles": profile_store.list()}
+
+@router.get("/{profile_id}")
+async def download_profile(profile_id: str):
+    """Download one profile as collapsed stacks"""
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"profile-{profile_id}.txt")
@@ -1,7 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import case, func, select
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.db.session import get_db
+from app.core.security import CurrentUser, ensure_same_user, get_current_user
 from app.db import models
+from app.services.ingest import PROCESSING, READY
+from app.services.inactivity import inactivity_service
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
@@ -16,16 +21,10 @@ class ProfileUpdate(BaseModel):
     bio: Optional[str] = None
     profile_picture: Optional[str] = None
 
-@router.get("/{user_id}/profile")
-async def get_profile(user_id: int, db: Session = Depends(get_db)):
-    """Get user profile"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
+class CheckinIntervalUpdate(BaseModel):
+    interval_days: Optional[int] = None  # None resets to the platform default
+
+def profile_response(user: models.User) -> dict:
     return {
         "id": user.id,
         "email": user.email,
@@ -39,9 +38,23 @@ async def get_profile(user_id: int, db: Session = Depends(get_db)):
         "wallet_address": user.wallet_address
     }
 
+@router.get("/{user_id}/profile")
+async def get_profile(user_id: int, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Get user profile"""
+    ensure_same_user(current_user, user_id)
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    return profile_response(user)
+
 @router.put("/{user_id}/profile")
-async def update_profile(user_id: int, profile: ProfileUpdate, db: Session = Depends(get_db)):
+async def update_profile(user_id: int, profile: ProfileUpdate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
     """Update user profile"""
+    ensure_same_user(current_user, user_id)
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -57,15 +70,129 @@ async def update_profile(user_id: int, profile: ProfileUpdate, db: Session = Dep
     db.commit()
     db.refresh(user)
     
+    return profile_response(user)
+
+@router.put("/{user_id}/checkin-interval")
+async def update_checkin_interval(user_id: int, update: CheckinIntervalUpdate, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Set how often the user must check in before inactivity reminders start"""
+    ensure_same_user(current_user, user_id)
+    if update.interval_days is not None and update.interval_days < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Check-in interval must be at least one day"
+        )
+    
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    user.checkin_interval_days = update.interval_days
+    inactivity_service.record_checkin(user)
+    db.commit()
+    db.refresh(user)
+    
     return {
         "id": user.id,
-        "email": user.email,
-        "username": user.username,
-        "full_name": user.full_name,
-        "phone_number": user.phone_number,
-        "date_of_birth": user.date_of_birth,
-        "address": user.address,
-        "bio": user.bio,
-        "profile_picture": user.profile_picture,
-        "wallet_address": user.wallet_address
-    } 
\ No newline at end of file
+        "checkin_interval_days": user.checkin_interval_days or inactivity_service.checkin_interval(user).days,
+        "inactivity_deadline": user.inactivity_deadline
+    }
+
+@router.post("/{user_id}/check-in")
+async def check_in(user_id: int, current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Confirm the user is still active and reset their inactivity deadline"""
+    ensure_same_user(current_user, user_id)
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    inactivity_service.record_checkin(user)
+    db.commit()
+    db.refresh(user)
+    
+    return {
+        "id": user.id,
+        "last_login": user.last_login,
+        "inactivity_deadline": user.inactivity_deadline
+    }
+
+@router.get("/{user_id}/dashboard")
+async def get_dashboard(
+    user_id: int,
+    limit: int = None,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Profile, first page of assets with rule counts, and storage stats in one response.
+
+    Three queries however many assets or rules there are: the user, the
+    page of assets outer-joined to per-asset rule aggregates, and one
+    SELECT of scalar subqueries for the totals.
+    """
+    ensure_same_user(current_user, user_id)
+    limit = min(max(limit or settings.DASHBOARD_PAGE_SIZE, 1), 100)
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    Asset, Rule, Message = models.DigitalAsset, models.AccessRule, models.ScheduledMessage
+    rule_counts = select(
+        Rule.digital_asset_id.label("asset_id"),
+        func.count(Rule.id).label("rules"),
+        func.sum(case((Rule.is_active.is_(True), 1), else_=0)).label("active_rules")
+    ).where(Rule.owner_id == user_id).group_by(Rule.digital_asset_id).subquery()
+    rows = db.query(
+        Asset.id, Asset.title, Asset.asset_type, Asset.file_size, Asset.ingest_status, Asset.created_at,
+        rule_counts.c.rules, rule_counts.c.active_rules
+    ).outerjoin(
+        rule_counts, rule_counts.c.asset_id == Asset.id
+    ).filter(
+        Asset.owner_id == user_id
+    ).order_by(Asset.id.desc()).limit(limit + 1).all()
+    
+    totals = db.execute(select(
+        select(func.count(Asset.id)).where(Asset.owner_id == user_id).scalar_subquery().label("assets"),
+        select(func.coalesce(func.sum(Asset.file_size), 0)).where(Asset.owner_id == user_id).scalar_subquery().label("bytes"),
+        select(func.count(Asset.id)).where(Asset.owner_id == user_id, Asset.ingest_status == PROCESSING).scalar_subquery().label("processing"),
+        select(func.count(Rule.id)).where(Rule.owner_id == user_id).scalar_subquery().label("rules"),
+        select(func.count(Message.id)).where(Message.owner_id == user_id).scalar_subquery().label("messages"),
+        select(func.count(Message.id)).where(
+            Message.owner_id == user_id, Message.is_delivered.isnot(True)
+        ).scalar_subquery().label("messages_pending")
+    )).one()
+    
+    quota = settings.USER_STORAGE_QUOTA_BYTES
+    return {
+        "profile": profile_response(user),
+        "assets": [
+            {
+                "id": row.id,
+                "title": row.title,
+                "asset_type": row.asset_type,
+                "file_size": row.file_size,
+                "status": row.ingest_status or READY,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "access_rules": row.rules or 0,
+                "active_access_rules": row.active_rules or 0
+            }
+            for row in rows[:limit]
+        ],
+        "has_more_assets": len(rows) > limit,
+        "storage": {
+            "assets": totals.assets,
+            "bytes_used": totals.bytes,
+            "quota_bytes": quota or None,
+            "bytes_remaining": max(quota - totals.bytes, 0) if quota else None,
+            "processing": totals.processing
+        },
+        "access_rules": totals.rules,
+        "messages": {"total": totals.messages, "pending": totals.messages_pending}
+    }
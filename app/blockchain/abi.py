@@ -0,0 +1,51 @@
+from typing import List, Sequence, Tuple
+from eth_hash.auto import keccak
+
+# Multicall3 is deployed at the same address on Polygon and most EVM chains
+AGGREGATE3 = "aggregate3((address,bool,bytes)[])"
+AGGREGATE3_RETURNS = ["(bool,bytes)[]"]
+
+def selector(signature: str) -> bytes:
+    """Four-byte function selector, e.g. selector("isAnchored(bytes32)")."""
+    return keccak(signature.encode())[:4]
+
+def _arg_types(signature: str) -> List[str]:
+    inner = signature[signature.index("(") + 1:signature.rindex(")")]
+    # Only the outer argument list is split; tuple types are passed through whole
+    types, depth, start = [], 0, 0
+    for i, char in enumerate(inner):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            types.append(inner[start:i])
+            start = i + 1
+    if inner:
+        types.append(inner[start:])
+    return types
+
+def encode_call(signature: str, args: Sequence) -> str:
+    """Return 0x-prefixed calldata for a contract function call."""
+    from eth_abi import encode  # imported on first use; eth_abi is slow to import
+
+    return "0x" + (selector(signature) + encode(_arg_types(signature), list(args))).hex()
+
+def decode_result(return_types: Sequence[str], data: str):
+    """Decode eth_call return data into a tuple of Python values."""
+    from eth_abi import decode
+
+    raw = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+    return decode(list(return_types), raw)
+
+def encode_aggregate3(calls: Sequence[Tuple[str, str]]) -> str:
+    """Wrap (target, calldata) pairs in one Multicall3 call that tolerates individual reverts."""
+    return encode_call(AGGREGATE3, [[
+        (target, True, bytes.fromhex(data[2:] if data.startswith("0x") else data))
+        for target, data in calls
+    ]])
+
+def decode_aggregate3(data: str) -> List[Tuple[bool, str]]:
+    """Return (success, 0x-return-data) for each call in an aggregate3 result."""
+    (results,) = decode_result(AGGREGATE3_RETURNS, data)
+    return [(success, "0x" + output.hex()) for success, output in results]
@@ -0,0 +1,205 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional, Tuple
+import asyncio
+import logging
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+from app.blockchain.merkle import build_levels, merkle_proof, merkle_root
+from app.blockchain.web3_client import web3_client
+from app.services.leases import Lease
+
+logger = logging.getLogger(__name__)
+
+ASSET = "asset"
+
+MODELS = {
+    ASSET: models.DigitalAsset
+}
+
+@dataclass(frozen=True)
+class PendingAnchor:
+    kind: str  # a key of MODELS
+    item_id: int
+    content_hash: str
+
+AnchorFunc = Callable[[str, str], Awaitable[str]]
+
+# A batch anchored on chain whose rows are not yet updated: (items, tree levels, root, transaction hash)
+AnchoredBatch = Tuple[List[PendingAnchor], list, str, str]
+
+class AnchorBatcher:
+    """Collects content hashes and anchors one Merkle root per batch.
+
+    A batch is flushed when it reaches `max_size` items or when `window`
+    seconds pass, so one transaction covers thousands of uploads. Each row
+    then stores its leaf index and proof, which can be checked locally
+    against the anchored root.
+
+    Each process anchors what it submitted itself. Rows a crashed process
+    never anchored are requeued by whichever process holds the
+    "anchor-recovery" lease, once they are older than
+    ANCHOR_RECOVERY_INTERVAL_SECONDS, so live workers' pending items are
+    not anchored twice.
+    """
+
+    def __init__(self, anchor: Optional[AnchorFunc] = None, session_factory=SessionLocal,
+                 max_size: Optional[int] = None, window: Optional[float] = None):
+        self.anchor = anchor or web3_client.anchor_hash
+        self.session_factory = session_factory
+        self.max_size = max_size or settings.ANCHOR_BATCH_MAX_SIZE
+        self.window = window or settings.ANCHOR_BATCH_WINDOW_SECONDS
+        self.recovery_interval = settings.ANCHOR_RECOVERY_INTERVAL_SECONDS
+        self.recovery_lease = Lease("anchor-recovery", 2 * self.recovery_interval, session_factory)
+        self._pending: List[PendingAnchor] = []
+        self._unrecorded: List[AnchoredBatch] = []
+        self._lock = threading.Lock()
+        self._full: Optional[asyncio.Event] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, kind: str, item_id: int, content_hash: str) -> None:
+        """Queue an item for the next anchor batch."""
+        with self._lock:
+            self._pending.append(PendingAnchor(kind, item_id, content_hash))
+            full = len(self._pending) >= self.max_size
+        if full and self._full is not None:
+            self._full.set()
+
+    def requeue_unanchored(self, older_than: Optional[datetime] = None) -> int:
+        """Queue rows that were saved but never made it into a batch (e.g. after a crash)."""
+        with self._lock:
+            queued = {(item.kind, item.item_id) for item in self._pending}
+            queued.update((item.kind, item.item_id) for batch in self._unrecorded for item in batch[0])
+        count = 0
+        for kind, model in MODELS.items():
+            last_id = 0
+            while True:
+                db = self.session_factory()
+                try:
+                    query = db.query(model.id, model.blockchain_hash).filter(
+                        model.id > last_id,
+                        model.anchor_batch_id.is_(None),
+                        model.blockchain_hash.isnot(None)
+                    )
+                    if older_than is not None:
+                        query = query.filter(model.created_at < older_than)
+                    rows = query.order_by(model.id).limit(self.max_size).all()
+                finally:
+                    db.close()
+                if not rows:
+                    break
+                for item_id, content_hash in rows:
+                    if (kind, item_id) not in queued:
+                        self.submit(kind, item_id, content_hash)
+                        count += 1
+                last_id = rows[-1][0]
+        return count
+
+    def recover(self) -> int:
+        """Requeue abandoned rows if this process holds the recovery lease."""
+        if not self.recovery_lease.acquire():
+            return 0
+        older_than = datetime.utcnow() - timedelta(seconds=self.recovery_interval)
+        count = self.requeue_unanchored(older_than)
+        if count:
+            logger.info(f"Requeued {count} unanchored items")
+        return count
+
+    async def flush(self) -> Optional[str]:
+        """Anchor everything pending as one batch and return the Merkle root."""
+        await self._record_unrecorded()
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return None
+
+        levels = build_levels([item.content_hash for item in batch])
+        root = merkle_root(levels)
+        try:
+            transaction_hash = await self.anchor(root, "merkle-batch")
+        except Exception as e:
+            logger.error(f"Failed to anchor batch of {len(batch)} items: {str(e)}")
+            with self._lock:
+                self._pending = batch + self._pending
+            return None
+
+        try:
+            await run_in_threadpool(self._record_batch, batch, levels, root, transaction_hash)
+        except Exception as e:
+            # Already on chain: keep the transaction hash and retry the bookkeeping, never re-anchor
+            logger.error(f"Anchored root {root} in {transaction_hash} but could not record it: {str(e)}")
+            with self._lock:
+                self._unrecorded.append((batch, levels, root, transaction_hash))
+            return root
+        logger.info(f"Anchored {len(batch)} items under Merkle root {root}")
+        return root
+
+    async def _record_unrecorded(self) -> None:
+        with self._lock:
+            anchored, self._unrecorded = self._unrecorded, []
+        for index, (batch, levels, root, transaction_hash) in enumerate(anchored):
+            try:
+                await run_in_threadpool(self._record_batch, batch, levels, root, transaction_hash)
+            except Exception as e:
+                logger.error(f"Still cannot record anchored root {root}: {str(e)}")
+                with self._lock:
+                    self._unrecorded = anchored[index:] + self._unrecorded
+                return
+            logger.info(f"Recorded {len(batch)} items anchored under Merkle root {root}")
+
+    def _record_batch(self, batch: List[PendingAnchor], levels, root: str, transaction_hash: str) -> None:
+        db = self.session_factory()
+        try:
+            anchor_batch = models.AnchorBatch(
+                merkle_root=root,
+                transaction_hash=transaction_hash,
+                leaf_count=len(batch)
+            )
+            db.add(anchor_batch)
+            db.flush()
+
+            updates = {kind: [] for kind in MODELS}
+            for index, item in enumerate(batch):
+                updates[item.kind].append({
+                    "id": item.item_id,
+                    "anchor_batch_id": anchor_batch.id,
+                    "merkle_leaf_index": index,
+                    "merkle_proof": merkle_proof(levels, index)
+                })
+            for kind, rows in updates.items():
+                if rows:
+                    db.bulk_update_mappings(MODELS[kind], rows)
+            db.commit()
+        finally:
+            db.close()
+
+    async def run_periodic(self) -> None:
+        """Flush whenever the batch fills up or the time window passes; recover abandoned rows now and then."""
+        self._full = asyncio.Event()
+        recovered_at = None
+        while True:
+            if recovered_at is None or time.monotonic() - recovered_at >= self.recovery_interval:
+                recovered_at = time.monotonic()
+                try:
+                    await run_in_threadpool(self.recover)
+                except Exception as e:
+                    logger.error(f"Anchor recovery failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self._full.wait(), timeout=self.window)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Anchor batch flush failed: {str(e)}")
+
+anchor_batcher = AnchorBatcher()
@@ -0,0 +1,47 @@
+from typing import List
+from eth_hash.auto import keccak
+
+def _to_bytes(value: str) -> bytes:
+    return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+def leaf_hash(content_hash: str) -> bytes:
+    """Hash a content hash into a leaf; hashing twice keeps leaves distinct from inner nodes."""
+    return keccak(_to_bytes(content_hash))
+
+def _parent(left: bytes, right: bytes) -> bytes:
+    # Sorted pairs mean proofs need no left/right flags
+    return keccak(min(left, right) + max(left, right))
+
+def build_levels(content_hashes: List[str]) -> List[List[bytes]]:
+    """Build every level of the tree, leaves first and the root last."""
+    if not content_hashes:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+    levels = [[leaf_hash(h) for h in content_hashes]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [_parent(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            # An odd node is promoted unchanged
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+def merkle_root(levels: List[List[bytes]]) -> str:
+    return levels[-1][0].hex()
+
+def merkle_proof(levels: List[List[bytes]], index: int) -> List[str]:
+    """Return the sibling hashes needed to rebuild the root from leaf `index`."""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(level[sibling].hex())
+        index //= 2
+    return proof
+
+def verify_proof(content_hash: str, proof: List[str], root: str) -> bool:
+    """Check a proof locally, without touching the chain."""
+    node = leaf_hash(content_hash)
+    for sibling in proof:
+        node = _parent(node, _to_bytes(sibling))
+    return node == _to_bytes(root)
@@ -0,0 +1,250 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import itertools
+import json
+import logging
+import time
+
+from app.core.config import settings
+from app.blockchain.abi import decode_aggregate3, encode_aggregate3
+
+logger = logging.getLogger(__name__)
+
+# Read-only methods whose results may be served from the short-TTL cache
+CACHEABLE_METHODS = frozenset({
+    "eth_call",
+    "eth_chainId",
+    "eth_blockNumber",
+    "eth_getBalance",
+    "eth_getCode",
+    "eth_getStorageAt",
+    "eth_getTransactionReceipt"
+})
+
+Transport = Callable[[List[dict]], Awaitable[List[dict]]]
+
+class RPCError(Exception):
+    """An error returned by the node for one call (including contract reverts)."""
+
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+class PendingCall:
+    __slots__ = ("key", "method", "params", "future")
+
+    def __init__(self, key: str, method: str, params: list, future: asyncio.Future):
+        self.key = key
+        self.method = method
+        self.params = params
+        self.future = future
+
+class RequestUnit:
+    __slots__ = ("request", "calls", "multicall")
+
+    def __init__(self, request: dict, calls: List[PendingCall], multicall: bool = False):
+        self.request = request
+        self.calls = calls
+        self.multicall = multicall
+
+class BatchingRPCClient:
+    """Coalesces concurrent JSON-RPC calls into batch requests.
+
+    Calls made within `window` seconds of each other go out as JSON-RPC
+    batches of up to `max_batch_size` requests, with plain `eth_call`s folded
+    into Multicall3 `aggregate3` calls. Identical calls already in flight
+    share one result, and read-only results are cached for `cache_ttl`
+    seconds.
+    """
+
+    def __init__(self, transport: Transport, window: Optional[float] = None, max_batch_size: Optional[int] = None,
+                 cache_ttl: Optional[float] = None, cache_size: Optional[int] = None,
+                 multicall_address: Optional[str] = None):
+        self.transport = transport
+        self.window = settings.RPC_BATCH_WINDOW_MS / 1000 if window is None else window
+        self.max_batch_size = max_batch_size or settings.RPC_MAX_BATCH_SIZE
+        self.cache_ttl = settings.RPC_CACHE_TTL_SECONDS if cache_ttl is None else cache_ttl
+        self.cache_size = cache_size or settings.RPC_CACHE_SIZE
+        self.multicall_address = settings.MULTICALL_ADDRESS if multicall_address is None else multicall_address
+        self.multicall_max_calls = settings.MULTICALL_MAX_CALLS
+        self._ids = itertools.count(1)
+        self._cache: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._loop = None
+        # Strong references to sends in flight; the loop only keeps weak ones
+        self._tasks: Set[asyncio.Task] = set()
+        self._reset()
+        self._stats = {
+            "calls": 0,
+            "cache_hits": 0,
+            "deduplicated": 0,
+            "batches": 0,
+            "multicalls": 0
+        }
+
+    def _reset(self) -> None:
+        self._queue: List[PendingCall] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flush_handle = None
+        self._flush_soon = False
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+    async def call(self, method: str, params: Optional[list] = None) -> Any:
+        """Make one JSON-RPC call; it is sent with whatever else is queued in the same window."""
+        params = params or []
+        key = json.dumps([method, params], sort_keys=True)
+        self._stats["calls"] += 1
+
+        if method in CACHEABLE_METHODS and self.cache_ttl > 0:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                return cached[1]
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures belong to one event loop (tests and CLIs may start several)
+            self._loop = loop
+            self._reset()
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats["deduplicated"] += 1
+        else:
+            future = loop.create_future()
+            self._inflight[key] = future
+            self._queue.append(PendingCall(key, method, params, future))
+            full = len(self._queue) >= self.max_batch_size
+            if self._flush_handle is None or (full and not self._flush_soon):
+                if self._flush_handle is not None:
+                    self._flush_handle.cancel()
+                # A full queue goes out at the end of this loop iteration rather than after the window
+                self._flush_soon = full
+                self._flush_handle = loop.call_soon(self._flush_now) if full else loop.call_later(self.window, self._flush_now)
+        # Shielded so one cancelled caller does not cancel the call for everyone sharing it
+        return await asyncio.shield(future)
+
+    def _multicallable(self, call: PendingCall) -> bool:
+        if call.method != "eth_call" or not call.params or not isinstance(call.params[0], dict):
+            return False
+        block = call.params[1] if len(call.params) > 1 else "latest"
+        return block == "latest" and set(call.params[0]) == {"to", "data"}
+
+    def _flush_now(self) -> None:
+        self._flush_handle = None
+        self._flush_soon = False
+        queue, self._queue = self._queue, []
+
+        contract_calls = [call for call in queue if self._multicallable(call)] if self.multicall_address else []
+        if len(contract_calls) < 2:
+            contract_calls = []
+        folded = {id(call) for call in contract_calls}
+
+        # Each unit is one JSON-RPC request: a plain call, or a Multicall3 call standing in for many
+        units = [RequestUnit(self._request(call.method, call.params), [call]) for call in queue if id(call) not in folded]
+        for i in range(0, len(contract_calls), self.multicall_max_calls):
+            chunk = contract_calls[i:i + self.multicall_max_calls]
+            try:
+                data = encode_aggregate3([(call.params[0]["to"], call.params[0]["data"]) for call in chunk])
+            except Exception as e:
+                # Not ABI-encodable (a malformed address, say): let the node judge each call itself
+                logger.warning(f"Could not fold {len(chunk)} calls into a multicall: {str(e)}")
+                units.extend(RequestUnit(self._request(call.method, call.params), [call]) for call in chunk)
+                continue
+            request = self._request("eth_call", [{"to": self.multicall_address, "data": data}, "latest"])
+            units.append(RequestUnit(request, chunk, multicall=True))
+
+        for i in range(0, len(units), self.max_batch_size):
+            task = asyncio.ensure_future(self._send(units[i:i + self.max_batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, units: List[RequestUnit]) -> None:
+        self._stats["batches"] += 1
+        try:
+            responses = await self.transport([unit.request for unit in units])
+            if not isinstance(responses, list):
+                raise RPCError(f"Malformed batch response: expected a list, got {type(responses).__name__}")
+            fallback = self._settle(units, responses)
+            if fallback:
+                # Multicall3 missing or unusable on this node: resend those calls as plain requests
+                logger.warning(f"Multicall failed, resending {len(fallback)} calls individually")
+                retry = [RequestUnit(self._request(call.method, call.params), [call]) for call in fallback]
+                for i in range(0, len(retry), self.max_batch_size):
+                    await self._send(retry[i:i + self.max_batch_size])
+        except Exception as e:
+            logger.error(f"JSON-RPC batch of {len(units)} requests failed: {str(e)}")
+            # Nothing may be left waiting: fail whatever this batch did not settle
+            for unit in units:
+                for call in unit.calls:
+                    self._fail(call, e)
+
+    def _settle(self, units: List[RequestUnit], responses: list) -> List[PendingCall]:
+        """Resolve calls from a batch response; returns multicalled calls to resend individually."""
+        by_id = {response.get("id"): response for response in responses if isinstance(response, dict)}
+        fallback = []
+        for unit in units:
+            response = by_id.get(unit.request["id"])
+            if not unit.multicall:
+                self._resolve(unit.calls[0], response)
+                continue
+
+            self._stats["multicalls"] += 1
+            results = self._aggregate_results(response, len(unit.calls))
+            if results is None:
+                fallback.extend(unit.calls)
+                continue
+            for call, (success, output) in zip(unit.calls, results):
+                if success:
+                    self._resolve(call, {"result": output})
+                else:
+                    self._resolve(call, {"error": {"code": 3, "message": "execution reverted"}})
+        return fallback
+
+    def _aggregate_results(self, response: Optional[dict], expected: int) -> Optional[List[Tuple[bool, str]]]:
+        # A node without Multicall3 at the address answers "0x" (no code), which does not decode
+        if response is None or not response.get("result") or response["result"] == "0x":
+            return None
+        try:
+            results = decode_aggregate3(response["result"])
+        except Exception as e:
+            logger.warning(f"Undecodable multicall result: {str(e)}")
+            return None
+        return results if len(results) == expected else None
+
+    def _request(self, method: str, params: list) -> dict:
+        return {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+
+    def _resolve(self, call: PendingCall, response: Optional[dict]) -> None:
+        if response is None:
+            self._fail(call, RPCError("No response for request"))
+            return
+        if "error" in response:
+            error = response["error"] if isinstance(response["error"], dict) else {"message": str(response["error"])}
+            self._fail(call, RPCError(error.get("message", "JSON-RPC error"), error.get("code")))
+            return
+
+        result = response.get("result")
+        if call.method in CACHEABLE_METHODS and self.cache_ttl > 0:
+            self._cache[call.key] = (time.monotonic() + self.cache_ttl, result)
+            self._cache.move_to_end(call.key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        self._done(call)
+        if not call.future.done():
+            call.future.set_result(result)
+
+    def _fail(self, call: PendingCall, error: Exception) -> None:
+        self._done(call)
+        if not call.future.done():
+            call.future.set_exception(error)
+
+    def _done(self, call: PendingCall) -> None:
+        if self._inflight.get(call.key) is call.future:
+            del self._inflight[call.key]
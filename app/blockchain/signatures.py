@@ -0,0 +1,129 @@
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional, Tuple
+import logging
+import secrets
+import threading
+
+from eth_hash.auto import keccak
+
+from app.core.config import settings
+from app.services.otp_store import OTP_VALID, create_otp_store
+
+logger = logging.getLogger(__name__)
+
+try:
+    import coincurve
+except ImportError:  # optional native backend
+    coincurve = None
+
+def eip191_hash(message: str) -> bytes:
+    """Hash a text message the way `personal_sign` does."""
+    data = message.encode()
+    return keccak(b"\x19Ethereum Signed Message:\n" + str(len(data)).encode() + data)
+
+def parse_signature(signature: str) -> bytes:
+    """Return the 65-byte r||s||recovery-id form of a hex signature."""
+    raw = bytes.fromhex(signature[2:] if signature.startswith("0x") else signature)
+    if len(raw) != 65:
+        raise ValueError("Signature must be 65 bytes")
+    v = raw[64]
+    if v >= 27:
+        v -= 27
+    if v not in (0, 1):
+        raise ValueError("Invalid signature recovery id")
+    return raw[:64] + bytes([v])
+
+def _recover_coincurve(msg_hash: bytes, signature: bytes) -> str:
+    public_key = coincurve.PublicKey.from_signature_and_message(signature, msg_hash, hasher=None)
+    return "0x" + keccak(public_key.format(compressed=False)[1:])[-20:].hex()
+
+def _recover_python(msg_hash: bytes, signature: bytes) -> str:
+    from eth_keys import KeyAPI
+    from eth_keys.backends import NativeECCBackend
+
+    public_key = KeyAPI(NativeECCBackend()).Signature(signature).recover_public_key_from_msg_hash(msg_hash)
+    return public_key.to_address()
+
+class SignatureVerifier:
+    """Recovers `personal_sign` signers, preferring libsecp256k1 via coincurve.
+
+    Results are cached per (message, signature) in a bounded LRU so retried or
+    repeated verifications skip the elliptic-curve work entirely.
+    """
+
+    def __init__(self, backend: Optional[str] = None, cache_size: Optional[int] = None):
+        backend = backend or settings.SIGNATURE_BACKEND
+        if backend == "auto":
+            backend = "coincurve" if coincurve is not None else "python"
+        if backend == "coincurve" and coincurve is None:
+            raise ValueError("SIGNATURE_BACKEND=coincurve requires the coincurve package")
+        if backend not in ("coincurve", "python"):
+            raise ValueError(f"Unknown SIGNATURE_BACKEND: {backend}")
+        self.backend = backend
+        self._recover = _recover_coincurve if backend == "coincurve" else _recover_python
+        self.cache_size = cache_size or settings.SIGNATURE_CACHE_SIZE
+        self._cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def recover(self, message: str, signature: str) -> str:
+        """Return the lowercase address that signed `message`."""
+        key = (message, signature.lower())
+        with self._lock:
+            signer = self._cache.get(key)
+            if signer is not None:
+                self._cache.move_to_end(key)
+                return signer
+
+        signer = self._recover(eip191_hash(message), parse_signature(signature)).lower()
+
+        with self._lock:
+            self._cache[key] = signer
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return signer
+
+    def verify(self, message: str, signature: str, address: str) -> bool:
+        """Check that `message` was signed by `address`."""
+        try:
+            return self.recover(message, signature) == address.lower()
+        except Exception:
+            return False
+
+class WalletChallengeService:
+    """Issues one-time login challenges for wallets.
+
+    Nonces live in the same pluggable, TTL-evicting store as OTPs (keyed by
+    wallet), so a challenge issued by one worker can be answered on another
+    and every signed message can be used only once.
+    """
+
+    def __init__(self, verifier: Optional[SignatureVerifier] = None):
+        self.verifier = verifier or SignatureVerifier()
+        self.nonces = create_otp_store()
+        self.ttl = timedelta(seconds=settings.WALLET_CHALLENGE_TTL_SECONDS)
+
+    def build_message(self, wallet_address: str, nonce: str) -> str:
+        return (
+            f"Sign in to {settings.APP_NAME}\n\n"
+            f"Wallet: {wallet_address.lower()}\n"
+            f"Nonce: {nonce}"
+        )
+
+    def issue(self, wallet_address: str) -> Tuple[str, str]:
+        """Create a nonce for the wallet and return it with the message to sign."""
+        nonce = secrets.token_hex(16)
+        self.nonces.put(f"wallet:{wallet_address.lower()}", nonce, self.ttl)
+        return nonce, self.build_message(wallet_address, nonce)
+
+    def verify(self, wallet_address: str, nonce: str, signature: str) -> bool:
+        """Check the signature over the challenge and consume the nonce."""
+        message = self.build_message(wallet_address, nonce)
+        if not self.verifier.verify(message, signature, wallet_address):
+            logger.warning(f"Invalid wallet signature for {wallet_address}")
+            return False
+        # Consuming the nonce only after a valid signature stops strangers burning others' challenges
+        return self.nonces.verify(f"wallet:{wallet_address.lower()}", nonce) == OTP_VALID
+
+signature_verifier = SignatureVerifier()
+wallet_challenges = WalletChallengeService(signature_verifier)
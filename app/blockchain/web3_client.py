@@ -1,49 +1,156 @@
-from web3 import Web3
-from eth_account.messages import encode_defunct
+from eth_hash.auto import keccak
+from typing import Dict, List, Sequence
 from app.core.config import settings
-import json
+from app.blockchain.abi import decode_result, encode_call
+from app.blockchain.rpc_batch import BatchingRPCClient
+from app.blockchain.signatures import signature_verifier
+import asyncio
+import threading
+
+# Read functions of the anchoring/access-rule registry contract
+IS_ANCHORED = "isAnchored(bytes32)"
+HAS_ACCESS = "hasAccess(bytes32,address)"
 
 class Web3Client:
+    """Blockchain access with lazily created Web3 instances.
+
+    Importing `web3` costs over a second, and most requests only need
+    `hash_content`, which uses `eth_hash` directly. The synchronous and async
+    Web3 objects are built on first use; the async one shares a pooled,
+    keep-alive aiohttp session and limits concurrent RPC calls.
+
+    Contract reads go through `rpc_batcher`, so concurrent lookups (e.g. one
+    per asset on a page) become a single batched, multicalled request.
+    """
+
     def __init__(self):
-        self.w3 = Web3(Web3.HTTPProvider(settings.POLYGON_RPC_URL))
+        self.rpc_url = settings.POLYGON_RPC_URL
         self.chain_id = settings.POLYGON_CHAIN_ID
         self.contract_address = settings.CONTRACT_ADDRESS
-        
+        self._w3 = None
+        self._async_w3 = None
+        self._session = None
+        self._rpc_slots = None
+        self._lock = threading.Lock()
+        self._async_lock = None
+        self.rpc_batcher = BatchingRPCClient(self._post_batch)
+
+    @property
+    def w3(self):
+        """Synchronous Web3 instance, created on first use."""
+        if self._w3 is None:
+            with self._lock:
+                if self._w3 is None:
+                    from web3 import Web3
+                    self._w3 = Web3(Web3.HTTPProvider(
+                        self.rpc_url,
+                        request_kwargs={"timeout": settings.WEB3_REQUEST_TIMEOUT_SECONDS}
+                    ))
+        return self._w3
+
+    async def get_session(self):
+        """Pooled keep-alive aiohttp session, created on first use."""
+        if self._session is not None:
+            return self._session
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            if self._session is None:
+                import aiohttp
+
+                self._session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(
+                        limit=settings.WEB3_MAX_CONNECTIONS,
+                        keepalive_timeout=settings.WEB3_KEEPALIVE_SECONDS
+                    ),
+                    timeout=aiohttp.ClientTimeout(
+                        total=settings.WEB3_REQUEST_TIMEOUT_SECONDS,
+                        connect=settings.WEB3_CONNECT_TIMEOUT_SECONDS
+                    )
+                )
+                self._rpc_slots = asyncio.Semaphore(settings.WEB3_MAX_CONCURRENT_REQUESTS)
+        return self._session
+
+    async def get_async_w3(self):
+        """Async Web3 instance sharing the pooled HTTP session, created on first use."""
+        if self._async_w3 is not None:
+            return self._async_w3
+        session = await self.get_session()
+        async with self._async_lock:
+            if self._async_w3 is None:
+                from web3 import AsyncHTTPProvider, AsyncWeb3
+
+                provider = AsyncHTTPProvider(self.rpc_url, request_kwargs={"timeout": session.timeout})
+                await provider.cache_async_session(session)
+                self._async_w3 = AsyncWeb3(provider)
+        return self._async_w3
+
+    async def _post_batch(self, payload: List[dict]) -> List[dict]:
+        session = await self.get_session()
+        async with self._rpc_slots:
+            async with session.post(self.rpc_url, json=payload) as response:
+                response.raise_for_status()
+                body = await response.json(content_type=None)
+        return body if isinstance(body, list) else [body]
+
+    async def rpc(self, method: str, params: list):
+        """Make a JSON-RPC call; concurrent calls are batched, deduplicated and briefly cached."""
+        return await self.rpc_batcher.call(method, params)
+
+    async def call_contract(self, signature: str, args: Sequence, return_types: Sequence[str]):
+        """Call a view function on the registry contract and decode its result."""
+        result = await self.rpc("eth_call", [{"to": self.contract_address, "data": encode_call(signature, args)}, "latest"])
+        return decode_result(return_types, result)
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self._async_w3 = None
+        self._async_lock = None
+        self._rpc_slots = None
+
     def verify_signature(self, message: str, signature: str, address: str) -> bool:
         """Verify that a message was signed by the given address."""
-        try:
-            message_hash = encode_defunct(text=message)
-            signer = self.w3.eth.account.recover_message(message_hash, signature=signature)
-            return signer.lower() == address.lower()
-        except Exception:
-            return False
-    
+        return signature_verifier.verify(message, signature, address)
+
     def hash_content(self, content: str) -> str:
         """Create a hash of the content to store on blockchain."""
-        return self.w3.keccak(text=content).hex()
-    
+        return keccak(content.encode()).hex()
+
     async def anchor_hash(self, content_hash: str, owner_address: str) -> str:
         """Store a content hash on the blockchain."""
         # This would interact with a smart contract
         # For MVP, we'll just return the hash
         return content_hash
-    
+
     async def verify_hash(self, content_hash: str) -> bool:
         """Verify a content hash exists on the blockchain."""
-        # This would check the smart contract
-        # For MVP, we'll just return True
-        return True
-    
+        if not self.contract_address:
+            # No registry configured (MVP): treat everything as anchored
+            return True
+        (anchored,) = await self.call_contract(IS_ANCHORED, [bytes.fromhex(content_hash.removeprefix("0x"))], ["bool"])
+        return anchored
+
+    async def verify_hashes(self, content_hashes: Sequence[str]) -> Dict[str, bool]:
+        """Verify many hashes at once; the lookups share one batched request."""
+        unique = list(dict.fromkeys(content_hashes))
+        results = await asyncio.gather(*(self.verify_hash(h) for h in unique))
+        return dict(zip(unique, results))
+
     async def create_access_rule(self, asset_id: int, beneficiary: str, conditions: dict) -> str:
         """Create a smart contract for access rules."""
         # This would deploy a new smart contract
         # For MVP, we'll just return a mock contract ID
         return f"contract_{asset_id}_{beneficiary}"
-    
+
     async def verify_access(self, contract_id: str, requester: str) -> bool:
         """Verify if a requester has access according to the smart contract."""
-        # This would check the smart contract conditions
-        # For MVP, we'll just return True
-        return True
+        if not self.contract_address:
+            # No registry configured (MVP): allow
+            return True
+        (allowed,) = await self.call_contract(HAS_ACCESS, [keccak(contract_id.encode()), requester], ["bool"])
+        return allowed
 
-web3_client = Web3Client() 
\ No newline at end of file
+web3_client = Web3Client()
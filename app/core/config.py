@@ -4,38 +4,147 @@ import os
 from dotenv import load_dotenv
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
-logger.info("Loading environment variables...")
 
 class Settings(BaseSettings):
     APP_NAME: str = "Digital Legacy Manager"
     ENVIRONMENT: str = "development"
     DEBUG: bool = True
     API_V1_PREFIX: str = "/api/v1"
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json or text
+    # Per-logger fraction of DEBUG/INFO records kept, e.g. "app.api.v1.assets=0.1,app.services.email_service=0.5"
+    LOG_SAMPLING: str = os.getenv("LOG_SAMPLING", "")
+    LOG_RATE_LIMIT_PER_MINUTE: int = 60  # per logging call site; 0 disables
     
     # Database
     DATABASE_URL: str = "sqlite:///./digital_legacy.db"
+    # Create missing tables at start-up when the model fingerprint changed; disable when a deploy step runs `python -m app.db.schema`
+    SCHEMA_AUTO_CREATE: bool = True
     
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     JWT_SECRET_KEY: str = os.getenv("JWT_SECRET_KEY", "your-secret-key-here")
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Rotation: "kid:secret,kid:secret"; tokens are signed with JWT_ACTIVE_KID (or the first key)
+    JWT_SIGNING_KEYS: str = os.getenv("JWT_SIGNING_KEYS", "")
+    JWT_ACTIVE_KID: Optional[str] = os.getenv("JWT_ACTIVE_KID")
+    JWT_VERIFY_CACHE_SIZE: int = 10000
+
+    # Rate limiting ("<requests>/<seconds>" token buckets; use the "database" backend with several workers)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_OTP_PER_IP: str = "10/60"
+    RATE_LIMIT_OTP_PER_EMAIL: str = "3/600"
+    RATE_LIMIT_LOGIN_PER_IP: str = "20/60"
+    RATE_LIMIT_LOGIN_PER_EMAIL: str = "5/300"
+    RATE_LIMIT_WALLET_PER_IP: str = "20/60"
+    RATE_LIMIT_WALLET_PER_ADDRESS: str = "10/60"
+    TRUST_PROXY_HEADERS: bool = False
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
     
     # Blockchain
     POLYGON_RPC_URL: str = os.getenv("POLYGON_RPC_URL", "https://polygon-rpc.com")
     POLYGON_CHAIN_ID: int = 137
     CONTRACT_ADDRESS: Optional[str] = None
+    WEB3_REQUEST_TIMEOUT_SECONDS: float = 10.0
+    WEB3_CONNECT_TIMEOUT_SECONDS: float = 3.0
+    WEB3_MAX_CONNECTIONS: int = 20
+    WEB3_KEEPALIVE_SECONDS: float = 30.0
+    WEB3_MAX_CONCURRENT_REQUESTS: int = 16
+    ANCHOR_BATCH_MAX_SIZE: int = 5000
+    ANCHOR_BATCH_WINDOW_SECONDS: float = 60.0
+    # One process (holding a DB lease) requeues rows left unanchored this long, e.g. by a crashed worker
+    ANCHOR_RECOVERY_INTERVAL_SECONDS: int = 300
+    # Concurrent reads are coalesced into JSON-RPC batches and Multicall3 calls (empty address disables multicall)
+    RPC_BATCH_WINDOW_MS: float = 2.0
+    RPC_MAX_BATCH_SIZE: int = 50
+    RPC_CACHE_TTL_SECONDS: float = 2.0
+    RPC_CACHE_SIZE: int = 10000
+    MULTICALL_ADDRESS: str = os.getenv("MULTICALL_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+    MULTICALL_MAX_CALLS: int = 500
+    SIGNATURE_BACKEND: str = "auto"  # auto, coincurve (libsecp256k1) or python
+    SIGNATURE_CACHE_SIZE: int = 10000
+    WALLET_CHALLENGE_TTL_SECONDS: int = 300
     
+    # Envelope encryption. Rotation: add "new:<key>" to MASTER_KEYS, set MASTER_KEY_ACTIVE_ID=new,
+    # run `python -m app.services.key_manager rotate`, then drop the old key. Required unless DEBUG, where a local encryption_key.key may stand in.
+    MASTER_KEYS: str = os.getenv("MASTER_KEYS", "")
+    MASTER_KEY_ACTIVE_ID: Optional[str] = os.getenv("MASTER_KEY_ACTIVE_ID")
+    DEK_CACHE_SIZE: int = 4096
+    DEK_CACHE_TTL_SECONDS: float = 300.0
+    KEY_ROTATION_BATCH_SIZE: int = 1000
+    
+    # Web pages and static files: HTML shells are rendered once and precompressed; static files are
+    # fingerprinted and cached as immutable for STATIC_MAX_AGE_SECONDS
+    TEMPLATES_DIR: str = "app/templates"
+    STATIC_DIR: str = "app/static"
+    STATIC_MAX_AGE_SECONDS: int = 365 * 24 * 60 * 60
+    PRECOMPRESS_MIN_BYTES: int = 512
+
     # Storage
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
+    # Objects are stored as UPLOAD_DIR/ab/cd/<id>.encrypted; `python -m app.services.storage migrate` moves older flat files
+    STORAGE_FSYNC: bool = True  # flush each object to disk before it is renamed into place
+    STORAGE_MIGRATION_BATCH_SIZE: int = 500
+    # Uploads sent with "Prefer: respond-async" get 202 and are encrypted and stored in the background
+    INGEST_ASYNC_DEFAULT: bool = False  # treat every upload as respond-async
+    INGEST_WORKERS: int = 2
+    INGEST_STATUS_MAX_WAIT_SECONDS: int = 30  # longest long-poll on GET /assets/{id}/status
+    INGEST_CLAIM_TIMEOUT_SECONDS: int = 900  # a worker's claim older than this is presumed dead and may be retaken
+    # Socket.IO push channel at /socket.io (upload progress, new assets, inactivity events)
+    REALTIME_ENABLED: bool = True
+    REALTIME_MESSAGE_QUEUE: str = ""  # redis:// or amqp:// URL shared by all workers; empty = this process only
+    REALTIME_CORS_ORIGINS: str = ""  # comma-separated; empty = same origin only
+    REALTIME_PROGRESS_INTERVAL_MS: int = 250
+
+    # Orphan reconciliation (`python -m app.services.reconcile`, POST /api/v1/integrity/reconcile)
+    RECONCILE_BATCH_SIZE: int = 1000
+    RECONCILE_GRACE_SECONDS: int = 3600  # younger files may belong to an upload still in flight
+    RECONCILE_ORPHAN_ACTION: str = "quarantine"  # or "delete"; leftover plaintext is always deleted
+    HEALTH_MIN_FREE_BYTES: int = 512 * 1024 * 1024  # deep health fails below this much free space
+    # Enforced while the upload streams in; larger bodies get 413 without being spooled
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    USER_STORAGE_QUOTA_BYTES: int = 1024 * 1024 * 1024  # total plaintext bytes per user (0 = unlimited)
+    DASHBOARD_PAGE_SIZE: int = 20  # assets in the first page of GET /users/{id}/dashboard
+    # Downloads carry ETag/Last-Modified; browsers may reuse a private copy this long without asking (0 = always revalidate)
+    ASSET_CACHE_MAX_AGE_SECONDS: int = 3600
+    # Checked against the type sniffed from the file's first bytes, not the declared one
     ALLOWED_FILE_TYPES: str = "image/*,video/*,application/pdf,text/*"
-    
+
+    # Background integrity scrubbing of stored ciphertext
+    SCRUB_ENABLED: bool = True
+    SCRUB_MAX_BYTES_PER_SECOND: int = 8 * 1024 * 1024
+    SCRUB_VERIFY_TAGS: bool = True
+    SCRUB_BATCH_SIZE: int = 100
+    SCRUB_INTERVAL_SECONDS: int = 6 * 60 * 60
+    SCRUB_LEASE_SECONDS: int = 300  # one process scrubs at a time; the lease is renewed every batch and others check back this often
+
+    # Prometheus metrics at /metrics; when METRICS_TOKEN is set scrapers must send it as a bearer token
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = os.getenv("METRICS_TOKEN")
+
+    # Request profiling: admins send X-Profile: 1 (with X-Admin-Token), or a sampled fraction of requests
+    # is profiled; profiles are kept under PROFILE_DIR and served from /api/v1/profiles
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_MAX_STORED: int = 50
+    SERVER_TIMING_ENABLED: bool = True
+    N_PLUS_ONE_THRESHOLD: int = 10  # warn when one request repeats a statement this often
+
+    # Operator endpoints (integrity report, profiles); disabled while unset
+    ADMIN_API_TOKEN: Optional[str] = os.getenv("ADMIN_API_TOKEN")
+
     # Google Cloud Storage
     GOOGLE_CLOUD_PROJECT: Optional[str] = None
     GOOGLE_CLOUD_BUCKET: Optional[str] = None
@@ -45,14 +154,35 @@ class Settings(BaseSettings):
     SMTP_PORT: int = int(os.getenv("SMTP_PORT", "587"))
     SMTP_USERNAME: str = os.getenv("SMTP_USERNAME", "")
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
+    SMTP_FROM: str = os.getenv("SMTP_FROM", "")  # defaults to SMTP_USERNAME
+    SMTP_USE_TLS: bool = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    SMTP_POOL_SIZE: int = 2
+    SMTP_HEALTH_CHECK_SECONDS: int = 30
     
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        logger.info("Email Configuration:")
-        logger.info(f"SMTP_HOST: {self.SMTP_HOST}")
-        logger.info(f"SMTP_PORT: {self.SMTP_PORT}")
-        logger.info(f"SMTP_USERNAME: {self.SMTP_USERNAME}")
-        logger.info(f"SMTP_PASSWORD: {'*' * len(self.SMTP_PASSWORD) if self.SMTP_PASSWORD else 'Not set'}")
+    # Outbound mail queue
+    MAIL_QUEUE_MAX_SIZE: int = 10000
+    MAIL_BATCH_SIZE: int = 20
+    MAIL_MAX_RETRIES: int = 5
+    MAIL_RETRY_BASE_SECONDS: float = 2.0
+
+    # OTP settings ("memory" is per-process; use "database" with more than one worker)
+    OTP_STORE_BACKEND: str = os.getenv("OTP_STORE_BACKEND", "memory")
+    OTP_TTL_MINUTES: int = 5
+    OTP_MAX_ATTEMPTS: int = 5
+    OTP_MEMORY_MAX_ENTRIES: int = 100000
+
+    # Inactivity (dead-man's-switch) settings
+    INACTIVITY_DEFAULT_CHECKIN_DAYS: int = 90
+    INACTIVITY_REMINDER_GRACE_DAYS: int = 7
+    INACTIVITY_MAX_REMINDERS: int = 2
+    INACTIVITY_SWEEP_INTERVAL_SECONDS: int = 300
+    INACTIVITY_SWEEP_BATCH_SIZE: int = 500
+
+    def log_summary(self) -> None:
+        """Log the effective configuration once at start-up (secrets masked)."""
+        logger.info(f"Starting {self.APP_NAME} ({self.ENVIRONMENT})")
+        logger.info(f"SMTP: {self.SMTP_HOST}:{self.SMTP_PORT}, credentials {'set' if self.SMTP_PASSWORD else 'not set'}")
     
     class Config:
         case_sensitive = True
@@ -0,0 +1,221 @@
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+REQUEST_ID_HEADER = b"x-request-id"
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+# Attributes every LogRecord has; anything else was passed with `extra=`
+_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "request_id"}
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the ID of the request being served ("-" outside one)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG/INFO records from selected loggers.
+
+    `rates` maps logger names to the fraction kept; the most specific name
+    wins, so "app.api.v1.assets=0.1" also samples its child loggers.
+    Warnings and errors always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def rate_for(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class RateLimitFilter(logging.Filter):
+    """Let each logging call site through at most `limit` times per `period` seconds.
+
+    Messages are usually f-strings, so repetition is detected per call site
+    (logger, file, line) rather than per text. The first record after a
+    throttled window notes how many were dropped. Errors always pass.
+    """
+
+    def __init__(self, limit: int, period: float = 60.0):
+        super().__init__()
+        self.limit = limit
+        self.period = period
+        self._windows: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+            elif window[1] < self.limit:
+                window[1] += 1
+                return True
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.msg = f"{record.getMessage()} [{suppressed} similar messages suppressed]"
+            record.args = None
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra=` fields."""
+
+    converter = time.gmtime
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-")
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Parse LOG_SAMPLING ("logger=rate,logger=rate")."""
+    rates = {}
+    for entry in spec.split(","):
+        if entry.strip():
+            name, _, rate = entry.strip().partition("=")
+            rates[name] = float(rate)
+    return rates
+
+_exception_formatter = logging.Formatter()
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps records structured.
+
+    The stock prepare() formats the record into its message and drops
+    exc_info, so the listener's formatter can no longer emit the traceback
+    as a field. Here only the message arguments are merged; the traceback
+    is rendered to exc_text (frames and tracebacks must not cross threads
+    or be pickled) and the extra fields are left alone.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def build_queue_handler(log_queue) -> logging.handlers.QueueHandler:
+    """A handler that only enqueues; its filters run on the calling thread, before anything is queued."""
+    handler = StructuredQueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    rates = parse_sampling(settings.LOG_SAMPLING)
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+    if settings.LOG_RATE_LIMIT_PER_MINUTE > 0:
+        handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT_PER_MINUTE))
+    return handler
+
+def configure_logging() -> None:
+    """Set up root logging once per process.
+
+    Request threads only put records on a queue; a listener thread formats
+    and writes them, so slow stderr or log shipping never blocks a request.
+    Called from the application entry points rather than at import time, so
+    importing a module never reconfigures logging for its importer. Like
+    logging.basicConfig, it leaves a root logger that already has handlers
+    (a test runner, an embedding server) alone apart from the level.
+    """
+    global _listener, _queue_handler
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL.upper())
+    if _listener is not None or root.handlers:
+        return
+
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue = queue.SimpleQueue()
+    _queue_handler = build_queue_handler(log_queue)
+    root.addHandler(_queue_handler)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the listener thread."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        _listener = _queue_handler = None
+
+class RequestIdMiddleware:
+    """Give every request an ID for its log records and echo it as X-Request-ID.
+
+    A well-formed X-Request-ID from the client or proxy is kept, so one ID
+    can follow a request across services.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        supplied = dict(scope["headers"]).get(REQUEST_ID_HEADER, b"").decode("latin-1")
+        request_id = supplied if VALID_REQUEST_ID.match(supplied) else uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
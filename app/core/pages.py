@@ -0,0 +1,163 @@
+from typing import Dict, Optional
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, PlainTextResponse, Response
+
+from app.core.config import settings
+from app.core.http_cache import etag_matches
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+IMMUTABLE = "public, max-age={max_age}, immutable"
+REVALIDATE = "no-cache"
+
+class PrecompressedAsset:
+    """A response body held in memory with its gzip/brotli variants and strong ETags."""
+
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.variants = {"identity": (body, f'"{digest}"')}
+        if len(body) >= settings.PRECOMPRESS_MIN_BYTES and media_type.startswith(COMPRESSIBLE_TYPES):
+            self.variants["gzip"] = (gzip.compress(body, 9, mtime=0), f'"{digest}-gz"')
+            if brotli is not None:
+                self.variants["br"] = (brotli.compress(body, quality=11), f'"{digest}-br"')
+
+    def _encoding(self, accept_encoding: str) -> str:
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return "identity"
+
+    def response(self, headers, cache_control: str) -> Response:
+        """Pick the smallest accepted variant, answering 304 when the client's copy is current."""
+        encoding = self._encoding(headers.get("accept-encoding", ""))
+        body, etag = self.variants[encoding]
+        response_headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+
+        if etag_matches(headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=response_headers)
+        return Response(body, media_type=self.media_type, headers=response_headers)
+
+class StaticAssets:
+    """ASGI app serving /static with content fingerprints.
+
+    Every file is reachable as `name.<hash>.ext`, cached for a year as
+    immutable, and under its plain name with revalidation. Templates link
+    the fingerprinted form through `static_url()`, so a deploy changes the
+    URL instead of waiting out caches. Small files are held in memory
+    precompressed; larger ones are streamed from disk.
+    """
+
+    def __init__(self, directory: Optional[str] = None, inline_max_bytes: int = 1024 * 1024):
+        self.directory = directory or settings.STATIC_DIR
+        self.inline_max_bytes = inline_max_bytes
+        self._manifest: Optional[Dict[str, str]] = None
+        self._files: Dict[str, str] = {}
+        self._assets: Dict[str, PrecompressedAsset] = {}
+
+    def load(self) -> None:
+        """Fingerprint and precompress the directory; called at start-up and on first use."""
+        manifest, files, assets = {}, {}, {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                logical = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    data = f.read()
+                stem, ext = os.path.splitext(logical)
+                fingerprinted = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+                manifest[logical] = fingerprinted
+                files[logical] = files[fingerprinted] = path
+                if len(data) <= self.inline_max_bytes:
+                    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                    assets[logical] = assets[fingerprinted] = PrecompressedAsset(data, media_type)
+        self._files, self._assets, self._manifest = files, assets, manifest
+        logger.info(f"Loaded {len(manifest)} static files from {self.directory}")
+
+    @property
+    def manifest(self) -> Dict[str, str]:
+        if self._manifest is None:
+            self.load()
+        return self._manifest
+
+    def url(self, path: str) -> str:
+        return "/static/" + self.manifest.get(path, path)
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope)
+        # Under a Mount the path still carries the mount prefix, recorded in root_path
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        path = path.lstrip("/")
+        manifest = self.manifest
+        fingerprinted = path not in manifest
+        cache_control = IMMUTABLE.format(max_age=settings.STATIC_MAX_AGE_SECONDS) if fingerprinted else REVALIDATE
+
+        if request.method not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405)
+        elif path in self._assets:
+            response = self._assets[path].response(request.headers, cache_control)
+        elif path in self._files:
+            response = FileResponse(self._files[path], headers={"Cache-Control": cache_control})
+        else:
+            response = PlainTextResponse("Not Found", status_code=404)
+        await response(scope, receive, send)
+
+class Pages:
+    """HTML shells rendered once from their templates and kept precompressed.
+
+    The templates' only inputs are settings and static URLs, so nothing
+    depends on the request; serving a page is a dict lookup and a 304 or a
+    write of prebuilt bytes.
+    """
+
+    def __init__(self, static: StaticAssets, directory: Optional[str] = None):
+        self.static = static
+        self.directory = directory or settings.TEMPLATES_DIR
+        self._pages: Dict[str, PrecompressedAsset] = {}
+        self._lock = threading.Lock()
+
+    def render(self, template: str) -> PrecompressedAsset:
+        from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+        env = Environment(loader=FileSystemLoader(self.directory), autoescape=select_autoescape())
+        env.globals["static_url"] = self.static.url
+        html = env.get_template(template).render(title=settings.APP_NAME)
+        return PrecompressedAsset(html.encode(), "text/html; charset=utf-8")
+
+    def get(self, template: str) -> PrecompressedAsset:
+        page = self._pages.get(template)
+        if page is None:
+            with self._lock:
+                page = self._pages.get(template)
+                if page is None:
+                    page = self._pages[template] = self.render(template)
+        return page
+
+    def preload(self, *templates: str) -> None:
+        self.static.load()
+        for template in templates:
+            self.get(template)
+
+    def response(self, template: str, request) -> Response:
+        return self.get(template).response(request.headers, REVALIDATE)
+
+static_assets = StaticAssets()
+pages = Pages(static_assets)
@@ -0,0 +1,179 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+
+from app.core.config import settings
+from app.core.metrics import QueryStats, route_template, track_queries
+from app.core.security import is_admin_token
+
+logger = logging.getLogger(__name__)
+
+# Frames a thread sits in while it has nothing to do for the request
+IDLE_FUNCTIONS = {"select", "poll", "wait", "_wait_for_tstate_lock"}
+PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+class StackSampler:
+    """Sample the stacks of a request's threads at a fixed interval.
+
+    cProfile only sees the thread that enabled it, while sync endpoints
+    (and their ORM work) run in the threadpool, so the sampler follows
+    every thread the request's QueryStats has seen. Output is collapsed
+    stacks ("outer;inner count"), readable by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, query_stats: QueryStats, interval: float):
+        self.query_stats = query_stats
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.query_stats.threads):
+                frame = frames.get(ident)
+                if frame is not None and frame.f_code.co_name not in IDLE_FUNCTIONS:
+                    self.samples[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def collapsed(self) -> List[str]:
+        return [f"{stack} {count}" for stack, count in self.samples.most_common()]
+
+class ProfileStore:
+    """Keeps the newest request profiles on disk for download."""
+
+    def __init__(self, directory: Optional[str] = None, max_profiles: Optional[int] = None):
+        self.directory = directory or settings.PROFILE_DIR
+        self.max_profiles = max_profiles or settings.PROFILE_MAX_STORED
+
+    def path(self, profile_id: str) -> Optional[str]:
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.txt")
+        return path if os.path.exists(path) else None
+
+    def save(self, profile_id: str, content: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{profile_id}.txt"), "w") as f:
+            f.write(content)
+        for stale in self.list()[self.max_profiles:]:
+            try:
+                os.remove(os.path.join(self.directory, f"{stale['id']}.txt"))
+            except OSError:
+                pass
+
+    def list(self) -> List[Dict]:
+        """Stored profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            profile_id, ext = os.path.splitext(name)
+            if ext != ".txt" or not PROFILE_ID.match(profile_id):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            profiles.append({
+                "id": profile_id,
+                "size": stat.st_size,
+                "created_at": datetime.utcfromtimestamp(stat.st_mtime).isoformat()
+            })
+        return sorted(profiles, key=lambda profile: profile["created_at"], reverse=True)
+
+profile_store = ProfileStore()
+
+def server_timing(stats: QueryStats, elapsed: float) -> str:
+    return f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", app;dur={elapsed * 1000:.1f}'
+
+class ProfilingMiddleware:
+    """Per-request SQL accounting, Server-Timing headers and opt-in profiles.
+
+    Every request counts its SQL statements and DB time and warns when a
+    statement repeats often enough to look like an N+1 (a lazy `owner` or
+    `access_rules` load per row). Requests carrying `X-Profile: 1` and a
+    valid X-Admin-Token, or a PROFILE_SAMPLE_RATE fraction of all
+    requests, are stack-sampled; the response's X-Profile-Id names the
+    profile to fetch from /api/v1/profiles.
+    """
+
+    def __init__(self, app, store: ProfileStore = profile_store):
+        self.app = app
+        self.store = store
+
+    def _should_profile(self, scope) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") == b"1" and is_admin_token(headers.get(b"x-admin-token", b"").decode("latin-1")):
+            return True
+        return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex if self._should_profile(scope) else None
+        start = time.perf_counter()
+        status = 500
+
+        with track_queries() as stats:
+            async def send_with_timing(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    if settings.SERVER_TIMING_ENABLED:
+                        headers.append("Server-Timing", server_timing(stats, time.perf_counter() - start))
+                    if profile_id:
+                        headers.append("X-Profile-Id", profile_id)
+                await send(message)
+
+            sampler = StackSampler(stats, settings.PROFILE_INTERVAL_MS / 1000) if profile_id else None
+            if sampler:
+                sampler.start()
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                elapsed = time.perf_counter() - start
+                route = route_template(scope)
+                for statement, count in stats.repeated(settings.N_PLUS_ONE_THRESHOLD):
+                    logger.warning(
+                        f"Possible N+1 on {scope['method']} {route}: statement ran {count} times: "
+                        f"{' '.join(statement.split())[:200]}"
+                    )
+                if sampler:
+                    sampler.stop()
+                    header = [
+                        f"# {scope['method']} {scope['path']} ({route}) -> {status}",
+                        f"# {elapsed * 1000:.1f} ms total, {stats.count} queries, {stats.duration * 1000:.1f} ms in DB",
+                        f"# collapsed stacks sampled every {settings.PROFILE_INTERVAL_MS} ms"
+                    ]
+                    try:
+                        await run_in_threadpool(self.store.save, profile_id, "\n".join(header + sampler.collapsed()) + "\n")
+                    except OSError as e:
+                        logger.error(f"Failed to store profile {profile_id}: {str(e)}")
@@ -0,0 +1,189 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+import math
+import threading
+import time
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy import case, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+
+@dataclass(frozen=True)
+class RateLimit:
+    """A token bucket: `capacity` requests, refilled evenly over `period` seconds."""
+    name: str
+    capacity: int
+    period: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RateLimit":
+        """Build a limit from a "<count>/<seconds>" setting such as "5/60"."""
+        count, _, seconds = spec.partition("/")
+        return cls(name=name, capacity=int(count), period=float(seconds))
+
+def refill(tokens: float, updated_at: float, now: float, limit: RateLimit, cost: float) -> Tuple[float, bool, float]:
+    """Apply the elapsed refill and try to take `cost` tokens.
+
+    Returns the new token count, whether the request is allowed and how many
+    seconds until it would be.
+    """
+    tokens = min(limit.capacity, tokens + (now - updated_at) * limit.refill_rate)
+    if tokens >= cost:
+        return tokens - cost, True, 0.0
+    return tokens, False, (cost - tokens) / limit.refill_rate
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    def hit(self, key: str, limit: RateLimit, cost: float = 1.0) -> Tuple[bool, float]:
+        """Consume tokens for `key`; returns (allowed, retry_after_seconds)."""
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process buckets kept in an LRU of at most `max_keys` entries.
+
+    Evicting a bucket forgets its history, which can only make a client's
+    limit more generous, so memory stays bounded even under key floods.
+    """
+
+    def __init__(self, max_keys: Optional[int] = None):
+        self.max_keys = max_keys or settings.RATE_LIMIT_MAX_KEYS
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def hit(self, key: str, limit: RateLimit, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (limit.capacity, now))
+            tokens, allowed, retry_after = refill(tokens, updated_at, now, limit, cost)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+class DatabaseRateLimitBackend(RateLimitBackend):
+    """Buckets stored in the `rate_limit_buckets` table so every worker shares them.
+
+    Taking a token is one conditional UPDATE that refills and decrements
+    in SQL, so concurrent workers cannot both spend the last token (row
+    locks are not needed, and SQLite has none). A missing bucket is
+    inserted; losing that insert to another worker just means trying the
+    UPDATE again.
+    """
+
+    def __init__(self, session_factory=SessionLocal, purge_interval: float = 300.0):
+        self.session_factory = session_factory
+        self.purge_interval = purge_interval
+        self._last_purge = time.time()
+
+    def hit(self, key: str, limit: RateLimit, cost: float = 1.0) -> Tuple[bool, float]:
+        now = time.time()
+        bucket = models.RateLimitBucket
+        refilled = bucket.tokens + (now - bucket.updated_at) * limit.refill_rate
+        refilled = case((refilled > limit.capacity, limit.capacity), else_=refilled)
+        db = self.session_factory()
+        try:
+            while True:
+                taken = db.execute(update(bucket).where(bucket.key == key, refilled >= cost).values(
+                    tokens=refilled - cost,
+                    updated_at=now
+                )).rowcount
+                if taken:
+                    db.commit()
+                    allowed, retry_after = True, 0.0
+                    break
+
+                row = db.query(bucket.tokens, bucket.updated_at).filter(bucket.key == key).first()
+                if row is not None:
+                    db.rollback()
+                    _, allowed, retry_after = refill(row.tokens, row.updated_at, now, limit, cost)
+                    if not allowed:
+                        break
+                    # Refilled since the UPDATE looked: try again
+                    continue
+
+                tokens, allowed, retry_after = refill(limit.capacity, now, now, limit, cost)
+                db.add(bucket(key=key, tokens=tokens, updated_at=now))
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # Another worker created it first
+                    db.rollback()
+                    continue
+                break
+        finally:
+            db.close()
+        if now - self._last_purge > self.purge_interval:
+            self.purge_idle(self.purge_interval)
+        return allowed, retry_after
+
+    def purge_idle(self, idle_seconds: float) -> int:
+        """Delete buckets untouched for `idle_seconds`; they would be full again anyway."""
+        self._last_purge = time.time()
+        db = self.session_factory()
+        try:
+            removed = db.query(models.RateLimitBucket).filter(
+                models.RateLimitBucket.updated_at < self._last_purge - idle_seconds
+            ).delete(synchronize_session=False)
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+def create_rate_limit_backend() -> RateLimitBackend:
+    """Build the backend selected by RATE_LIMIT_BACKEND."""
+    if settings.RATE_LIMIT_BACKEND == "database":
+        return DatabaseRateLimitBackend()
+    if settings.RATE_LIMIT_BACKEND == "memory":
+        return InMemoryRateLimitBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
+
+class RateLimiter:
+    def __init__(self, backend: Optional[RateLimitBackend] = None):
+        self.backend = backend or create_rate_limit_backend()
+        self.enabled = settings.RATE_LIMIT_ENABLED
+
+    def check(self, limit: RateLimit, identifier: Optional[str]) -> None:
+        """Raise 429 with Retry-After if `identifier` has used up `limit`."""
+        if not self.enabled or not identifier:
+            return
+        allowed, retry_after = self.backend.hit(f"{limit.name}:{identifier.lower()}", limit)
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please try again later",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+    def per_ip(self, limit: RateLimit):
+        """Dependency that applies `limit` to the client's IP address."""
+        async def dependency(request: Request) -> None:
+            self.check(limit, client_ip(request))
+        return dependency
+
+def client_ip(request: Request) -> Optional[str]:
+    if settings.TRUST_PROXY_HEADERS:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else None
+
+OTP_PER_IP = RateLimit.parse("otp-ip", settings.RATE_LIMIT_OTP_PER_IP)
+OTP_PER_EMAIL = RateLimit.parse("otp-email", settings.RATE_LIMIT_OTP_PER_EMAIL)
+LOGIN_PER_IP = RateLimit.parse("login-ip", settings.RATE_LIMIT_LOGIN_PER_IP)
+LOGIN_PER_EMAIL = RateLimit.parse("login-email", settings.RATE_LIMIT_LOGIN_PER_EMAIL)
+WALLET_PER_IP = RateLimit.parse("wallet-ip", settings.RATE_LIMIT_WALLET_PER_IP)
+WALLET_PER_ADDRESS = RateLimit.parse("wallet-address", settings.RATE_LIMIT_WALLET_PER_ADDRESS)
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,175 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+import hashlib
+import hmac
+import threading
+import time
+
+from fastapi import Depends, HTTPException, Request, Response, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.core.config import settings
+
+ACCESS_TOKEN_COOKIE = "access_token"
+DEFAULT_KID = "default"
+
+def load_signing_keys() -> Dict[str, str]:
+    """Parse JWT_SIGNING_KEYS ("kid:secret,kid:secret") into a kid -> secret map."""
+    keys = {}
+    for entry in settings.JWT_SIGNING_KEYS.split(","):
+        if not entry.strip():
+            continue
+        kid, _, secret = entry.strip().partition(":")
+        if not secret:
+            raise ValueError(f"JWT signing key '{kid}' has no secret")
+        keys[kid] = secret
+    if not keys:
+        keys[DEFAULT_KID] = settings.JWT_SECRET_KEY
+    return keys
+
+@dataclass(frozen=True)
+class CurrentUser:
+    id: int
+    email: Optional[str] = None
+    wallet_address: Optional[str] = None
+
+class InvalidToken(Exception):
+    """Raised when a token is malformed, expired or signed with an unknown key."""
+
+class TokenVerifier:
+    """Verifies access tokens and remembers recent successes in a bounded LRU.
+
+    The cache is keyed by a SHA-256 digest of the token so raw tokens are not
+    kept in memory, and cached entries still honour the token's expiry.
+    """
+
+    def __init__(self, keys: Optional[Dict[str, str]] = None, active_kid: Optional[str] = None, cache_size: Optional[int] = None):
+        self.keys = keys or load_signing_keys()
+        self.active_kid = active_kid or settings.JWT_ACTIVE_KID or next(iter(self.keys))
+        if self.active_kid not in self.keys:
+            raise ValueError(f"Active JWT key '{self.active_kid}' is not configured")
+        self.algorithm = settings.JWT_ALGORITHM
+        self.cache_size = cache_size or settings.JWT_VERIFY_CACHE_SIZE
+        self._cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create_token(self, data: dict, expires_delta: Optional[timedelta] = None) -> str:
+        from jose import jwt  # python-jose pulls in cryptography; import on first use
+
+        to_encode = data.copy()
+        expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+        to_encode.update({"exp": expire})
+        return jwt.encode(
+            to_encode,
+            self.keys[self.active_kid],
+            algorithm=self.algorithm,
+            headers={"kid": self.active_kid}
+        )
+
+    def verify(self, token: str) -> CurrentUser:
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(digest)
+            if cached is not None:
+                expires_at, user = cached
+                if expires_at > now:
+                    self._cache.move_to_end(digest)
+                    return user
+                del self._cache[digest]
+
+        from jose import JWTError, jwt
+
+        try:
+            kid = jwt.get_unverified_header(token).get("kid", DEFAULT_KID)
+            key = self.keys.get(kid)
+            if key is None:
+                raise InvalidToken(f"Unknown signing key '{kid}'")
+            # Without an expiry a token would be valid (and cached) forever
+            claims = jwt.decode(token, key, algorithms=[self.algorithm], options={"require_exp": True})
+            expires_at = float(claims["exp"])
+            user = CurrentUser(
+                id=int(claims["sub"]),
+                email=claims.get("email"),
+                wallet_address=claims.get("wallet")
+            )
+        except (JWTError, KeyError, TypeError, ValueError) as e:
+            raise InvalidToken(str(e))
+
+        with self._lock:
+            self._cache[digest] = (expires_at, user)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return user
+
+token_verifier = TokenVerifier()
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    return token_verifier.create_token(data, expires_delta)
+
+def create_user_token(user) -> str:
+    """Issue an access token that carries the user's identity claims."""
+    return create_access_token({
+        "sub": str(user.id),
+        "email": user.email,
+        "wallet": user.wallet_address
+    })
+
+def set_auth_cookie(response: Response, token: str) -> None:
+    """Store the token in an HttpOnly cookie so plain links (downloads) are authenticated too."""
+    response.set_cookie(
+        ACCESS_TOKEN_COOKIE,
+        token,
+        max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        httponly=True,
+        samesite="lax",
+        secure=settings.ENVIRONMENT != "development"
+    )
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+async def get_current_user(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme)
+) -> CurrentUser:
+    """Authenticate the request from its bearer token or auth cookie."""
+    token = credentials.credentials if credentials else request.cookies.get(ACCESS_TOKEN_COOKIE)
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        user = token_verifier.verify(token)
+    except InvalidToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    request.state.user = user
+    return user
+
+def ensure_same_user(current_user: CurrentUser, user_id: Optional[int]) -> int:
+    """Reject requests that name a different user than the authenticated one."""
+    if user_id is not None and user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not allowed to access another user's data"
+        )
+    return current_user.id
+
+def is_admin_token(supplied: Optional[str]) -> bool:
+    """Check a token against ADMIN_API_TOKEN; always False while it is unset."""
+    expected = settings.ADMIN_API_TOKEN
+    return bool(expected) and hmac.compare_digest((supplied or "").encode(), expected.encode())
+
+def require_admin(request: Request) -> None:
+    """Guard operator endpoints with the ADMIN_API_TOKEN shared secret."""
+    if not is_admin_token(request.headers.get("X-Admin-Token")):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
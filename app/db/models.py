@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, JSON, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, JSON, Text, Float, BigInteger
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base, TimestampMixin
@@ -22,7 +22,12 @@ class User(Base, TimestampMixin):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    last_login = Column(DateTime(timezone=True), nullable=True)
+    last_login = Column(DateTime(timezone=True), nullable=True, index=True)
+    
+    # Inactivity (dead-man's-switch) tracking
+    checkin_interval_days = Column(Integer, nullable=True)  # None means the platform default
+    inactivity_deadline = Column(DateTime(timezone=True), nullable=True, index=True)
+    inactivity_stage = Column(Integer, default=0, server_default="0")  # number of reminders already sent
     
     # Profile information
     full_name = Column(String, nullable=True)
@@ -48,7 +53,25 @@ class DigitalAsset(Base, TimestampMixin):
     file_path = Column(String)
     blockchain_hash = Column(String)
     asset_metadata = Column(JSON)
-    encryption_key = Column(String)
+    encryption_key = Column(String)  # legacy plaintext data key, cleared once wrapped
+    file_size = Column(BigInteger, nullable=True)  # plaintext bytes, counted against the owner's quota
+    ingest_status = Column(String, nullable=True, index=True)  # processing, failed; NULL once stored
+    ingest_claim = Column(String(32), nullable=True)  # token of the worker processing this upload
+    ingest_claimed_at = Column(DateTime, nullable=True)
+    
+    # Envelope encryption: the data key wrapped under master key `key_id`
+    wrapped_key = Column(Text, nullable=True)
+    key_id = Column(String, nullable=True, index=True)
+    
+    # Integrity scrubbing: SHA-256 of the stored ciphertext and the last scrub outcome
+    ciphertext_digest = Column(String(64), nullable=True)
+    integrity_status = Column(String, nullable=True, index=True)  # ok, corrupt, missing
+    integrity_checked_at = Column(DateTime, nullable=True)
+    
+    # Merkle anchoring: blockchain_hash is the leaf, the batch holds the anchored root
+    anchor_batch_id = Column(Integer, ForeignKey("anchor_batches.id"), nullable=True, index=True)
+    merkle_leaf_index = Column(Integer, nullable=True)
+    merkle_proof = Column(JSON, nullable=True)
     
     # Relationships
     owner = relationship("User", back_populates="digital_assets")
@@ -80,8 +103,48 @@ class ScheduledMessage(Base, TimestampMixin):
     message_content = Column(Text)
     delivery_date = Column(DateTime)
     is_delivered = Column(Boolean, default=False)
-    encryption_key = Column(String)
+    encryption_key = Column(String)  # legacy plaintext data key, cleared once wrapped
+    wrapped_key = Column(Text, nullable=True)
+    key_id = Column(String, nullable=True, index=True)
     blockchain_hash = Column(String)
     
     # Relationships
-    owner = relationship("User", back_populates="scheduled_messages") 
\ No newline at end of file
+    owner = relationship("User", back_populates="scheduled_messages") 
+
+class AnchorBatch(Base, TimestampMixin):
+    __tablename__ = "anchor_batches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    merkle_root = Column(String, unique=True, index=True, nullable=False)
+    transaction_hash = Column(String, nullable=True)
+    leaf_count = Column(Integer, nullable=False)
+
+class ScrubCheckpoint(Base):
+    __tablename__ = "scrub_checkpoints"
+
+    name = Column(String, primary_key=True)
+    last_asset_id = Column(Integer, default=0, nullable=False)
+    pass_started_at = Column(DateTime, nullable=True)
+    last_pass_completed_at = Column(DateTime, nullable=True)
+
+class Lease(Base):
+    __tablename__ = "leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class OTPCode(Base):
+    __tablename__ = "otp_codes"
+
+    email = Column(String, primary_key=True)
+    otp_hash = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column(Float, nullable=False, index=True)  # unix time of the last refill
@@ -0,0 +1,122 @@
+from datetime import datetime
+from typing import List, Optional
+import hashlib
+import logging
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.schema import CreateColumn
+
+from app.db import models  # noqa: F401 - registers the tables on Base.metadata
+from app.db.base import Base
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+# Kept outside Base.metadata so it never contributes to the fingerprint
+_state_metadata = MetaData()
+schema_state = Table(
+    "schema_state",
+    _state_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("fingerprint", String(64), nullable=False),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+def metadata_fingerprint(metadata: MetaData = Base.metadata) -> str:
+    """Hash the tables, columns and indexes the models declare."""
+    digest = hashlib.sha256()
+    for table in metadata.sorted_tables:
+        digest.update(f"table {table.name}\n".encode())
+        for column in table.columns:
+            digest.update(f"{column.name} {column.type} {column.nullable} {column.primary_key}\n".encode())
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            digest.update(f"index {index.name} {[c.name for c in index.columns]} {index.unique}\n".encode())
+    return digest.hexdigest()
+
+def applied_fingerprint(bind=None) -> Optional[str]:
+    """Return the fingerprint recorded by the last schema update, if any."""
+    with (bind or engine).connect() as conn:
+        if not inspect(conn).has_table(schema_state.name):
+            return None
+        return conn.execute(select(schema_state.c.fingerprint).where(schema_state.c.id == 1)).scalar()
+
+class SchemaOutOfDate(RuntimeError):
+    """The live database lacks columns the models declare and that cannot be added in place."""
+
+def _addable(column: Column) -> bool:
+    # Existing rows need a value: NULL, or a default the database fills in
+    return not column.primary_key and (column.nullable or column.server_default is not None)
+
+def upgrade_tables(bind, metadata: MetaData = Base.metadata) -> List[str]:
+    """Add the columns and indexes that tables created by an older release are missing.
+
+    create_all() only creates whole tables, so a column added to a model
+    would otherwise never reach an existing database. Nullable columns and
+    ones with a server_default are added with ALTER TABLE; anything else
+    is returned as "table.column" for a manual migration.
+    """
+    unresolved = []
+    with bind.begin() as conn:
+        inspector = inspect(conn)
+        preparer = conn.dialect.identifier_preparer
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                if not _addable(column):
+                    unresolved.append(f"{table.name}.{column.name}")
+                    continue
+                spec = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {spec}"))
+                logger.info(f"Added column {table.name}.{column.name}")
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes and all(column.name in existing or _addable(column) for column in index.columns):
+                    index.create(conn)
+                    logger.info(f"Added index {index.name}")
+    return unresolved
+
+def ensure_schema(bind=None, metadata: MetaData = Base.metadata) -> bool:
+    """Bring the database up to the models unless this exact schema was already applied.
+
+    Every worker calls this at start-up, but only the first one after a
+    deploy that changed the models does any DDL; the rest pay for a single
+    indexed lookup. Missing tables are created and missing columns added;
+    the fingerprint is only recorded once the live schema matches, and
+    SchemaOutOfDate is raised otherwise. Returns True when DDL was checked.
+    """
+    bind = bind or engine
+    fingerprint = metadata_fingerprint(metadata)
+    if applied_fingerprint(bind) == fingerprint:
+        return False
+
+    try:
+        metadata.create_all(bind=bind)
+        unresolved = upgrade_tables(bind, metadata)
+        if unresolved:
+            raise SchemaOutOfDate(f"Columns need a manual migration: {', '.join(unresolved)}")
+        _state_metadata.create_all(bind=bind)
+        with bind.begin() as conn:
+            values = {"fingerprint": fingerprint, "applied_at": datetime.utcnow()}
+            updated = conn.execute(schema_state.update().where(schema_state.c.id == 1).values(**values)).rowcount
+            if not updated:
+                conn.execute(schema_state.insert().values(id=1, **values))
+    except DatabaseError:
+        # Another worker raced us through the same update
+        if applied_fingerprint(bind) == fingerprint:
+            return False
+        raise
+    logger.info(f"Database schema updated to {fingerprint[:12]}")
+    return True
+
+if __name__ == "__main__":
+    from app.core.log_config import configure_logging
+
+    # Deploy step: apply the schema once, then start workers with SCHEMA_AUTO_CREATE=false
+    configure_logging()
+    if not ensure_schema():
+        logger.info("Database schema already up to date")
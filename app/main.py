@@ -1,29 +1,79 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
-import uvicorn
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import hmac
+import logging
 
 from app.core.config import settings
-from app.api.v1 import auth, assets, access_rules, messages, users
-from app.db.session import engine
-from app.db.base import Base
+from app.core.log_config import RequestIdMiddleware, configure_logging
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.pages import pages, static_assets
+from app.core.profiling import ProfilingMiddleware
+from app.api.v1 import auth, assets, access_rules, messages, users, integrity, profiles
+from app.db.schema import applied_fingerprint, ensure_schema, metadata_fingerprint
+from app.services.inactivity import inactivity_service
+from app.services.ingest import ingest_queue
+from app.services.mail_queue import mail_queue
+from app.services.scrubber import integrity_scrubber
+from app.services.password_hasher import password_hasher
+from app.services.key_manager import key_manager
+from app.services.health import deep_health
+from app.services.realtime import realtime
+from app.blockchain.web3_client import web3_client
+from app.blockchain.anchoring import anchor_batcher
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start-up and shutdown work; nothing here runs at import time."""
+    configure_logging()
+    settings.log_summary()
+    key_manager.master_keys  # Fail at start-up, not on the first upload, when MASTER_KEYS is missing
+    pages.preload("landing.html", "index.html")
+    if settings.SCHEMA_AUTO_CREATE:
+        ensure_schema()
+    elif applied_fingerprint() != metadata_fingerprint():
+        logger.warning("Database schema differs from the models; run `python -m app.db.schema`")
+
+    realtime.start()
+
+    # Start periodic background jobs
+    inactivity_task = asyncio.create_task(inactivity_service.run_periodic())
+    mail_queue.start()
+    ingest_queue.requeue_processing()
+    anchor_task = asyncio.create_task(anchor_batcher.run_periodic())
+    scrub_task = asyncio.create_task(integrity_scrubber.run_periodic()) if settings.SCRUB_ENABLED else None
+    try:
+        yield
+    finally:
+        # Finish accepted uploads, then flush pending anchors and queued mail before the worker exits
+        await ingest_queue.stop()
+        inactivity_task.cancel()
+        anchor_task.cancel()
+        if scrub_task is not None:
+            integrity_scrubber.stop()
+            scrub_task.cancel()
+        await anchor_batcher.flush()
+        await mail_queue.stop()
+        await web3_client.close()
 
 app = FastAPI(
     title=settings.APP_NAME,
     description="Digital Legacy Management System",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Fingerprinted, precompressed static files
+app.mount("/static", static_assets, name="static")
 
-# Templates
-templates = Jinja2Templates(directory="app/templates")
+# Socket.IO push channel; clients connect to /socket.io
+app.mount("/socket.io", realtime, name="socket.io")
+inactivity_service.add_listener(realtime.inactivity_listener)
 
 # CORS middleware
 app.add_middleware(
@@ -34,33 +84,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request SQL accounting, Server-Timing and opt-in profiles
+app.add_middleware(ProfilingMiddleware)
+
+# Latency covers every middleware below; only request-ID tagging sits outside it
+app.add_middleware(MetricsMiddleware)
+
+# Request IDs for log records and the X-Request-ID response header.
+# Outermost, so records logged by the metrics and profiling middleware carry the ID too.
+app.add_middleware(RequestIdMiddleware)
+
+# Subsystem counters, read at scrape time
+registry.register_stats("password_hash", password_hasher.stats)
+registry.register_stats("mail_queue", mail_queue.stats)
+registry.register_stats("ingest", ingest_queue.stats)
+registry.register_stats("rpc", web3_client.rpc_batcher.stats)
+registry.register_stats("dek_cache", key_manager.stats)
+registry.register_stats("integrity_scrub", integrity_scrubber.stats)
+registry.register_stats("anchor", lambda: {"pending": len(anchor_batcher)})
+
 # Include API routes
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(assets.router, prefix="/api/v1/assets", tags=["assets"])
 app.include_router(access_rules.router, prefix="/api/v1/access-rules", tags=["access-rules"])
 app.include_router(messages.router, prefix="/api/v1/messages", tags=["messages"])
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
+app.include_router(integrity.router, prefix="/api/v1/integrity", tags=["integrity"])
+app.include_router(profiles.router, prefix="/api/v1/profiles", tags=["profiles"])
 
 @app.get("/", response_class=HTMLResponse)
 async def root(request: Request):
-    """Render the landing page."""
-    return templates.TemplateResponse(
-        "landing.html",
-        {"request": request, "title": settings.APP_NAME}
-    )
+    """Serve the prerendered landing page."""
+    return pages.response("landing.html", request)
 
 @app.get("/app", response_class=HTMLResponse)
 async def app_page(request: Request):
-    """Render the main application page."""
-    return templates.TemplateResponse(
-        "index.html",
-        {"request": request, "title": settings.APP_NAME}
-    )
+    """Serve the prerendered application page."""
+    return pages.response("index.html", request)
 
 @app.get("/api/v1/health")
 async def health_check():
     """Health check endpoint."""
     return JSONResponse({"status": "healthy"})
 
+@app.get("/api/v1/health/deep")
+async def deep_health_check():
+    """Probe the database and upload storage; 503 if either is unusable."""
+    report = await run_in_threadpool(deep_health)
+    return JSONResponse(report, status_code=200 if report["status"] == "healthy" else 503)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus scrape endpoint."""
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("Not Found", status_code=404)
+    if settings.METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+            return PlainTextResponse("Forbidden", status_code=403)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
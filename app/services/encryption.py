@@ -1,40 +1,72 @@
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives.asymmetric import padding
-from cryptography.hazmat.primitives import serialization
+from typing import Callable, Optional
 import base64
+import hashlib
+import math
 import os
 import logging
+import time
+
+from app.core.config import settings
+from app.core.metrics import ENCRYPTION_BYTES, ENCRYPTION_LATENCY
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 64 * 1024  # plaintext bytes per Fernet token
+
+def fernet_token_length(plaintext_length: int) -> int:
+    """Length of the Fernet token for a plaintext of the given size."""
+    # version + timestamp + IV + PKCS7-padded ciphertext + HMAC, base64 encoded
+    raw = 1 + 8 + 16 + 16 * (plaintext_length // 16 + 1) + 32
+    return 4 * math.ceil(raw / 3)
+
+ENCRYPTED_CHUNK_SIZE = fernet_token_length(CHUNK_SIZE)
+
 class EncryptionService:
-    def __init__(self):
-        self.salt = os.urandom(16)
-        self._ensure_encryption_key()
+    """File and data encryption with Fernet.
+
+    Files get their own data keys (see key_manager for how those are
+    wrapped). In DEBUG the key file can stand in for MASTER_KEYS; it and
+    cryptography are loaded on first use rather than at import.
+    """
+
+    def __init__(self, key_path: str = "encryption_key.key"):
+        self.key_path = key_path
+        self._key = None
+    
+    @property
+    def key(self) -> bytes:
+        if self._key is None:
+            self._ensure_encryption_key()
+        return self._key
     
     def _ensure_encryption_key(self):
-        """Ensure encryption key exists or create a new one."""
-        key_path = "encryption_key.key"
-        if os.path.exists(key_path):
-            with open(key_path, "rb") as key_file:
-                self.key = key_file.read()
-        else:
-            self.key = Fernet.generate_key()
-            with open(key_path, "wb") as key_file:
-                key_file.write(self.key)
+        """Load the key file. It is never generated here: a fresh key would orphan every wrapped data key."""
+        if not os.path.exists(self.key_path):
+            raise RuntimeError(
+                f"Encryption key file {self.key_path} not found; set MASTER_KEYS "
+                "(generate a key with `python -c 'from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())'`)"
+            )
+        with open(self.key_path, "rb") as key_file:
+            self._key = key_file.read()
     
     def generate_key(self) -> bytes:
         """Generate a new encryption key."""
+        from cryptography.fernet import Fernet
         return Fernet.generate_key()
     
-    def derive_key(self, password: str) -> bytes:
-        """Derive an encryption key from a password."""
+    def derive_key(self, password: str, salt: Optional[bytes] = None) -> bytes:
+        """Derive an encryption key from a password.
+
+        Without an explicit salt one is derived from SECRET_KEY, so every
+        worker derives the same key for the same password.
+        """
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
         kdf = PBKDF2HMAC(
             algorithm=hashes.SHA256(),
             length=32,
-            salt=self.salt,
+            salt=salt or hashlib.sha256(f"derive_key:{settings.SECRET_KEY}".encode()).digest()[:16],
             iterations=100000,
         )
         key = base64.urlsafe_b64encode(kdf.derive(password.encode()))
@@ -42,58 +74,106 @@ class EncryptionService:
     
     def encrypt_data(self, data: bytes, key: bytes) -> bytes:
         """Encrypt data using the provided key."""
+        from cryptography.fernet import Fernet
         f = Fernet(key)
         return f.encrypt(data)
     
     def decrypt_data(self, encrypted_data: bytes, key: bytes) -> bytes:
         """Decrypt data using the provided key."""
+        from cryptography.fernet import Fernet
         f = Fernet(key)
         return f.decrypt(encrypted_data)
     
-    def encrypt_file(self, file_path: str) -> tuple[str, bytes]:
-        """Encrypt a file and return the path to the encrypted file and the encryption key."""
+    def encrypt_file(self, file_path: str, progress: Optional[Callable[[int], None]] = None) -> tuple[str, bytes, str]:
+        """Encrypt a file and return the encrypted path, the encryption key and a SHA-256 of the ciphertext.
+
+        `progress`, if given, is called with the plaintext bytes done after each chunk.
+        """
+        from cryptography.fernet import Fernet
+
         try:
             # Generate a unique key for this file
             file_key = self.generate_key()
             f = Fernet(file_key)
+            digest = hashlib.sha256()
             
             # Read the file in chunks to handle large files
-            chunk_size = 64 * 1024  # 64KB chunks
             encrypted_path = f"{file_path}.encrypted"
+            start = time.perf_counter()
+            plaintext_bytes = 0
             
             with open(file_path, 'rb') as infile, open(encrypted_path, 'wb') as outfile:
                 while True:
-                    chunk = infile.read(chunk_size)
+                    chunk = infile.read(CHUNK_SIZE)
                     if not chunk:
                         break
                     encrypted_chunk = f.encrypt(chunk)
+                    digest.update(encrypted_chunk)
                     outfile.write(encrypted_chunk)
+                    plaintext_bytes += len(chunk)
+                    if progress is not None:
+                        progress(plaintext_bytes)
             
-            logger.info(f"Successfully encrypted file: {file_path}")
-            return encrypted_path, file_key
+            ENCRYPTION_BYTES.inc(plaintext_bytes, operation="encrypt")
+            ENCRYPTION_LATENCY.observe(time.perf_counter() - start, operation="encrypt")
+            logger.debug(f"Successfully encrypted file: {file_path}")
+            return encrypted_path, file_key, digest.hexdigest()
             
         except Exception as e:
             logger.error(f"Error encrypting file {file_path}: {str(e)}")
             raise Exception(f"Failed to encrypt file: {str(e)}")
     
+    def iter_encrypted_chunks(self, encrypted_file_path: str):
+        """Yield the Fernet tokens of an encrypted file one at a time."""
+        with open(encrypted_file_path, 'rb') as infile:
+            while True:
+                # Every token but the last holds exactly CHUNK_SIZE bytes of plaintext
+                token = infile.read(ENCRYPTED_CHUNK_SIZE)
+                if not token:
+                    break
+                yield token
+    
+    def verify_token_tag(self, token: bytes, key: bytes) -> bool:
+        """Check a Fernet token's HMAC without decrypting it."""
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives import hashes, hmac
+
+        try:
+            data = base64.urlsafe_b64decode(token)
+        except (ValueError, TypeError):
+            return False
+        if len(data) < 57:
+            return False
+        signing_key = base64.urlsafe_b64decode(key)[:16]
+        h = hmac.HMAC(signing_key, hashes.SHA256())
+        h.update(data[:-32])
+        try:
+            h.verify(data[-32:])
+            return True
+        except InvalidSignature:
+            return False
+    
     def decrypt_file(self, encrypted_file_path: str, key: bytes) -> str:
         """Decrypt a file and return the path to the decrypted file."""
+        from cryptography.fernet import Fernet
+
         try:
             f = Fernet(key)
             decrypted_path = encrypted_file_path.replace('.encrypted', '')
             
-            # Read and decrypt in chunks
-            chunk_size = 64 * 1024  # 64KB chunks
+            start = time.perf_counter()
+            plaintext_bytes = 0
             
-            with open(encrypted_file_path, 'rb') as infile, open(decrypted_path, 'wb') as outfile:
-                while True:
-                    chunk = infile.read(chunk_size)
-                    if not chunk:
-                        break
-                    decrypted_chunk = f.decrypt(chunk)
-                    outfile.write(decrypted_chunk)
+            # Read and decrypt token by token
+            with open(decrypted_path, 'wb') as outfile:
+                for token in self.iter_encrypted_chunks(encrypted_file_path):
+                    chunk = f.decrypt(token)
+                    outfile.write(chunk)
+                    plaintext_bytes += len(chunk)
             
-            logger.info(f"Successfully decrypted file: {encrypted_file_path}")
+            ENCRYPTION_BYTES.inc(plaintext_bytes, operation="decrypt")
+            ENCRYPTION_LATENCY.observe(time.perf_counter() - start, operation="decrypt")
+            logger.debug(f"Successfully decrypted file: {encrypted_file_path}")
             return decrypted_path
             
         except Exception as e:
@@ -0,0 +1,52 @@
+from typing import Dict
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+def check_database(bind=None) -> Dict:
+    """Run a trivial query and report how long the round trip took."""
+    start = time.perf_counter()
+    try:
+        with (bind or engine).connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error(f"Database health check failed: {str(e)}")
+        return {"ok": False, "error": str(e)}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+def check_storage(path: str = None, min_free_bytes: int = None) -> Dict:
+    """Check that the upload directory is writable and has room left."""
+    path = path or settings.UPLOAD_DIR
+    min_free_bytes = settings.HEALTH_MIN_FREE_BYTES if min_free_bytes is None else min_free_bytes
+    start = time.perf_counter()
+    try:
+        os.makedirs(path, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path, prefix=".health-") as probe:
+            probe.write(b"ok")
+            probe.flush()
+            os.fsync(probe.fileno())
+        free_bytes = shutil.disk_usage(path).free
+    except OSError as e:
+        logger.error(f"Storage health check failed: {str(e)}")
+        return {"ok": False, "error": str(e)}
+    return {
+        "ok": free_bytes >= min_free_bytes,
+        "free_bytes": free_bytes,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 2)
+    }
+
+def deep_health() -> Dict:
+    checks = {"database": check_database(), "storage": check_storage()}
+    return {
+        "status": "healthy" if all(check["ok"] for check in checks.values()) else "unhealthy",
+        "checks": checks
+    }
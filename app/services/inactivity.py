@@ -0,0 +1,178 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import asyncio
+import logging
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+REMINDER = "reminder"
+ESCALATION = "escalation"
+
+@dataclass
+class InactivityEvent:
+    kind: str  # reminder or escalation
+    user_id: int
+    stage: int
+    deadline: datetime
+
+InactivityListener = Callable[[List[InactivityEvent]], None]
+
+class InactivityService:
+    """Dead-man's-switch tracking driven by the indexed `users.inactivity_deadline` column.
+
+    Every user carries the time of their next inactivity event. A sweep only
+    reads rows whose deadline has passed (an index range scan), emits one event
+    per row and moves the deadline forward, so processed users leave the range
+    and the periodic cost is proportional to the number of due users.
+    """
+
+    def __init__(self):
+        self.default_interval = timedelta(days=settings.INACTIVITY_DEFAULT_CHECKIN_DAYS)
+        self.reminder_grace = timedelta(days=settings.INACTIVITY_REMINDER_GRACE_DAYS)
+        self.max_reminders = settings.INACTIVITY_MAX_REMINDERS
+        self.batch_size = settings.INACTIVITY_SWEEP_BATCH_SIZE
+        self.listeners: List[InactivityListener] = [self._log_events]
+
+    def add_listener(self, listener: InactivityListener) -> None:
+        """Register a callback that receives each batch of emitted events."""
+        self.listeners.append(listener)
+
+    def checkin_interval(self, user: models.User) -> timedelta:
+        """Return the check-in interval configured for the user."""
+        if user.checkin_interval_days:
+            return timedelta(days=user.checkin_interval_days)
+        return self.default_interval
+
+    def record_checkin(self, user: models.User, now: Optional[datetime] = None) -> None:
+        """Mark the user as alive and push their deadline one interval ahead.
+
+        The caller is responsible for committing the session.
+        """
+        now = now or datetime.utcnow()
+        user.last_login = now
+        user.inactivity_deadline = now + self.checkin_interval(user)
+        user.inactivity_stage = 0
+
+    def _next_step(self, stage: int, now: datetime):
+        """Return the event kind, new stage and new deadline for a due user."""
+        if stage < self.max_reminders:
+            return REMINDER, stage + 1, now + self.reminder_grace
+        # Escalated users have no further deadline until they check in again
+        return ESCALATION, stage + 1, None
+
+    def sweep(self, db: Session, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Emit events for every user whose deadline has passed, in batches."""
+        now = now or datetime.utcnow()
+        counts = {REMINDER: 0, ESCALATION: 0}
+
+        while True:
+            due = db.query(
+                models.User.id,
+                models.User.inactivity_deadline,
+                models.User.inactivity_stage
+            ).filter(
+                models.User.inactivity_deadline <= now
+            ).order_by(
+                models.User.inactivity_deadline, models.User.id
+            ).limit(self.batch_size).all()
+
+            if not due:
+                break
+
+            events = []
+            for user_id, deadline, stage in due:
+                kind, new_stage, new_deadline = self._next_step(stage or 0, now)
+                # Conditional update so concurrent sweepers never emit the same event twice
+                claimed = db.query(models.User).filter(
+                    models.User.id == user_id,
+                    models.User.inactivity_deadline == deadline
+                ).update(
+                    {"inactivity_stage": new_stage, "inactivity_deadline": new_deadline},
+                    synchronize_session=False
+                )
+                if claimed:
+                    events.append(InactivityEvent(kind=kind, user_id=user_id, stage=new_stage, deadline=deadline))
+            db.commit()
+
+            if not events:
+                # Every row in the batch was claimed by another sweeper
+                break
+            for event in events:
+                counts[event.kind] += 1
+            self._dispatch(events)
+
+        return counts
+
+    def backfill_deadlines(self, db: Session) -> int:
+        """Give users without a deadline one based on their last activity."""
+        updated = 0
+        while True:
+            users = db.query(models.User).filter(
+                models.User.inactivity_deadline.is_(None),
+                # Rows from before the column existed may hold NULL rather than 0
+                or_(models.User.inactivity_stage.is_(None), models.User.inactivity_stage == 0)
+            ).order_by(models.User.id).limit(self.batch_size).all()
+            if not users:
+                break
+            for user in users:
+                last_seen = user.last_login or user.created_at or datetime.utcnow()
+                user.inactivity_deadline = last_seen.replace(tzinfo=None) + self.checkin_interval(user)
+                user.inactivity_stage = 0
+            db.commit()
+            updated += len(users)
+        return updated
+
+    def _dispatch(self, events: List[InactivityEvent]) -> None:
+        for listener in self.listeners:
+            try:
+                listener(events)
+            except Exception as e:
+                logger.error(f"Inactivity listener failed: {str(e)}")
+
+    def _log_events(self, events: List[InactivityEvent]) -> None:
+        for event in events:
+            logger.info(f"Inactivity {event.kind} for user {event.user_id} (stage {event.stage})")
+
+    def sweep_once(self) -> Dict[str, int]:
+        """Run a single sweep with its own database session."""
+        db = SessionLocal()
+        try:
+            return self.sweep(db)
+        finally:
+            db.close()
+
+    async def run_periodic(self) -> None:
+        """Sweep forever at the configured interval."""
+        while True:
+            try:
+                counts = await run_in_threadpool(self.sweep_once)
+                if any(counts.values()):
+                    logger.info(f"Inactivity sweep finished: {counts}")
+            except Exception as e:
+                logger.error(f"Inactivity sweep failed: {str(e)}")
+            await asyncio.sleep(settings.INACTIVITY_SWEEP_INTERVAL_SECONDS)
+
+inactivity_service = InactivityService()
+
+if __name__ == "__main__":
+    import sys
+    from app.core.log_config import configure_logging
+
+    configure_logging()
+    db = SessionLocal()
+    try:
+        if len(sys.argv) > 1 and sys.argv[1] == "backfill":
+            print(f"Backfilled {inactivity_service.backfill_deadlines(db)} users")
+        else:
+            print(inactivity_service.sweep(db))
+    finally:
+        db.close()
@@ -0,0 +1,197 @@
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import asyncio
+import logging
+import os
+import uuid
+
+from sqlalchemy import or_, update
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.blockchain.anchoring import ASSET, anchor_batcher
+from app.blockchain.web3_client import web3_client
+from app.db import models
+from app.db.session import SessionLocal
+from app.services.encryption import encryption_service
+from app.services.key_manager import key_manager
+from app.services.realtime import ASSET_CREATED, ASSET_FAILED, realtime
+from app.services.storage import object_store
+
+logger = logging.getLogger(__name__)
+
+# DigitalAsset.ingest_status; NULL means stored and ready
+PROCESSING = "processing"
+FAILED = "failed"
+READY = "ready"
+
+def encrypt_and_store(plain_path: str, progress: Optional[Callable[[int], None]] = None) -> Dict[str, Optional[str]]:
+    """Encrypt a plaintext upload into the object store; returns the columns to set on its asset."""
+    encrypted_path, encryption_key, ciphertext_digest = encryption_service.encrypt_file(plain_path, progress)
+    # Encrypted beside the upload, then renamed into the store under an opaque ID
+    stored_path = object_store.put(encrypted_path)
+    # Only the wrapped form of the data key is stored
+    wrapped_key, key_id = key_manager.wrap(encryption_key)
+    try:
+        with open(plain_path, 'rb') as f:
+            content = f.read()
+        # Anchored later as a leaf of a batched Merkle root
+        blockchain_hash = web3_client.hash_content(str(content))
+    except Exception as e:
+        logger.error(f"Error creating blockchain hash: {str(e)}")
+        blockchain_hash = None
+    return {
+        "file_path": stored_path,
+        "wrapped_key": wrapped_key,
+        "key_id": key_id,
+        "ciphertext_digest": ciphertext_digest,
+        "blockchain_hash": blockchain_hash
+    }
+
+def asset_summary(asset: models.DigitalAsset) -> Dict:
+    metadata = asset.asset_metadata or {}
+    return {
+        "asset_id": asset.id,
+        "title": asset.title,
+        "file_size": asset.file_size,
+        "content_type": asset.asset_type,
+        "original_filename": metadata.get("original_name")
+    }
+
+class IngestQueue:
+    """Background processing for uploads acknowledged with 202 Accepted.
+
+    Before the client gets its answer the streamed plaintext is fsynced in
+    UPLOAD_DIR and its asset row committed as `processing`, pointing at
+    it. Workers then encrypt, store, hash and anchor it and clear the
+    status. Rows left processing by a restart are requeued at start-up;
+    a failure marks the row `failed` and drops the plaintext.
+
+    Every worker of every process may requeue the same rows, so a row is
+    claimed with a conditional UPDATE before any work, and the result is
+    only written while the claim still holds. A claim older than
+    INGEST_CLAIM_TIMEOUT_SECONDS belongs to a dead worker and is retaken.
+    """
+
+    def __init__(self, session_factory=SessionLocal, workers: Optional[int] = None):
+        self.session_factory = session_factory
+        self.workers = workers or settings.INGEST_WORKERS
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stats = {"queued": 0, "stored": 0, "failed": 0}
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "depth": self._queue.qsize() if self._queue else 0}
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Finish what is already queued, then stop the workers."""
+        if not self._tasks:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, asset_id: int) -> None:
+        self.start()
+        self._queue.put_nowait(asset_id)
+        self._stats["queued"] += 1
+
+    def _claimable(self):
+        stale = datetime.utcnow() - timedelta(seconds=settings.INGEST_CLAIM_TIMEOUT_SECONDS)
+        return or_(models.DigitalAsset.ingest_claim.is_(None), models.DigitalAsset.ingest_claimed_at < stale)
+
+    def requeue_processing(self) -> int:
+        """Queue rows that were accepted but not finished before a restart."""
+        db = self.session_factory()
+        try:
+            ids = [asset_id for (asset_id,) in db.query(models.DigitalAsset.id).filter(
+                models.DigitalAsset.ingest_status == PROCESSING,
+                self._claimable()
+            ).order_by(models.DigitalAsset.id).all()]
+        finally:
+            db.close()
+        for asset_id in ids:
+            self.enqueue(asset_id)
+        return len(ids)
+
+    def claim(self, db, asset_id: int) -> Optional[str]:
+        """Take an accepted upload for this worker; returns the claim token, or None if it is not ours to do."""
+        token = uuid.uuid4().hex
+        claimed = db.execute(update(models.DigitalAsset).where(
+            models.DigitalAsset.id == asset_id,
+            models.DigitalAsset.ingest_status == PROCESSING,
+            self._claimable()
+        ).values(ingest_claim=token, ingest_claimed_at=datetime.utcnow())).rowcount
+        db.commit()
+        return token if claimed else None
+
+    def _finish(self, db, asset_id: int, token: str, **values) -> bool:
+        # Written only while our claim holds, so a worker that lost it never overwrites the winner
+        finished = db.execute(update(models.DigitalAsset).where(
+            models.DigitalAsset.id == asset_id,
+            models.DigitalAsset.ingest_status == PROCESSING,
+            models.DigitalAsset.ingest_claim == token
+        ).values(ingest_claim=None, ingest_claimed_at=None, **values)).rowcount
+        db.commit()
+        return bool(finished)
+
+    async def _worker(self) -> None:
+        while True:
+            asset_id = await self._queue.get()
+            try:
+                blockchain_hash = await run_in_threadpool(self.process, asset_id)
+                if blockchain_hash:
+                    anchor_batcher.submit(ASSET, asset_id, blockchain_hash)
+            except Exception as e:
+                logger.error(f"Ingest worker error on asset {asset_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def process(self, asset_id: int) -> Optional[str]:
+        """Encrypt and store one accepted upload; returns its content hash for anchoring."""
+        db = self.session_factory()
+        try:
+            token = self.claim(db, asset_id)
+            if token is None:
+                return None
+            asset = db.get(models.DigitalAsset, asset_id)
+            owner_id, spool_path, file_size = asset.owner_id, asset.file_path, asset.file_size
+            report = realtime.progress(owner_id, asset_id=asset_id)
+            try:
+                stored = encrypt_and_store(spool_path, lambda done: report("encrypting", done, file_size))
+            except Exception as e:
+                logger.error(f"Ingest of asset {asset_id} failed: {str(e)}")
+                if self._finish(db, asset_id, token, ingest_status=FAILED, file_path=None):
+                    self._remove(spool_path)
+                    self._stats["failed"] += 1
+                    realtime.publish(owner_id, ASSET_FAILED, {"asset_id": asset_id})
+                return None
+
+            if not self._finish(db, asset_id, token, ingest_status=None, **stored):
+                # Our claim was retaken (or the asset deleted) meanwhile: the row is not ours to write
+                logger.warning(f"Lost the claim on asset {asset_id}, discarding this copy")
+                self._remove(stored["file_path"])
+                return None
+            self._remove(spool_path)
+            self._stats["stored"] += 1
+            logger.info(f"Stored asset {asset_id} in the background")
+            db.expire(asset)
+            realtime.publish(owner_id, ASSET_CREATED, asset_summary(asset))
+            return stored["blockchain_hash"]
+        finally:
+            db.close()
+
+    def _remove(self, path: Optional[str]) -> None:
+        if path and os.path.exists(path):
+            os.remove(path)
+
+ingest_queue = IngestQueue()
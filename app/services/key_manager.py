@@ -0,0 +1,195 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import logging
+import threading
+import time
+
+from sqlalchemy import and_, or_
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+from app.services.encryption import encryption_service
+
+logger = logging.getLogger(__name__)
+
+FILE_KEY_ID = "file"
+ENVELOPED_MODELS = (models.DigitalAsset, models.ScheduledMessage)
+
+def load_master_keys() -> Dict[str, bytes]:
+    """Parse MASTER_KEYS ("id:fernet-key,id:fernet-key") into an id -> key map.
+
+    MASTER_KEYS is required outside DEBUG. In DEBUG an existing local
+    encryption_key.key file may stand in for it, under the id "file".
+    """
+    keys = {}
+    for entry in settings.MASTER_KEYS.split(","):
+        if not entry.strip():
+            continue
+        key_id, _, key = entry.strip().partition(":")
+        if not key:
+            raise ValueError(f"Master key '{key_id}' has no key material")
+        keys[key_id] = key.encode()
+    if not keys:
+        if not settings.DEBUG:
+            raise RuntimeError("MASTER_KEYS must be set when DEBUG is off")
+        keys[FILE_KEY_ID] = encryption_service.key.strip()
+    return keys
+
+class KeyManager:
+    """Envelope encryption: per-item data keys wrapped by rotatable master keys.
+
+    Rows store only the wrapped data key and the id of the master key that
+    wrapped it, so rotating a master key rewraps a few hundred bytes per row
+    and never touches the encrypted files. Unwrapped data keys are kept in a
+    bounded TTL/LRU cache so repeated downloads skip the unwrap.
+    """
+
+    def __init__(self, master_keys: Optional[Dict[str, bytes]] = None, active_id: Optional[str] = None,
+                 cache_size: Optional[int] = None, cache_ttl: Optional[float] = None):
+        self._master_keys = master_keys
+        self._active_id = active_id
+        self._fernets = {}
+        self.cache_size = cache_size or settings.DEK_CACHE_SIZE
+        self.cache_ttl = settings.DEK_CACHE_TTL_SECONDS if cache_ttl is None else cache_ttl
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"wrapped": 0, "unwrapped": 0, "cache_hits": 0, "rewrapped": 0}
+
+    @property
+    def master_keys(self) -> Dict[str, bytes]:
+        # Loaded on first use: the DEBUG fallback reads the key file
+        if self._master_keys is None:
+            self._master_keys = load_master_keys()
+        return self._master_keys
+
+    @property
+    def active_id(self) -> str:
+        active_id = self._active_id or settings.MASTER_KEY_ACTIVE_ID or next(iter(self.master_keys))
+        if active_id not in self.master_keys:
+            raise ValueError(f"Active master key '{active_id}' is not configured")
+        return active_id
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "cached_keys": len(self._cache)}
+
+    def _fernet(self, key_id: str):
+        fernet = self._fernets.get(key_id)
+        if fernet is None:
+            from cryptography.fernet import Fernet
+
+            if key_id not in self.master_keys:
+                raise KeyError(f"Unknown master key '{key_id}'")
+            fernet = self._fernets[key_id] = Fernet(self.master_keys[key_id])
+        return fernet
+
+    def wrap(self, data_key: bytes) -> Tuple[str, str]:
+        """Wrap a data key under the active master key; returns (wrapped_key, key_id)."""
+        key_id = self.active_id
+        wrapped = self._fernet(key_id).encrypt(data_key).decode()
+        with self._lock:
+            self._stats["wrapped"] += 1
+        return wrapped, key_id
+
+    def unwrap(self, wrapped_key: str, key_id: str, cache: bool = True) -> bytes:
+        """Return the plaintext data key, from the cache when possible.
+
+        Pass cache=False for one-off scans so they don't evict hot keys.
+        """
+        cache_key = (key_id, wrapped_key)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                expires_at, data_key = cached
+                if expires_at > now:
+                    self._cache.move_to_end(cache_key)
+                    self._stats["cache_hits"] += 1
+                    return data_key
+                del self._cache[cache_key]
+
+        data_key = self._fernet(key_id).decrypt(wrapped_key.encode())
+
+        with self._lock:
+            self._stats["unwrapped"] += 1
+            if cache and self.cache_ttl > 0:
+                self._cache[cache_key] = (now + self.cache_ttl, data_key)
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return data_key
+
+    def data_key(self, wrapped_key: Optional[str], key_id: Optional[str], legacy_key: Optional[str] = None,
+                 cache: bool = True) -> bytes:
+        """Return the data key for a row, accepting rows not yet migrated off plaintext keys."""
+        if wrapped_key:
+            return self.unwrap(wrapped_key, key_id, cache)
+        if legacy_key:
+            return legacy_key.encode()
+        raise ValueError("Row has no data key")
+
+    def data_key_for(self, row) -> bytes:
+        return self.data_key(row.wrapped_key, row.key_id, row.encryption_key)
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def rotate(self, session_factory=SessionLocal, batch_size: Optional[int] = None) -> int:
+        """Rewrap every data key not under the active master key, including legacy plaintext keys.
+
+        Runs in id-ordered batches with one commit each, so it can be
+        interrupted and rerun. Returns the number of rows rewrapped.
+        """
+        batch_size = batch_size or settings.KEY_ROTATION_BATCH_SIZE
+        active_id = self.active_id
+        total = 0
+        for model in ENVELOPED_MODELS:
+            last_id = 0
+            while True:
+                db = session_factory()
+                try:
+                    rows = db.query(model.id, model.wrapped_key, model.key_id, model.encryption_key).filter(
+                        model.id > last_id,
+                        or_(
+                            and_(model.wrapped_key.isnot(None), or_(model.key_id.is_(None), model.key_id != active_id)),
+                            and_(model.wrapped_key.is_(None), model.encryption_key.isnot(None))
+                        )
+                    ).order_by(model.id).limit(batch_size).all()
+                    if not rows:
+                        break
+
+                    updates = []
+                    for row_id, wrapped_key, key_id, legacy_key in rows:
+                        data_key = self.data_key(wrapped_key, key_id or FILE_KEY_ID, legacy_key, cache=False)
+                        new_wrapped, new_key_id = self.wrap(data_key)
+                        updates.append({"id": row_id, "wrapped_key": new_wrapped, "key_id": new_key_id, "encryption_key": None})
+                    db.bulk_update_mappings(model, updates)
+                    db.commit()
+                finally:
+                    db.close()
+
+                last_id = rows[-1][0]
+                total += len(rows)
+                with self._lock:
+                    self._stats["rewrapped"] += len(rows)
+        logger.info(f"Rewrapped {total} data keys under master key '{active_id}'")
+        return total
+
+key_manager = KeyManager()
+
+if __name__ == "__main__":
+    import argparse
+    from app.core.log_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Master key management")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("generate", help="Print a new master key for MASTER_KEYS")
+    subparsers.add_parser("rotate", help="Rewrap all data keys under MASTER_KEY_ACTIVE_ID")
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.command == "generate":
+        print(encryption_service.generate_key().decode())
+    elif args.command == "rotate":
+        print(f"Rewrapped {key_manager.rotate()} data keys")
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+import logging
+import os
+import socket
+import uuid
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+
+from app.db import models
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+class Lease:
+    """A named, expiring lock in the database, so one process of many runs a job.
+
+    `acquire()` takes the lease if it is free or expired, or renews it if
+    this instance already holds it; it is a single conditional UPDATE (or
+    the first INSERT), so two processes can never both win. A holder that
+    dies simply stops renewing, and another takes over after `ttl` seconds.
+    """
+
+    def __init__(self, name: str, ttl: float, session_factory=SessionLocal):
+        self.name = name
+        self.ttl = ttl
+        self.session_factory = session_factory
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    def acquire(self) -> bool:
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        db = self.session_factory()
+        try:
+            taken = db.execute(update(models.Lease).where(
+                models.Lease.name == self.name,
+                or_(models.Lease.holder == self.holder, models.Lease.expires_at < now)
+            ).values(holder=self.holder, expires_at=expires_at)).rowcount
+            if not taken:
+                db.add(models.Lease(name=self.name, holder=self.holder, expires_at=expires_at))
+            db.commit()
+            return True
+        except IntegrityError:
+            # The row exists and someone else holds it
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def release(self) -> None:
+        db = self.session_factory()
+        try:
+            db.query(models.Lease).filter(
+                models.Lease.name == self.name,
+                models.Lease.holder == self.holder
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,291 @@
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+from string import Template
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import queue
+import smtplib
+import threading
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import MAIL_QUEUE_WAIT, SMTP_SEND_LATENCY
+
+logger = logging.getLogger(__name__)
+
+class MessageTemplate:
+    """An email template compiled once and rendered per message."""
+
+    def __init__(self, subject: str, html: str):
+        self.subject = Template(subject)
+        self.html = Template(html)
+
+    def render(self, to: str, **values) -> EmailMessage:
+        msg = EmailMessage()
+        msg["From"] = settings.SMTP_FROM or settings.SMTP_USERNAME or "no-reply@localhost"
+        msg["To"] = to
+        msg["Subject"] = self.subject.substitute(values)
+        msg.set_content(self.html.substitute(values), subtype="html")
+        return msg
+
+OTP_TEMPLATE = MessageTemplate(
+    "Your Digital Legacy Manager OTP",
+    """
+    <html>
+        <body>
+            <h2>Your OTP for Digital Legacy Manager</h2>
+            <p>Your OTP is: <strong>$otp</strong></p>
+            <p>This OTP will expire in $ttl_minutes minutes.</p>
+            <p>If you didn't request this OTP, please ignore this email.</p>
+        </body>
+    </html>
+    """
+)
+
+class SMTPConnectionPool:
+    """A small pool of authenticated SMTP sessions.
+
+    Connections are reused across messages so STARTTLS and LOGIN happen once
+    per session instead of once per email. Sessions idle for longer than the
+    health-check interval are probed with NOOP before reuse.
+    """
+
+    def __init__(self, host: str = None, port: int = None, size: int = None, use_tls: bool = None):
+        self.host = host or settings.SMTP_HOST
+        self.port = port or settings.SMTP_PORT
+        self.size = size or settings.SMTP_POOL_SIZE
+        self.use_tls = settings.SMTP_USE_TLS if use_tls is None else use_tls
+        self.timeout = settings.SMTP_TIMEOUT_SECONDS
+        self.health_check_interval = settings.SMTP_HEALTH_CHECK_SECONDS
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.ehlo()
+        if self.use_tls:
+            server.starttls()
+            server.ehlo()
+        if settings.SMTP_USERNAME:
+            server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
+        return server
+
+    def _is_healthy(self, server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def acquire(self) -> smtplib.SMTP:
+        """Return a healthy connection, blocking while all sessions are in use."""
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    server, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - last_used < self.health_check_interval or self._is_healthy(server):
+                    return server
+                self._close(server)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, server: smtplib.SMTP) -> None:
+        self._idle.put((server, time.monotonic()))
+        self._slots.release()
+
+    def discard(self, server: smtplib.SMTP) -> None:
+        self._close(server)
+        self._slots.release()
+
+    def _close(self, server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+@dataclass
+class OutboundMessage:
+    message: EmailMessage
+    attempts: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+class MailQueue:
+    """Asynchronous outbound mail queue.
+
+    Workers take whatever messages are waiting (up to `batch_size`) and send
+    them over one pooled SMTP session in a worker thread. Temporary failures
+    are retried with exponential backoff; rejected recipients are not.
+    On shutdown, messages waiting out a backoff get one last attempt
+    instead of being lost with their timers.
+    """
+
+    def __init__(self, pool: Optional[SMTPConnectionPool] = None, workers: int = None, batch_size: int = None):
+        self.pool = pool or SMTPConnectionPool()
+        self.workers = workers or self.pool.size
+        self.batch_size = batch_size or settings.MAIL_BATCH_SIZE
+        self.max_retries = settings.MAIL_MAX_RETRIES
+        self.retry_base_seconds = settings.MAIL_RETRY_BASE_SECONDS
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        # Messages waiting out a retry backoff, by id(item)
+        self._retries: Dict[int, Tuple[asyncio.TimerHandle, OutboundMessage]] = {}
+        self._stopping = False
+        self._stats = {
+            "queued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "dropped": 0,
+            "queue_wait_seconds_total": 0.0,
+            "send_seconds_total": 0.0,
+            "sessions": 0
+        }
+
+    def stats(self) -> Dict[str, float]:
+        """Return a snapshot of the delivery metrics."""
+        return {**self._stats, "depth": self._queue.qsize() if self._queue else 0, "retrying": len(self._retries)}
+
+    def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._queue = asyncio.Queue(maxsize=settings.MAIL_QUEUE_MAX_SIZE)
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Deliver what is already queued, give pending retries a last attempt, then stop the workers."""
+        if not self._tasks:
+            return
+        await self._queue.join()
+        self._stopping = True
+        retries, self._retries = list(self._retries.values()), {}
+        for handle, item in retries:
+            handle.cancel()
+            item.enqueued_at = time.monotonic()
+            await self._queue.put(item)
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await run_in_threadpool(self.pool.close)
+
+    def enqueue(self, message: EmailMessage) -> bool:
+        """Queue a message for delivery; returns False if the queue is full."""
+        self.start()
+        try:
+            self._queue.put_nowait(OutboundMessage(message))
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            logger.error("Mail queue is full, dropping message")
+            return False
+        self._stats["queued"] += 1
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            now = time.monotonic()
+            for item in batch:
+                self._stats["queue_wait_seconds_total"] += now - item.enqueued_at
+                MAIL_QUEUE_WAIT.observe(now - item.enqueued_at)
+            try:
+                result = await run_in_threadpool(self._send_batch, batch)
+            except Exception as e:
+                logger.error(f"Mail worker error: {str(e)}")
+                result = {"retry": batch}
+            self._stats["sessions"] += result.get("sessions", 0)
+            self._stats["sent"] += result.get("sent", 0)
+            self._stats["failed"] += result.get("failed", 0)
+            self._stats["send_seconds_total"] += result.get("send_seconds", 0.0)
+            for item in result["retry"]:
+                self._schedule_retry(item)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _send_batch(self, batch: List[OutboundMessage]) -> Dict:
+        """Send a batch over one session and report what happened.
+
+        Runs in a worker thread, so it only returns counts; the event loop
+        owns the stats and the retry schedule.
+        """
+        result = {"retry": [], "sessions": 0, "sent": 0, "failed": 0, "send_seconds": 0.0}
+        try:
+            server = self.pool.acquire()
+        except (smtplib.SMTPException, OSError) as e:
+            logger.error(f"Could not open SMTP session: {str(e)}")
+            result["retry"] = batch
+            return result
+        result["sessions"] = 1
+
+        for index, item in enumerate(batch):
+            start = time.perf_counter()
+            try:
+                server.send_message(item.message)
+            except smtplib.SMTPRecipientsRefused as e:
+                result["failed"] += 1
+                logger.error(f"Recipient refused for {item.message['To']}: {str(e)}")
+            except smtplib.SMTPResponseException as e:
+                if 400 <= e.smtp_code < 500:
+                    logger.warning(f"Temporary SMTP failure for {item.message['To']}: {str(e)}")
+                    self.pool.release(server)
+                    result["retry"] = batch[index:]
+                    return result
+                result["failed"] += 1
+                logger.error(f"SMTP rejected message for {item.message['To']}: {str(e)}")
+            except (smtplib.SMTPException, OSError) as e:
+                # The session is broken; retry this and the remaining messages later
+                logger.warning(f"SMTP session failed: {str(e)}")
+                self.pool.discard(server)
+                result["retry"] = batch[index:]
+                return result
+            else:
+                elapsed = time.perf_counter() - start
+                result["sent"] += 1
+                result["send_seconds"] += elapsed
+                SMTP_SEND_LATENCY.observe(elapsed)
+        self.pool.release(server)
+        return result
+
+    def _schedule_retry(self, item: OutboundMessage) -> None:
+        item.attempts += 1
+        if item.attempts > self.max_retries or self._stopping:
+            self._stats["failed"] += 1
+            logger.error(f"Giving up on email to {item.message['To']} after {item.attempts} attempts")
+            return
+        self._stats["retried"] += 1
+        delay = self.retry_base_seconds * (2 ** (item.attempts - 1))
+        handle = asyncio.get_running_loop().call_later(delay, self._requeue, item)
+        self._retries[id(item)] = (handle, item)
+
+    def _requeue(self, item: OutboundMessage) -> None:
+        self._retries.pop(id(item), None)
+        item.enqueued_at = time.monotonic()
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+
+mail_queue = MailQueue()
@@ -0,0 +1,198 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import heapq
+import hmac
+import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Verification outcomes
+OTP_VALID = "valid"
+OTP_INVALID = "invalid"
+OTP_EXPIRED = "expired"
+OTP_MISSING = "missing"
+OTP_LOCKED = "locked"
+
+def hash_otp(email: str, otp: str) -> str:
+    """Keyed hash of an OTP so stored codes are useless if the store leaks."""
+    return hmac.new(settings.SECRET_KEY.encode(), f"{email}:{otp}".encode(), hashlib.sha256).hexdigest()
+
+class OTPStore(ABC):
+    """Storage for one pending OTP per email with expiry and an attempt limit."""
+
+    def __init__(self, max_attempts: Optional[int] = None):
+        self.max_attempts = max_attempts or settings.OTP_MAX_ATTEMPTS
+
+    @abstractmethod
+    def put(self, email: str, otp: str, ttl: timedelta) -> None:
+        """Store an OTP, replacing any pending one for the email."""
+
+    @abstractmethod
+    def verify(self, email: str, otp: str) -> str:
+        """Check an OTP, consuming it on success, and return one of the OTP_* outcomes."""
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        """Remove expired entries and return how many were removed."""
+
+class InMemoryOTPStore(OTPStore):
+    """Per-process store with active expiry.
+
+    A min-heap ordered by expiry lets every call drop expired codes in
+    O(log n) each, so memory is bounded by the codes issued within one TTL
+    (and by `max_entries`) rather than by every code ever issued.
+    """
+
+    def __init__(self, max_attempts: Optional[int] = None, max_entries: Optional[int] = None):
+        super().__init__(max_attempts)
+        self.max_entries = max_entries or settings.OTP_MEMORY_MAX_ENTRIES
+        # email -> (otp_hash, expires_at, attempts, generation)
+        self._entries: Dict[str, Tuple[str, float, int, int]] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expire(self, now: float) -> int:
+        removed = 0
+        while self._heap and (self._heap[0][0] <= now or len(self._entries) > self.max_entries):
+            _, generation, email = heapq.heappop(self._heap)
+            entry = self._entries.get(email)
+            # Skip heap records for codes that were since replaced
+            if entry and entry[3] == generation:
+                del self._entries[email]
+                removed += 1
+        # Replaced codes leave stale heap records behind; rebuild once they dominate
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(entry[1], entry[3], email) for email, entry in self._entries.items()]
+            heapq.heapify(self._heap)
+        return removed
+
+    def put(self, email: str, otp: str, ttl: timedelta) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._generation += 1
+            expires_at = now + ttl.total_seconds()
+            self._entries[email] = (hash_otp(email, otp), expires_at, 0, self._generation)
+            heapq.heappush(self._heap, (expires_at, self._generation, email))
+            self._expire(now)
+
+    def verify(self, email: str, otp: str) -> str:
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._entries.get(email)
+            if not entry:
+                return OTP_MISSING
+            otp_hash, expires_at, attempts, generation = entry
+            if expires_at <= now:
+                del self._entries[email]
+                return OTP_EXPIRED
+            if hmac.compare_digest(otp_hash, hash_otp(email, otp)):
+                del self._entries[email]
+                return OTP_VALID
+            attempts += 1
+            if attempts >= self.max_attempts:
+                del self._entries[email]
+                return OTP_LOCKED
+            self._entries[email] = (otp_hash, expires_at, attempts, generation)
+            return OTP_INVALID
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            return self._expire(time.monotonic())
+
+class DatabaseOTPStore(OTPStore):
+    """Store backed by the `otp_codes` table, shared by every worker.
+
+    Attempts are counted and codes consumed with single conditional UPDATE and
+    DELETE statements, so two workers can't both accept the same code.
+    """
+
+    def __init__(self, session_factory=SessionLocal, max_attempts: Optional[int] = None, purge_interval: float = 60.0):
+        super().__init__(max_attempts)
+        self.session_factory = session_factory
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+
+    def put(self, email: str, otp: str, ttl: timedelta) -> None:
+        db = self.session_factory()
+        try:
+            db.merge(models.OTPCode(
+                email=email,
+                otp_hash=hash_otp(email, otp),
+                expires_at=datetime.utcnow() + ttl,
+                attempts=0
+            ))
+            db.commit()
+        finally:
+            db.close()
+        if time.monotonic() - self._last_purge > self.purge_interval:
+            self.purge_expired()
+
+    def verify(self, email: str, otp: str) -> str:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            entry = db.query(models.OTPCode).filter(models.OTPCode.email == email).first()
+            if not entry:
+                return OTP_MISSING
+            if entry.expires_at <= now:
+                db.delete(entry)
+                db.commit()
+                return OTP_EXPIRED
+
+            otp_hash = hash_otp(email, otp)
+            if hmac.compare_digest(entry.otp_hash, otp_hash):
+                consumed = db.query(models.OTPCode).filter(
+                    models.OTPCode.email == email,
+                    models.OTPCode.otp_hash == otp_hash,
+                    models.OTPCode.attempts < self.max_attempts
+                ).delete(synchronize_session=False)
+                db.commit()
+                return OTP_VALID if consumed else OTP_MISSING
+
+            db.query(models.OTPCode).filter(
+                models.OTPCode.email == email
+            ).update(
+                {"attempts": models.OTPCode.attempts + 1},
+                synchronize_session=False
+            )
+            locked = db.query(models.OTPCode).filter(
+                models.OTPCode.email == email,
+                models.OTPCode.attempts >= self.max_attempts
+            ).delete(synchronize_session=False)
+            db.commit()
+            return OTP_LOCKED if locked else OTP_INVALID
+        finally:
+            db.close()
+
+    def purge_expired(self) -> int:
+        self._last_purge = time.monotonic()
+        db = self.session_factory()
+        try:
+            removed = db.query(models.OTPCode).filter(
+                models.OTPCode.expires_at <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+def create_otp_store() -> OTPStore:
+    """Build the OTP store selected by OTP_STORE_BACKEND."""
+    if settings.OTP_STORE_BACKEND == "database":
+        return DatabaseOTPStore()
+    if settings.OTP_STORE_BACKEND == "memory":
+        return InMemoryOTPStore()
+    raise ValueError(f"Unknown OTP_STORE_BACKEND: {settings.OTP_STORE_BACKEND}")
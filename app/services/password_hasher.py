@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+import asyncio
+import logging
+import statistics
+import threading
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashing jobs are already waiting."""
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated, bounded thread pool.
+
+    bcrypt releases the GIL while hashing, so a small pool keeps the event
+    loop free without letting a login burst starve other requests of CPU.
+    Jobs beyond `max_pending` are rejected instead of queueing without bound.
+    """
+
+    def __init__(self, rounds: Optional[int] = None, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.rounds = rounds or settings.BCRYPT_ROUNDS
+        self._context = None
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_pending = max_pending or settings.PASSWORD_HASH_MAX_PENDING
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stats = {
+            "jobs": 0,
+            "rejected": 0,
+            "rehashed": 0,
+            "queue_wait_seconds_total": 0.0,
+            "queue_wait_seconds_max": 0.0,
+            "hash_seconds_total": 0.0
+        }
+
+    @property
+    def context(self):
+        """passlib context, built on first use to keep passlib out of worker start-up."""
+        if self._context is None:
+            from passlib.context import CryptContext
+
+            # Pinning min/max rounds makes passlib flag hashes made with any other cost for rehashing
+            self._context = CryptContext(
+                schemes=["bcrypt"],
+                deprecated="auto",
+                bcrypt__default_rounds=self.rounds,
+                bcrypt__min_rounds=self.rounds,
+                bcrypt__max_rounds=self.rounds
+            )
+        return self._context
+
+    def stats(self) -> Dict[str, float]:
+        """Return a snapshot of the hashing metrics."""
+        with self._lock:
+            return {**self._stats, "pending": self._pending, "workers": self.workers, "rounds": self.rounds}
+
+    def _timed(self, submitted_at: float, func, *args):
+        started_at = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            finished_at = time.perf_counter()
+            wait = started_at - submitted_at
+            with self._lock:
+                self._stats["jobs"] += 1
+                self._stats["queue_wait_seconds_total"] += wait
+                self._stats["queue_wait_seconds_max"] = max(self._stats["queue_wait_seconds_max"], wait)
+                self._stats["hash_seconds_total"] += finished_at - started_at
+
+    async def _run(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise PasswordHasherBusy("Too many password hashing jobs pending")
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._timed, time.perf_counter(), func, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password off the event loop."""
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """Verify a password and return a replacement hash if the configured cost changed."""
+        if not hashed_password:
+            # Spend the same time as a real check so missing accounts can't be detected by timing
+            await self._run(self.context.dummy_verify)
+            return False, None
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed_password)
+        if new_hash:
+            with self._lock:
+                self._stats["rehashed"] += 1
+        return valid, new_hash
+
+def calibrate(target_ms: float, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3) -> int:
+    """Return the highest bcrypt cost whose hash time stays within target_ms on this host."""
+    from passlib.context import CryptContext
+
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        context = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds)
+        timings = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            context.hash("calibration-password")
+            timings.append((time.perf_counter() - start) * 1000)
+        median = statistics.median(timings)
+        print(f"rounds={rounds}: {median:.1f} ms")
+        if median > target_ms:
+            break
+        chosen = rounds
+    return chosen
+
+password_hasher = PasswordHasher()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Password hashing utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    calibrate_parser = subparsers.add_parser("calibrate", help="Pick a bcrypt cost for a target latency")
+    calibrate_parser.add_argument("--target-ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    if args.command == "calibrate":
+        rounds = calibrate(args.target_ms)
+        print(f"BCRYPT_ROUNDS={rounds}")
@@ -0,0 +1,146 @@
+from http.cookies import SimpleCookie
+from typing import List, Optional, Set
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.core.security import ACCESS_TOKEN_COOKIE, InvalidToken, token_verifier
+
+logger = logging.getLogger(__name__)
+
+# Events pushed to clients
+UPLOAD_PROGRESS = "upload.progress"
+ASSET_CREATED = "asset.created"
+ASSET_FAILED = "asset.failed"
+
+def user_room(user_id: int) -> str:
+    return f"user:{user_id}"
+
+def client_manager(url: str):
+    """The Socket.IO manager for REALTIME_MESSAGE_QUEUE; without one, events stay in this process."""
+    import socketio
+
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return socketio.AsyncRedisManager(url)
+    if url.startswith(("amqp://", "amqps://")):
+        return socketio.AsyncAioPikaManager(url)
+    raise ValueError(f"Unsupported REALTIME_MESSAGE_QUEUE: {url}")
+
+def _token_from(environ, auth) -> Optional[str]:
+    if isinstance(auth, dict) and auth.get("token"):
+        return auth["token"]
+    cookie = SimpleCookie(environ.get("HTTP_COOKIE", ""))
+    return cookie[ACCESS_TOKEN_COOKIE].value if ACCESS_TOKEN_COOKIE in cookie else None
+
+class RealtimeHub:
+    """Socket.IO endpoint pushing events to each user's open sessions.
+
+    Mounted at /socket.io. A connection authenticates with the same token
+    as the API (auth cookie, or `auth: {token}` from non-browser clients)
+    and joins its user's room; `publish()` sends to that room from request
+    handlers and background threads alike. With REALTIME_MESSAGE_QUEUE set
+    (redis:// or amqp://) events go through the queue, so a client hears
+    about work done by any worker. The server is created on first use.
+    """
+
+    def __init__(self):
+        self._server = None
+        self._app = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def server(self):
+        if self._server is None:
+            import socketio
+
+            origins = [origin.strip() for origin in settings.REALTIME_CORS_ORIGINS.split(",") if origin.strip()]
+            self._server = socketio.AsyncServer(
+                async_mode="asgi",
+                client_manager=client_manager(settings.REALTIME_MESSAGE_QUEUE),
+                cors_allowed_origins=origins or None,  # None: same origin only
+                logger=False,
+                engineio_logger=False
+            )
+            self._server.on("connect", self._on_connect)
+        return self._server
+
+    async def _on_connect(self, sid, environ, auth=None):
+        token = _token_from(environ, auth)
+        try:
+            user = token_verifier.verify(token) if token else None
+        except InvalidToken:
+            user = None
+        if user is None:
+            return False
+        await self.server.enter_room(sid, user_room(user.id))
+        logger.debug(f"Realtime session {sid} opened for user {user.id}")
+
+    def start(self) -> None:
+        """Remember the serving loop so worker threads can publish; called at start-up."""
+        self._loop = asyncio.get_running_loop()
+
+    async def __call__(self, scope, receive, send):
+        if self._app is None:
+            import socketio
+
+            self._loop = self._loop or asyncio.get_running_loop()
+            self._app = socketio.ASGIApp(self.server, socketio_path="socket.io")
+        await self._app(scope, receive, send)
+
+    async def emit(self, user_id: int, event: str, data: dict) -> None:
+        try:
+            await self.server.emit(event, data, room=user_room(user_id))
+        except Exception as e:
+            logger.warning(f"Could not push {event} to user {user_id}: {str(e)}")
+
+    def publish(self, user_id: int, event: str, data: dict) -> None:
+        """Send an event to the user's sessions without waiting; safe to call from any thread."""
+        if not settings.REALTIME_ENABLED:
+            return
+        # Nobody can be listening through a server that was never started, unless a queue links workers
+        if self._server is None and not settings.REALTIME_MESSAGE_QUEUE:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            task = loop.create_task(self.emit(user_id, event, data))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        elif self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.emit(user_id, event, data), self._loop)
+
+    def progress(self, user_id: int, **fields) -> "ProgressReporter":
+        return ProgressReporter(self, user_id, fields)
+
+    def inactivity_listener(self, events: List) -> None:
+        """Forward inactivity sweep events (reminders, and escalations that fire access rules)."""
+        for event in events:
+            self.publish(event.user_id, f"inactivity.{event.kind}", {
+                "stage": event.stage,
+                "deadline": event.deadline.isoformat() if event.deadline else None
+            })
+
+class ProgressReporter:
+    """Publishes UPLOAD_PROGRESS for a long operation, at most every REALTIME_PROGRESS_INTERVAL_MS."""
+
+    def __init__(self, hub: RealtimeHub, user_id: int, fields: dict):
+        self.hub = hub
+        self.user_id = user_id
+        self.fields = fields
+        self._last = 0.0
+
+    def __call__(self, stage: str, done: int, total: Optional[int] = None) -> None:
+        now = time.monotonic()
+        finished = total is not None and done >= total
+        if not finished and (now - self._last) * 1000 < settings.REALTIME_PROGRESS_INTERVAL_MS:
+            return
+        self._last = now
+        self.hub.publish(self.user_id, UPLOAD_PROGRESS, {**self.fields, "stage": stage, "bytes": done, "total": total})
+
+realtime = RealtimeHub()
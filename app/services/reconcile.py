@@ -0,0 +1,182 @@
+from typing import Dict, Iterator, List, Optional
+import logging
+import os
+import time
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+from app.services.scrubber import MISSING
+from app.services.storage import ENCRYPTED_SUFFIX, object_store
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_DIR = ".quarantine"
+PLAINTEXT = "plaintext"
+CIPHERTEXT = "ciphertext"
+SAMPLE_SIZE = 100
+
+def walk_sorted(directory: str, skip: Optional[str] = None) -> Iterator[os.DirEntry]:
+    """Yield the files under `directory` in the order their full paths sort as strings.
+
+    Only one directory listing is held at a time. A directory sorts as
+    "name/", so "ab.txt" comes before the contents of "ab/", as it would
+    in an ORDER BY on the joined paths.
+    """
+    with os.scandir(directory) as it:
+        entries = [entry for entry in it if entry.name != skip]
+    entries.sort(key=lambda entry: entry.name + "/" if entry.is_dir(follow_symlinks=False) else entry.name)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from walk_sorted(entry.path)
+        else:
+            yield entry
+
+class Reconciler:
+    """Finds stored files without an asset row, and asset rows without a file.
+
+    The directory walk and the `file_path` column are both streamed in
+    sorted order and merge-joined, so memory stays flat however many files
+    there are. Leftover plaintext (streamed uploads, decrypted downloads)
+    is deleted; orphaned ciphertext is moved to UPLOAD_DIR/.quarantine, or
+    deleted when RECONCILE_ORPHAN_ACTION is "delete". Rows whose file is
+    gone are marked missing for the integrity report. Files younger than
+    the grace period are left alone, since they may belong to an upload
+    that has not committed yet. Runs are dry unless `apply` is set.
+    """
+
+    def __init__(self, session_factory=SessionLocal, root: Optional[str] = None,
+                 batch_size: Optional[int] = None, grace_seconds: Optional[int] = None,
+                 orphan_action: Optional[str] = None):
+        self.session_factory = session_factory
+        self._root = root
+        self.batch_size = batch_size or settings.RECONCILE_BATCH_SIZE
+        self.grace_seconds = settings.RECONCILE_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        self.orphan_action = orphan_action or settings.RECONCILE_ORPHAN_ACTION
+
+    @property
+    def root(self) -> str:
+        return self._root or object_store.root
+
+    def stored_paths(self) -> Iterator[str]:
+        """Stream `file_path` values under the root in sorted order, one keyset batch at a time."""
+        prefix = os.path.join(self.root, "")
+        # Every path under the root sorts between "root/" and "root0"
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        column = models.DigitalAsset.file_path
+        last = prefix
+        while True:
+            db = self.session_factory()
+            try:
+                # Postgres sorts by locale by default; the merge needs plain code point order
+                ordered = column.collate("C") if db.get_bind().dialect.name == "postgresql" else column
+                rows = db.query(column).filter(column > last, column < upper).order_by(ordered).limit(self.batch_size).all()
+            finally:
+                db.close()
+            if not rows:
+                return
+            for (path,) in rows:
+                yield path
+            last = rows[-1][0]
+
+    def _quarantine(self, path: str) -> None:
+        target = os.path.join(self.root, QUARANTINE_DIR, os.path.relpath(path, self.root))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+
+    def _mark_missing(self, paths: List[str]) -> None:
+        db = self.session_factory()
+        try:
+            db.query(models.DigitalAsset).filter(models.DigitalAsset.file_path.in_(paths)).update(
+                {models.DigitalAsset.integrity_status: MISSING}, synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _orphan(self, entry: os.DirEntry, report: Dict, apply: bool, now: float) -> None:
+        stat = entry.stat(follow_symlinks=False)
+        if now - stat.st_mtime < self.grace_seconds:
+            report["recent_skipped"] += 1
+            return
+        kind = CIPHERTEXT if entry.name.endswith(ENCRYPTED_SUFFIX) else PLAINTEXT
+        report[f"orphaned_{kind}"] += 1
+        report["orphaned_bytes"] += stat.st_size
+        if len(report["orphans"]) < SAMPLE_SIZE:
+            report["orphans"].append({"path": entry.path, "kind": kind, "bytes": stat.st_size})
+        if not apply:
+            return
+        # Plaintext is never kept around, even in quarantine
+        if kind == PLAINTEXT or self.orphan_action == "delete":
+            os.remove(entry.path)
+            report["deleted"] += 1
+        else:
+            self._quarantine(entry.path)
+            report["quarantined"] += 1
+
+    def run(self, apply: bool = False) -> Dict:
+        """Merge-join the directory listing with the stored paths; returns a report."""
+        report = {
+            "dry_run": not apply,
+            "files_seen": 0,
+            "matched": 0,
+            "orphaned_plaintext": 0,
+            "orphaned_ciphertext": 0,
+            "orphaned_bytes": 0,
+            "recent_skipped": 0,
+            "missing_files": 0,
+            "deleted": 0,
+            "quarantined": 0,
+            "orphans": [],
+            "missing": []
+        }
+        if not os.path.isdir(self.root):
+            return report
+
+        now = time.time()
+        files = walk_sorted(self.root, skip=QUARANTINE_DIR)
+        rows = self.stored_paths()
+        entry, row = next(files, None), next(rows, None)
+        missing: List[str] = []
+        while entry is not None or row is not None:
+            if row is None or (entry is not None and entry.path < row):
+                report["files_seen"] += 1
+                self._orphan(entry, report, apply, now)
+                entry = next(files, None)
+            elif entry is None or row < entry.path:
+                report["missing_files"] += 1
+                if len(report["missing"]) < SAMPLE_SIZE:
+                    report["missing"].append(row)
+                if apply:
+                    missing.append(row)
+                    if len(missing) >= self.batch_size:
+                        self._mark_missing(missing)
+                        missing = []
+                row = next(rows, None)
+            else:
+                report["files_seen"] += 1
+                report["matched"] += 1
+                entry, row = next(files, None), next(rows, None)
+        if missing:
+            self._mark_missing(missing)
+
+        logger.info(
+            f"Reconciled {self.root}: {report['matched']} matched, "
+            f"{report['orphaned_plaintext'] + report['orphaned_ciphertext']} orphaned files, "
+            f"{report['missing_files']} rows without a file{' (dry run)' if not apply else ''}"
+        )
+        return report
+
+reconciler = Reconciler()
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from app.core.log_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Find stored files without asset rows and rows without files")
+    parser.add_argument("--apply", action="store_true", help="delete or quarantine orphans (default: report only)")
+    args = parser.parse_args()
+
+    configure_logging()
+    print(json.dumps(reconciler.run(apply=args.apply), indent=2))
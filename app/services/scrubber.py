@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+from app.services.encryption import encryption_service
+from app.services.key_manager import key_manager
+from app.services.leases import Lease
+
+logger = logging.getLogger(__name__)
+
+OK = "ok"
+CORRUPT = "corrupt"
+MISSING = "missing"
+
+class IntegrityScrubber:
+    """Walks stored assets in id order and re-checks their ciphertext.
+
+    Each file is streamed once through SHA-256 (compared with the digest
+    recorded at upload) and, when enabled, each Fernet token's HMAC is
+    checked. Reads are paced to `max_bytes_per_second` and progress is
+    checkpointed after every batch, so a pass over millions of files can be
+    interrupted and resumed without starving foreground requests of I/O.
+    Every worker runs `run_periodic`, but only the holder of the scrub's
+    DB lease reads files, and only once a pass is due.
+    """
+
+    def __init__(self, session_factory=SessionLocal, name: str = "default",
+                 max_bytes_per_second: Optional[int] = None, verify_tags: Optional[bool] = None,
+                 batch_size: Optional[int] = None):
+        self.session_factory = session_factory
+        self.name = name
+        self.max_bytes_per_second = max_bytes_per_second or settings.SCRUB_MAX_BYTES_PER_SECOND
+        self.verify_tags = settings.SCRUB_VERIFY_TAGS if verify_tags is None else verify_tags
+        self.batch_size = batch_size or settings.SCRUB_BATCH_SIZE
+        self.lease = Lease(f"scrub:{name}", settings.SCRUB_LEASE_SECONDS, session_factory)
+        self._stop = threading.Event()
+        self._paced_bytes = 0
+        self._paced_since = time.monotonic()
+        self._stats = {
+            "files_checked": 0,
+            "bytes_read": 0,
+            "ok": 0,
+            "corrupt": 0,
+            "missing": 0,
+            "digests_recorded": 0,
+            "passes_completed": 0
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of the scrub counters."""
+        return dict(self._stats)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _throttle(self, nbytes: int) -> None:
+        self._paced_bytes += nbytes
+        ahead = self._paced_bytes / self.max_bytes_per_second - (time.monotonic() - self._paced_since)
+        if ahead > 0:
+            time.sleep(ahead)
+
+    def check_file(self, file_path: str, expected_digest: Optional[str], key: Optional[bytes]) -> Tuple[str, Optional[str]]:
+        """Return the file's status and its ciphertext digest (None if missing)."""
+        if not file_path or not os.path.exists(file_path):
+            return MISSING, None
+
+        digest = hashlib.sha256()
+        tags_ok = True
+        for token in encryption_service.iter_encrypted_chunks(file_path):
+            digest.update(token)
+            if key is not None and tags_ok:
+                tags_ok = encryption_service.verify_token_tag(token, key)
+            self._stats["bytes_read"] += len(token)
+            self._throttle(len(token))
+
+        actual = digest.hexdigest()
+        if not tags_ok:
+            return CORRUPT, actual
+        if expected_digest and expected_digest != actual:
+            return CORRUPT, actual
+        return OK, actual
+
+    def _checkpoint(self, db) -> models.ScrubCheckpoint:
+        checkpoint = db.query(models.ScrubCheckpoint).filter(models.ScrubCheckpoint.name == self.name).first()
+        if checkpoint is None:
+            checkpoint = models.ScrubCheckpoint(name=self.name, last_asset_id=0)
+            db.add(checkpoint)
+        if not checkpoint.last_asset_id:
+            checkpoint.pass_started_at = datetime.utcnow()
+        return checkpoint
+
+    def run_batch(self) -> int:
+        """Check the next batch after the checkpoint; returns how many assets were checked."""
+        db = self.session_factory()
+        try:
+            checkpoint = self._checkpoint(db)
+            assets = db.query(
+                models.DigitalAsset.id,
+                models.DigitalAsset.file_path,
+                models.DigitalAsset.ciphertext_digest,
+                models.DigitalAsset.wrapped_key,
+                models.DigitalAsset.key_id,
+                models.DigitalAsset.encryption_key
+            ).filter(
+                models.DigitalAsset.id > checkpoint.last_asset_id,
+                # Uploads still being ingested point at plaintext, not ciphertext
+                models.DigitalAsset.ingest_status.is_(None)
+            ).order_by(models.DigitalAsset.id).limit(self.batch_size).all()
+
+            if not assets:
+                # Wrap around so the next call starts a fresh pass
+                checkpoint.last_asset_id = 0
+                checkpoint.last_pass_completed_at = datetime.utcnow()
+                db.commit()
+                self._stats["passes_completed"] += 1
+                return 0
+
+            updates = []
+            checked_at = datetime.utcnow()
+            for asset_id, file_path, expected_digest, wrapped_key, key_id, legacy_key in assets:
+                if self._stop.is_set():
+                    break
+                key = None
+                if self.verify_tags and (wrapped_key or legacy_key):
+                    try:
+                        # Bypass the cache so a full pass doesn't evict the keys of hot downloads
+                        key = key_manager.data_key(wrapped_key, key_id, legacy_key, cache=False)
+                    except Exception as e:
+                        logger.error(f"Could not unwrap the data key of asset {asset_id}: {str(e)}")
+                try:
+                    status, digest = self.check_file(file_path, expected_digest, key)
+                except OSError as e:
+                    logger.error(f"Could not read asset {asset_id}: {str(e)}")
+                    status, digest = MISSING, None
+
+                update = {"id": asset_id, "integrity_status": status, "integrity_checked_at": checked_at}
+                # Older uploads have no recorded digest; adopt it once the tags vouch for the bytes
+                if status == OK and not expected_digest and key is not None:
+                    update["ciphertext_digest"] = digest
+                    self._stats["digests_recorded"] += 1
+                updates.append(update)
+
+                self._stats["files_checked"] += 1
+                self._stats[status] += 1
+                if status != OK:
+                    logger.warning(f"Integrity check failed for asset {asset_id}: {status}")
+
+            if updates:
+                db.bulk_update_mappings(models.DigitalAsset, updates)
+                checkpoint.last_asset_id = updates[-1]["id"]
+            db.commit()
+            return len(updates)
+        finally:
+            db.close()
+
+    def run_pass(self, leased: bool = False) -> int:
+        """Scrub from the checkpoint to the end of the table (renewing the lease per batch if `leased`)."""
+        self._stop.clear()
+        self._paced_bytes = 0
+        self._paced_since = time.monotonic()
+        total = 0
+        while not self._stop.is_set():
+            if leased and not self.lease.acquire():
+                logger.warning("Lost the integrity scrub lease, stopping this pass")
+                break
+            checked = self.run_batch()
+            if not checked:
+                break
+            total += checked
+        return total
+
+    def _due(self) -> bool:
+        db = self.session_factory()
+        try:
+            checkpoint = db.query(models.ScrubCheckpoint).filter(models.ScrubCheckpoint.name == self.name).first()
+        finally:
+            db.close()
+        if checkpoint is None or checkpoint.last_asset_id or checkpoint.last_pass_completed_at is None:
+            return True
+        return datetime.utcnow() - checkpoint.last_pass_completed_at >= timedelta(seconds=settings.SCRUB_INTERVAL_SECONDS)
+
+    def run_due(self) -> Optional[int]:
+        """Run (or resume) a pass if one is due and no other process is scrubbing; None if skipped."""
+        if not self.lease.acquire():
+            return None
+        try:
+            return self.run_pass(leased=True) if self._due() else None
+        finally:
+            self.lease.release()
+
+    async def run_periodic(self) -> None:
+        """Check every SCRUB_LEASE_SECONDS whether a pass is due, and run it here if no other process is."""
+        while True:
+            try:
+                # A dedicated thread, since a pass can run for hours
+                checked = await asyncio.to_thread(self.run_due)
+                if checked is not None:
+                    logger.info(f"Integrity scrub pass checked {checked} assets")
+            except Exception as e:
+                logger.error(f"Integrity scrub failed: {str(e)}")
+            await asyncio.sleep(settings.SCRUB_LEASE_SECONDS)
+
+integrity_scrubber = IntegrityScrubber()
@@ -0,0 +1,167 @@
+from typing import Optional
+import hashlib
+import logging
+import os
+import uuid
+
+from app.core.config import settings
+from app.db import models
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# decrypt_file writes its output next to the object, minus this suffix
+ENCRYPTED_SUFFIX = ".encrypted"
+
+def fsync_path(path: str) -> None:
+    """Flush a closed file's data to disk."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class ObjectStore:
+    """Stored ciphertext under opaque IDs, sharded two levels deep.
+
+    An object lives at `<root>/ab/cd/<id>.encrypted`, where `abcd` are the
+    first hex digits of the ID's SHA-256. With 65,536 leaf directories a
+    directory holds a few thousand entries even at hundreds of millions of
+    objects, so open/stat stay fast, and random IDs mean two uploads can
+    never claim the same name. Finished files are renamed into place, so
+    a reader never sees half of one.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self._root = root
+
+    @property
+    def root(self) -> str:
+        return self._root or settings.UPLOAD_DIR
+
+    def new_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def path_for(self, object_id: str) -> str:
+        shard = hashlib.sha256(object_id.encode()).hexdigest()
+        return os.path.join(self.root, shard[:2], shard[2:4], object_id + ENCRYPTED_SUFFIX)
+
+    def is_sharded(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return name.endswith(ENCRYPTED_SUFFIX) and path == self.path_for(name[:-len(ENCRYPTED_SUFFIX)])
+
+    def _prepare(self, source_path: str, object_id: Optional[str]) -> str:
+        path = self.path_for(object_id or self.new_id())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if settings.STORAGE_FSYNC:
+            # Flush the data before the rename publishes it, or a crash can leave an empty object
+            fsync_path(source_path)
+        return path
+
+    def put(self, source_path: str, object_id: Optional[str] = None) -> str:
+        """Move a finished file (on the same filesystem) into the store; returns its stored path."""
+        path = self._prepare(source_path, object_id)
+        os.replace(source_path, path)
+        return path
+
+    def migrate(self, session_factory=SessionLocal, batch_size: Optional[int] = None) -> int:
+        """Move files from the old flat layout into shards and repoint `file_path`.
+
+        Works through assets in id-ordered batches with one commit each.
+        Files are hard-linked into place, the batch is committed, then the
+        old names are unlinked: a crash at any point leaves every row
+        pointing at a file that exists, and a rerun picks up where it
+        stopped. Returns the number of files moved.
+        """
+        batch_size = batch_size or settings.STORAGE_MIGRATION_BATCH_SIZE
+        last_id, total = 0, 0
+        while True:
+            db = session_factory()
+            try:
+                rows = db.query(models.DigitalAsset.id, models.DigitalAsset.file_path).filter(
+                    models.DigitalAsset.id > last_id,
+                    models.DigitalAsset.file_path.isnot(None),
+                    models.DigitalAsset.ingest_status.is_(None)
+                ).order_by(models.DigitalAsset.id).limit(batch_size).all()
+                if not rows:
+                    break
+
+                updates, moved = [], []
+                for asset_id, file_path in rows:
+                    if self.is_sharded(file_path):
+                        continue
+                    if not os.path.exists(file_path):
+                        logger.warning(f"Stored file missing for asset {asset_id}, left in place")
+                        continue
+                    path = self._prepare(file_path, None)
+                    os.link(file_path, path)
+                    updates.append({"id": asset_id, "file_path": path})
+                    moved.append(file_path)
+                if updates:
+                    db.bulk_update_mappings(models.DigitalAsset, updates)
+                db.commit()
+            finally:
+                db.close()
+
+            for file_path in moved:
+                os.remove(file_path)
+            last_id = rows[-1][0]
+            total += len(moved)
+        logger.info(f"Moved {total} stored files into the sharded layout")
+        return total
+
+    def backfill_sizes(self, session_factory=SessionLocal, batch_size: Optional[int] = None) -> int:
+        """Set `file_size` on assets stored before it existed, so they count against the quota.
+
+        Uses the plaintext size recorded in the asset's metadata at upload,
+        or else the stored file's size (the ciphertext, slightly larger).
+        Rows with neither are left NULL. Returns the number of rows updated.
+        """
+        batch_size = batch_size or settings.STORAGE_MIGRATION_BATCH_SIZE
+        last_id, total = 0, 0
+        while True:
+            db = session_factory()
+            try:
+                rows = db.query(
+                    models.DigitalAsset.id, models.DigitalAsset.file_path, models.DigitalAsset.asset_metadata
+                ).filter(
+                    models.DigitalAsset.id > last_id,
+                    models.DigitalAsset.file_size.is_(None)
+                ).order_by(models.DigitalAsset.id).limit(batch_size).all()
+                if not rows:
+                    break
+
+                updates = []
+                for asset_id, file_path, metadata in rows:
+                    size = metadata.get("file_size") if isinstance(metadata, dict) else None
+                    if not isinstance(size, int):
+                        size = os.path.getsize(file_path) if file_path and os.path.exists(file_path) else None
+                    if size is not None:
+                        updates.append({"id": asset_id, "file_size": size})
+                if updates:
+                    db.bulk_update_mappings(models.DigitalAsset, updates)
+                db.commit()
+            finally:
+                db.close()
+            last_id = rows[-1][0]
+            total += len(updates)
+        logger.info(f"Recorded the size of {total} stored files")
+        return total
+
+object_store = ObjectStore()
+
+if __name__ == "__main__":
+    import argparse
+    from app.core.log_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Stored file management")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate", help="Move files from the flat upload directory into the sharded layout")
+    subparsers.add_parser("backfill-sizes", help="Record file_size for assets uploaded before quotas")
+    args = parser.parse_args()
+
+    configure_logging()
+    if args.command == "migrate":
+        print(f"Moved {object_store.migrate()} files")
+    elif args.command == "backfill-sizes":
+        print(f"Recorded the size of {object_store.backfill_sizes()} assets")
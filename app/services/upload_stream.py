@@ -0,0 +1,185 @@
+from fnmatch import fnmatch
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+import os
+import tempfile
+
+from fastapi import HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
+from starlette.formparsers import parse_options_header
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SNIFF_BYTES = 8192
+# Multipart boundaries, part headers and small form fields on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+MAX_FIELD_BYTES = 64 * 1024
+
+def allowed_types() -> List[str]:
+    return [pattern.strip() for pattern in settings.ALLOWED_FILE_TYPES.split(",") if pattern.strip()]
+
+def is_allowed(content_type: str, patterns: Optional[List[str]] = None) -> bool:
+    """Match a MIME type against the allow-list ("image/*,application/pdf")."""
+    return any(fnmatch(content_type, pattern) for pattern in (patterns or allowed_types()))
+
+def sniff_content_type(head: bytes) -> str:
+    """The content type libmagic sees in the first bytes of a file."""
+    import magic
+
+    return magic.from_buffer(head, mime=True)
+
+def too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Upload exceeds the limit of {limit} bytes"
+    )
+
+class StreamedUpload:
+    """A multipart upload written straight to disk while it arrives.
+
+    Bytes are counted as they stream in, so the request fails with 413 as
+    soon as `max_bytes` is crossed instead of after the whole body has
+    been spooled. The file's real type is sniffed from its first
+    SNIFF_BYTES and checked against the allow-list before anything is
+    written.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, patterns: Optional[List[str]] = None,
+                 on_progress: Optional[Callable[[int], None]] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.patterns = patterns
+        self.on_progress = on_progress
+        self.fields: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self.declared_type: Optional[str] = None
+        self.content_type: Optional[str] = None
+        self.path: Optional[str] = None
+        self.size = 0
+        self._events: List[Tuple[str, object]] = []
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._field: Optional[str] = None
+        self._field_data = bytearray()
+        self._in_file = False
+        self._head = bytearray()
+        self._file = None
+
+    # python-multipart callbacks only record events; the async loop acts on them
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self):
+        # Hand the headers over with the event: a later part may begin in the same chunk
+        self._events.append(("headers", self._headers))
+
+    def _on_part_data(self, data, start, end):
+        self._events.append(("data", data[start:end]))
+
+    def _on_part_end(self):
+        self._events.append(("end", b""))
+
+    async def receive(self, request: Request) -> "StreamedUpload":
+        import python_multipart
+
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes + MULTIPART_OVERHEAD:
+            raise too_large(self.max_bytes)
+        _, params = parse_options_header(request.headers.get("content-type", ""))
+        if b"boundary" not in params:
+            raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+        parser = python_multipart.MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end
+        })
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                events, self._events = self._events, []
+                for kind, data in events:
+                    await self._handle(kind, data)
+                if self.on_progress is not None and self.size:
+                    self.on_progress(self.size)
+            parser.finalize()
+        except BaseException:
+            self.discard()
+            raise
+        if self.path is None:
+            raise HTTPException(status_code=400, detail="No file in upload")
+        return self
+
+    async def _handle(self, kind: str, data) -> None:
+        if kind == "headers":
+            headers = data
+            _, options = parse_options_header(headers.get(b"content-disposition", b""))
+            self._field = options.get(b"name", b"").decode("utf-8", "replace")
+            self._in_file = b"filename" in options and self.filename is None
+            if self._in_file:
+                self.filename = os.path.basename(options[b"filename"].decode("utf-8", "replace"))
+                self.declared_type = headers.get(b"content-type", b"").decode("latin-1") or None
+            self._field_data = bytearray()
+        elif kind == "data" and self._in_file:
+            self.size += len(data)
+            if self.size > self.max_bytes:
+                raise too_large(self.max_bytes)
+            if self._file is None:
+                self._head.extend(data)
+                if len(self._head) >= SNIFF_BYTES:
+                    await self._open()
+            else:
+                await run_in_threadpool(self._file.write, data)
+        elif kind == "data":
+            self._field_data.extend(data)
+            if len(self._field_data) > MAX_FIELD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Form field '{self._field}' is too large")
+        elif kind == "end" and self._in_file:
+            if self._file is None:
+                await self._open()
+            await run_in_threadpool(self._file.close)
+            self._in_file = False
+        elif kind == "end":
+            self.fields[self._field] = self._field_data.decode("utf-8", "replace")
+
+    async def _open(self) -> None:
+        """Sniff the buffered head, then start the file on disk with it."""
+        if not self._head:
+            raise HTTPException(status_code=400, detail="Uploaded file is empty")
+        self.content_type = sniff_content_type(bytes(self._head))
+        if not is_allowed(self.content_type, self.patterns):
+            logger.warning(f"Rejected upload of type {self.content_type} (declared {self.declared_type})")
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"File type {self.content_type} is not allowed"
+            )
+        os.makedirs(self.directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=self.directory, prefix=".upload-")
+        self._file = os.fdopen(fd, "wb")
+        await run_in_threadpool(self._file.write, bytes(self._head))
+        self._head = bytearray()
+
+    def discard(self) -> None:
+        """Remove a partial file after a rejected or broken upload."""
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
@@ -0,0 +1,52 @@
+"""Contract reads against a slow node: one request per read vs. batched multicalls.
+
+Run with: python -m benchmarks.bench_rpc_batching [--reads 100] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fake_chain import REGISTRY_ADDRESS, FakeChain
+from app.blockchain.rpc_batch import BatchingRPCClient
+from app.blockchain.web3_client import Web3Client
+
+async def measure(label: str, chain: FakeChain, client: Web3Client, hashes, concurrent: bool) -> None:
+    chain.http_requests = 0
+    client.rpc_batcher.clear_cache()
+    start = time.perf_counter()
+    if concurrent:
+        await client.verify_hashes(hashes)
+    else:
+        for content_hash in hashes:
+            await client.verify_hash(content_hash)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>24}: {elapsed * 1000:8.1f} ms, {chain.http_requests:4d} HTTP requests")
+
+async def run(reads: int, latency: float) -> None:
+    chain = FakeChain(latency=latency)
+    client = Web3Client()
+    client.rpc_url = await chain.start()
+    client.contract_address = REGISTRY_ADDRESS
+    hashes = [client.hash_content(f"asset{i}") for i in range(reads)]
+    for content_hash in hashes[::2]:
+        chain.anchor(content_hash)
+
+    try:
+        await measure("sequential", chain, client, hashes, concurrent=False)
+        client.rpc_batcher = BatchingRPCClient(client._post_batch, multicall_address="")
+        await measure("JSON-RPC batch", chain, client, hashes, concurrent=True)
+        client.rpc_batcher = BatchingRPCClient(client._post_batch)
+        await measure("JSON-RPC batch+multicall", chain, client, hashes, concurrent=True)
+    finally:
+        await client.close()
+        await chain.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reads", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.reads, args.latency_ms / 1000))
+
+if __name__ == "__main__":
+    main()
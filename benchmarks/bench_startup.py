@@ -0,0 +1,74 @@
+"""Worker cold start: time to import app.main and to run the lifespan start-up.
+
+Each measurement runs in a fresh interpreter, as a new worker or pod would.
+Exits non-zero when the median import time exceeds --max-import-ms or a
+module that should be deferred is imported eagerly, so it can gate CI.
+
+Run with: python -m benchmarks.bench_startup [--runs 5] [--max-import-ms 1500]
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from app import DEFERRED_MODULES
+
+PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+eager = [m for m in {deferred!r} if m in sys.modules]
+
+async def boot():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        pass
+
+asyncio.run(boot())
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (time.perf_counter() - imported) * 1000,
+    "eager": eager
+}}))
+"""
+
+def probe(database_url: str) -> dict:
+    env = {**os.environ, "DATABASE_URL": database_url, "SCRUB_ENABLED": "false", "LOG_LEVEL": "WARNING"}
+    # Start-up requires a master key; a throwaway one keeps the probe off any local key file
+    env.setdefault("MASTER_KEYS", f"bench:{base64.urlsafe_b64encode(os.urandom(32)).decode()}")
+    code = PROBE.format(deferred=DEFERRED_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        # The first worker after a deploy creates the schema; later ones only compare fingerprints
+        first = probe(database_url)
+        runs = [probe(database_url) for _ in range(args.runs)]
+
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    startup_ms = statistics.median(run["startup_ms"] for run in runs)
+    eager = sorted({m for run in [first] + runs for m in run["eager"]})
+    print(f"import app.main:          {import_ms:8.1f} ms (median of {args.runs})")
+    print(f"lifespan, schema created: {first['startup_ms']:8.1f} ms")
+    print(f"lifespan, schema current: {startup_ms:8.1f} ms (median of {args.runs})")
+    print(f"deferred modules imported eagerly: {', '.join(eager) or 'none'}")
+
+    failed = bool(eager)
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(f"FAIL: import time above budget of {args.max_import_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Compare two benchmark result files, e.g. from the base and head of a branch.
+
+Exits non-zero when --fail-on-regression is set and any result got worse
+by more than --threshold percent.
+
+Run with: python -m benchmarks.compare base.json head.json [--threshold 10] [--fail-on-regression]
+"""
+from typing import Dict, Tuple
+import argparse
+import json
+import sys
+
+def _key(record: Dict) -> Tuple[str, str, str]:
+    return record["benchmark"], json.dumps(record["params"], sort_keys=True), record["metric"]
+
+def load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+def compare(base: Dict, head: Dict, threshold: float):
+    """Yield (record, base_value, change_percent, regressed) for results present in both files."""
+    base_values = {_key(record): record["value"] for record in base["results"]}
+    for record in head["results"]:
+        old = base_values.get(_key(record))
+        if not old:
+            continue
+        change = (record["value"] - old) / old * 100
+        worse = -change if record["higher_is_better"] else change
+        yield record, old, change, worse > threshold
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change treated as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    print(f"base {base.get('commit') or '?'} -> head {head.get('commit') or '?'}")
+    regressions = 0
+    for record, old, change, regressed in compare(base, head, args.threshold):
+        regressions += regressed
+        label = " ".join(f"{key}={value}" for key, value in record["params"].items())
+        marker = "  REGRESSION" if regressed else ""
+        print(f"{record['benchmark']:>14} {label:<24} {record['metric']:>12}: "
+              f"{old:12.2f} -> {record['value']:12.2f} {record['unit']:<14} {change:+7.1f}%{marker}")
+    sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+if __name__ == "__main__":
+    main()
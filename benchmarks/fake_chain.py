@@ -0,0 +1,125 @@
+"""In-process JSON-RPC node for tests and benchmarks.
+
+Speaks enough of the Ethereum JSON-RPC API (single and batch requests) to
+serve the registry contract's read functions and Multicall3 `aggregate3`,
+with optional per-request latency to mimic a remote node.
+
+Run standalone with: python -m benchmarks.fake_chain [--port 8545] [--latency-ms 50]
+and point POLYGON_RPC_URL and CONTRACT_ADDRESS at it.
+"""
+from collections import Counter
+from typing import Optional, Set, Tuple
+import argparse
+import asyncio
+
+from aiohttp import web
+from eth_abi import decode, encode
+from eth_hash.auto import keccak
+
+from app.core.config import settings
+from app.blockchain.abi import AGGREGATE3, selector
+from app.blockchain.web3_client import HAS_ACCESS, IS_ANCHORED
+
+REGISTRY_ADDRESS = "0x00000000000000000000000000000000000a11ce"
+
+class Revert(Exception):
+    pass
+
+class FakeChain:
+    def __init__(self, chain_id: Optional[int] = None, latency: float = 0.0,
+                 registry_address: str = REGISTRY_ADDRESS, multicall_address: Optional[str] = None):
+        self.chain_id = chain_id or settings.POLYGON_CHAIN_ID
+        self.latency = latency
+        self.registry_address = registry_address.lower()
+        self.multicall_address = (multicall_address or settings.MULTICALL_ADDRESS).lower()
+        self.block_number = 1
+        self.anchored: Set[bytes] = set()
+        self.access: Set[Tuple[bytes, str]] = set()
+        self.http_requests = 0
+        self.calls: Counter = Counter()
+        self._runner = None
+        self.url = None
+
+    def anchor(self, content_hash: str) -> None:
+        self.anchored.add(bytes.fromhex(content_hash.removeprefix("0x")))
+
+    def grant(self, contract_id: str, requester: str) -> None:
+        self.access.add((keccak(contract_id.encode()), requester.lower()))
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_post("/", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{bound_port}/"
+        return self.url
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.http_requests += 1
+        body = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if isinstance(body, list):
+            return web.json_response([self._dispatch(item) for item in body])
+        return web.json_response(self._dispatch(body))
+
+    def _dispatch(self, request: dict) -> dict:
+        method = request.get("method")
+        self.calls[method] += 1
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            if method == "eth_chainId":
+                response["result"] = hex(self.chain_id)
+            elif method == "eth_blockNumber":
+                response["result"] = hex(self.block_number)
+            elif method == "eth_call":
+                tx = request["params"][0]
+                response["result"] = "0x" + self._call(tx["to"].lower(), bytes.fromhex(tx["data"][2:])).hex()
+            else:
+                response["error"] = {"code": -32601, "message": f"Method {method} not supported"}
+        except Revert:
+            response["error"] = {"code": 3, "message": "execution reverted"}
+        return response
+
+    def _call(self, to: str, data: bytes) -> bytes:
+        if to == self.multicall_address and data[:4] == selector(AGGREGATE3):
+            (calls,) = decode(["(address,bool,bytes)[]"], data[4:])
+            results = []
+            for target, allow_failure, call_data in calls:
+                try:
+                    results.append((True, self._call(target.lower(), call_data)))
+                except Revert:
+                    if not allow_failure:
+                        raise
+                    results.append((False, b""))
+            return encode(["(bool,bytes)[]"], [results])
+
+        if to == self.registry_address:
+            if data[:4] == selector(IS_ANCHORED):
+                (content_hash,) = decode(["bytes32"], data[4:])
+                return encode(["bool"], [content_hash in self.anchored])
+            if data[:4] == selector(HAS_ACCESS):
+                rule_id, requester = decode(["bytes32", "address"], data[4:])
+                return encode(["bool"], [(rule_id, requester.lower()) in self.access])
+        raise Revert()
+
+async def _serve(port: int, latency: float) -> None:
+    chain = FakeChain(latency=latency)
+    url = await chain.start(port=port)
+    print(f"Fake chain listening on {url} (registry {chain.registry_address})")
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the in-process fake chain as a standalone JSON-RPC node")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(_serve(args.port, args.latency_ms / 1000))
@@ -0,0 +1,129 @@
+"""Shared plumbing for the benchmark suite: an isolated app instance and result recording.
+
+Benchmarks drive the real ASGI app in-process against a throwaway SQLite
+database and upload directory, so they run offline and never touch the
+development database.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.rate_limit import rate_limiter
+from app.core.security import create_user_token
+from app.db.base import Base
+from app.db.session import get_db
+
+class BenchEnvironment:
+    """A TestClient wired to a private database and upload directory."""
+
+    def __init__(self, directory: str):
+        from fastapi.testclient import TestClient
+        from app.main import app
+
+        self.directory = directory
+        self.engine = create_engine(
+            f"sqlite:///{os.path.join(directory, 'bench.db')}",
+            connect_args={"check_same_thread": False}
+        )
+        Base.metadata.create_all(bind=self.engine)
+        self.session_factory = sessionmaker(bind=self.engine)
+        self.app = app
+        self.client = TestClient(app)
+
+    def get_db(self):
+        db = self.session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def auth_headers(self, user_id: int, email: Optional[str] = None) -> Dict[str, str]:
+        user = SimpleNamespace(id=user_id, email=email or f"user{user_id}@example.com", wallet_address=None)
+        return {"Authorization": f"Bearer {create_user_token(user)}"}
+
+@contextmanager
+def bench_environment():
+    """Point the app at a temporary database and upload dir, with rate limits off."""
+    saved = (settings.UPLOAD_DIR, rate_limiter.enabled)
+    with tempfile.TemporaryDirectory(prefix="bench-") as directory:
+        env = BenchEnvironment(directory)
+        settings.UPLOAD_DIR = os.path.join(directory, "uploads")
+        rate_limiter.enabled = False
+        env.app.dependency_overrides[get_db] = env.get_db
+        try:
+            yield env
+        finally:
+            env.app.dependency_overrides.pop(get_db, None)
+            settings.UPLOAD_DIR, rate_limiter.enabled = saved
+            env.engine.dispose()
+
+def timed(fn: Callable[[], object], repeat: int) -> List[float]:
+    """Run `fn` `repeat` times and return each duration in seconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class Results:
+    """Benchmark measurements, printed as they arrive and saved as JSON.
+
+    Each record is keyed by benchmark name plus parameters, so two result
+    files from different commits can be compared with benchmarks.compare.
+    """
+
+    def __init__(self):
+        self.records: List[Dict] = []
+
+    def add(self, benchmark: str, metric: str, value: float, unit: str, higher_is_better: bool = False, **params) -> None:
+        self.records.append({
+            "benchmark": benchmark,
+            "params": params,
+            "metric": metric,
+            "value": round(value, 4),
+            "unit": unit,
+            "higher_is_better": higher_is_better
+        })
+        label = " ".join(f"{key}={param}" for key, param in params.items())
+        print(f"{benchmark:>14} {label:<24} {metric:>12}: {value:12.2f} {unit}")
+
+    def add_latencies(self, benchmark: str, durations: List[float], **params) -> None:
+        self.add(benchmark, "median", statistics.median(durations) * 1000, "ms", **params)
+        self.add(benchmark, "p95", percentile(durations, 95) * 1000, "ms", **params)
+
+    def save(self, path: str) -> None:
+        document = {
+            "commit": git_commit(),
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": self.records
+        }
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2)
+        print(f"Wrote {len(self.records)} results to {path}")
@@ -0,0 +1,181 @@
+"""Bulk-load realistic synthetic users, assets, access rules and messages.
+
+Rows go in through Core executemany inserts in large chunks inside one
+transaction per chunk; a million assets load into SQLite in about a
+minute. Assets reference no files on disk; they are for list/query
+benchmarks, not downloads.
+
+Run with: python -m benchmarks.seed [--database-url sqlite:///bench.db] [--users 100] [--assets-per-user 1000]
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine, func, select
+
+from app.db.base import Base
+from app.db import models
+
+WORDS = (
+    "family photos wedding album letter grandma recipe book house deed will testament passport "
+    "insurance policy bank statement holiday video garden diary poem birthday certificate music "
+    "portrait notes school report tax return car title savings bond painting sketch journey"
+).split()
+ASSET_TYPES = (
+    ("image/jpeg", 0.45), ("application/pdf", 0.25), ("video/mp4", 0.1),
+    ("text/plain", 0.1), ("image/png", 0.1)
+)
+EXTENSIONS = {"image/jpeg": ".jpg", "application/pdf": ".pdf", "video/mp4": ".mp4", "text/plain": ".txt", "image/png": ".png"}
+START = datetime(2020, 1, 1)
+
+def _phrase(rng: random.Random, low: int, high: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+def _address(rng: random.Random) -> str:
+    return "0x" + "%040x" % rng.getrandbits(160)
+
+def _when(rng: random.Random) -> datetime:
+    return START + timedelta(seconds=rng.randint(0, 5 * 365 * 24 * 3600))
+
+def _chunks(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _insert(engine, table, rows: Iterator[Dict], chunk_size: int) -> int:
+    count = 0
+    for chunk in _chunks(rows, chunk_size):
+        with engine.begin() as conn:
+            conn.execute(table.insert(), chunk)
+        count += len(chunk)
+    return count
+
+def seed(engine, users: int = 100, assets_per_user: int = 100, rules_per_asset: float = 0.2,
+         messages_per_user: int = 5, password_hash: str = None, rng_seed: int = 0,
+         chunk_size: int = 20000) -> Dict:
+    """Append synthetic rows and return their counts and the new user ids.
+
+    `rules_per_asset` is fractional: 0.2 gives one access rule to a fifth of
+    the assets. Safe to call repeatedly on the same database.
+    """
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        first_user = (conn.execute(select(func.max(models.User.id))).scalar() or 0) + 1
+        first_asset = (conn.execute(select(func.max(models.DigitalAsset.id))).scalar() or 0) + 1
+    user_ids = list(range(first_user, first_user + users))
+    # Seeded per call so appending to a database doesn't repeat unique values
+    rng = random.Random(f"{rng_seed}:{first_user}")
+    types, weights = zip(*ASSET_TYPES)
+
+    def user_rows():
+        for user_id in user_ids:
+            joined = _when(rng)
+            yield {
+                "id": user_id,
+                "user_id": f"u{user_id:07d}",
+                "email": f"user{user_id}@example.com",
+                "username": f"user{user_id}",
+                "password_hash": password_hash,
+                "full_name": _phrase(rng, 2, 2).title(),
+                "bio": _phrase(rng, 5, 20),
+                "wallet_address": _address(rng) if rng.random() < 0.3 else None,
+                "is_active": True,
+                "created_at": joined,
+                "last_login": joined + timedelta(days=rng.randint(0, 400))
+            }
+
+    def asset_rows():
+        asset_id = first_asset
+        for user_id in user_ids:
+            for _ in range(assets_per_user):
+                content_type = rng.choices(types, weights)[0]
+                title = _phrase(rng, 2, 5)
+                created = _when(rng)
+                yield {
+                    "id": asset_id,
+                    "owner_id": user_id,
+                    "asset_type": content_type,
+                    "title": title,
+                    "description": _phrase(rng, 0, 25) or None,
+                    "file_path": f"uploads/seed/{asset_id}.enc",
+                    "blockchain_hash": "0x" + "%064x" % rng.getrandbits(256),
+                    "wrapped_key": "seed",
+                    "key_id": "seed",
+                    "created_at": created,
+                    "asset_metadata": {
+                        "original_name": title.replace(" ", "_") + EXTENSIONS[content_type],
+                        "content_type": content_type,
+                        "file_size": int(rng.lognormvariate(12, 1.5)),
+                        "upload_date": created.isoformat()
+                    }
+                }
+                asset_id += 1
+
+    def rule_rows():
+        total_assets = users * assets_per_user
+        for offset in range(total_assets):
+            if rng.random() < rules_per_asset:
+                yield {
+                    "owner_id": user_ids[offset // assets_per_user],
+                    "digital_asset_id": first_asset + offset,
+                    "beneficiary_address": _address(rng),
+                    "access_type": rng.choice(("view", "download", "manage")),
+                    "trigger_condition": rng.choice(("date", "event", "immediate")),
+                    "trigger_date": _when(rng) + timedelta(days=5 * 365),
+                    "is_active": True
+                }
+
+    def message_rows():
+        for user_id in user_ids:
+            for _ in range(messages_per_user):
+                yield {
+                    "owner_id": user_id,
+                    "recipient_address": _address(rng),
+                    "message_content": _phrase(rng, 20, 120),
+                    "delivery_date": _when(rng) + timedelta(days=5 * 365),
+                    "is_delivered": False,
+                    "wrapped_key": "seed",
+                    "key_id": "seed"
+                }
+
+    return {
+        "users": _insert(engine, models.User.__table__, user_rows(), chunk_size),
+        "assets": _insert(engine, models.DigitalAsset.__table__, asset_rows(), chunk_size),
+        "access_rules": _insert(engine, models.AccessRule.__table__, rule_rows(), chunk_size),
+        "messages": _insert(engine, models.ScheduledMessage.__table__, message_rows(), chunk_size),
+        "user_ids": user_ids
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", default="sqlite:///bench.db")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--assets-per-user", type=int, default=1000)
+    parser.add_argument("--rules-per-asset", type=float, default=0.2)
+    parser.add_argument("--messages-per-user", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = seed(
+        create_engine(args.database_url),
+        users=args.users,
+        assets_per_user=args.assets_per_user,
+        rules_per_asset=args.rules_per_asset,
+        messages_per_user=args.messages_per_user,
+        rng_seed=args.seed
+    )
+    elapsed = time.perf_counter() - start
+    rows = sum(value for key, value in counts.items() if key != "user_ids")
+    print(", ".join(f"{counts[key]} {key}" for key in ("users", "assets", "access_rules", "messages")))
+    print(f"{rows} rows in {elapsed:.1f} s ({rows / elapsed:,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""End-to-end benchmark suite: asset transfer, list_assets, logins/OTP and the profile read path.
+
+Runs offline against a temporary database (see benchmarks.harness). Save
+results with --output and compare two commits with benchmarks.compare.
+
+Run with: python -m benchmarks.suite [--quick] [--only transfer,list,auth,profile]
+          [--list-sizes 1000,100000,1000000] [--output results.json]
+"""
+from datetime import timedelta
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from app.core.config import settings
+from app.services.otp_store import DatabaseOTPStore, InMemoryOTPStore, OTP_VALID
+from app.services.password_hasher import PasswordHasher
+from benchmarks.harness import Results, bench_environment, timed
+from benchmarks.seed import seed
+
+PASSWORD = "correct horse battery staple"
+MB = 1024 * 1024
+
+def bench_transfer(env, results: Results, sizes, repeat: int) -> None:
+    """Upload and download MB/s through the full encrypt/decrypt path."""
+    user_id = seed(env.engine, users=1, assets_per_user=0, messages_per_user=0)["user_ids"][0]
+    headers = env.auth_headers(user_id)
+    for size in sizes:
+        # Uploads are type-sniffed, so the random body carries a PDF signature
+        payload = b"%PDF-1.7\n" + os.urandom(size - 9)
+        asset_ids = []
+
+        def upload():
+            response = env.client.post(
+                "/api/v1/assets/upload",
+                files={"file": ("bench.pdf", payload, "application/pdf")},
+                headers=headers
+            )
+            response.raise_for_status()
+            asset_ids.append(response.json()["asset_id"])
+
+        def download():
+            response = env.client.get(f"/api/v1/assets/{asset_ids[-1]}/download", headers=headers)
+            response.raise_for_status()
+            assert len(response.content) == size
+
+        for name, fn in (("upload", upload), ("download", download)):
+            median = statistics.median(timed(fn, repeat))
+            results.add(name, "throughput", size / MB / median, "MB/s", higher_is_better=True, size_kb=size // 1024)
+
+def bench_list_assets(env, results: Results, counts) -> None:
+    """list_assets latency for owners with growing asset counts."""
+    for count in counts:
+        start = time.perf_counter()
+        user_id = seed(env.engine, users=1, assets_per_user=count, rules_per_asset=0, messages_per_user=0)["user_ids"][0]
+        print(f"seeded {count} assets in {time.perf_counter() - start:.1f} s")
+        headers = env.auth_headers(user_id)
+
+        def list_assets():
+            response = env.client.get("/api/v1/assets/list", headers=headers)
+            response.raise_for_status()
+
+        results.add_latencies("list_assets", timed(list_assets, max(3, min(20, 200000 // count))), assets=count)
+
+def bench_auth(env, results: Results, logins: int, otps: int) -> None:
+    """bcrypt email logins (end to end and on the hasher pool) and OTP store round trips."""
+    hasher = PasswordHasher()
+    password_hash = hasher.context.hash(PASSWORD)
+    user_ids = seed(env.engine, users=logins, assets_per_user=0, messages_per_user=0, password_hash=password_hash)["user_ids"]
+
+    start = time.perf_counter()
+    for user_id in user_ids:
+        response = env.client.post("/api/v1/auth/email-login", json={"email": f"user{user_id}@example.com", "password": PASSWORD})
+        response.raise_for_status()
+    results.add("email_login", "throughput", logins / (time.perf_counter() - start), "logins/s",
+                higher_is_better=True, bcrypt_rounds=settings.BCRYPT_ROUNDS)
+
+    async def concurrent_verifies():
+        await asyncio.gather(*(hasher.verify_and_update(PASSWORD, password_hash) for _ in range(logins)))
+
+    start = time.perf_counter()
+    asyncio.run(concurrent_verifies())
+    results.add("bcrypt_pool", "throughput", logins / (time.perf_counter() - start), "verifies/s",
+                higher_is_better=True, workers=settings.PASSWORD_HASH_WORKERS)
+
+    ttl = timedelta(minutes=settings.OTP_TTL_MINUTES)
+    for name, store in (("memory", InMemoryOTPStore()), ("database", DatabaseOTPStore(env.session_factory))):
+        start = time.perf_counter()
+        for i in range(otps):
+            email = f"otp{i}@example.com"
+            store.put(email, "123456", ttl)
+            assert store.verify(email, "123456") == OTP_VALID
+        results.add("otp", "throughput", otps / (time.perf_counter() - start), "round trips/s",
+                    higher_is_better=True, backend=name)
+
+def bench_profile(env, results: Results, repeat: int) -> None:
+    """Authenticated profile reads: token check, one user lookup, JSON."""
+    user_id = seed(env.engine, users=1, assets_per_user=0, messages_per_user=0)["user_ids"][0]
+    headers = env.auth_headers(user_id)
+
+    def read_profile():
+        response = env.client.get(f"/api/v1/users/{user_id}/profile", headers=headers)
+        response.raise_for_status()
+
+    durations = timed(read_profile, repeat)
+    results.add_latencies("profile_read", durations)
+    results.add("profile_read", "throughput", len(durations) / sum(durations), "req/s", higher_is_better=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="small sizes, for a smoke run")
+    parser.add_argument("--only", default="transfer,list,auth,profile")
+    parser.add_argument("--list-sizes", default=None, help="asset counts per owner (default 1000,100000)")
+    parser.add_argument("--output", default=None, help="write machine-readable results to this JSON file")
+    args = parser.parse_args()
+
+    selected = set(args.only.split(","))
+    list_sizes = [int(n) for n in (args.list_sizes or ("1000" if args.quick else "1000,100000")).split(",")]
+    transfer_sizes = [64 * 1024, MB] if args.quick else [64 * 1024, MB, 8 * MB]
+    results = Results()
+
+    with bench_environment() as env:
+        if "transfer" in selected:
+            bench_transfer(env, results, transfer_sizes, repeat=3 if args.quick else 10)
+        if "list" in selected:
+            bench_list_assets(env, results, list_sizes)
+        if "auth" in selected:
+            bench_auth(env, results, logins=8 if args.quick else 40, otps=200 if args.quick else 2000)
+        if "profile" in selected:
+            bench_profile(env, results, repeat=100 if args.quick else 1000)
+
+    if args.output:
+        results.save(args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import os
+import pytest
+from cryptography.fernet import Fernet
+
+# Tests never read the developer's local key file
+os.environ.setdefault("MASTER_KEYS", f"test:{Fernet.generate_key().decode()}")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.config import settings
+from app.core.security import create_user_token
+from app.db.base import Base
+from app.db.session import get_db
+from app.db import models
+from app.main import app
+
+@pytest.fixture
+def engine():
+    """A fresh in-memory database with every table, shared by all sessions."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+@pytest.fixture
+def user(db):
+    user = models.User(email="owner@example.com")
+    db.add(user)
+    db.commit()
+    return user
+
+@pytest.fixture
+def anonymous_client(session_factory, tmp_path, monkeypatch):
+    """The app on the in-memory database, storing uploads under tmp_path."""
+    def override_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_db)
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    return TestClient(app)
+
+@pytest.fixture
+def client(anonymous_client, user):
+    """The same client, signed in as `user`."""
+    anonymous_client.headers["Authorization"] = f"Bearer {create_user_token(user)}"
+    return anonymous_client
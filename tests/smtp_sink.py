@@ -0,0 +1,58 @@
+import socketserver
+import threading
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept mail from smtplib without TLS or auth."""
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.sessions += 1
+        self.reply("220 sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 sink")
+            elif command.startswith("DATA"):
+                self.reply("354 end with .")
+                data = []
+                while True:
+                    chunk = self.rfile.readline()
+                    if chunk in (b".\r\n", b""):
+                        break
+                    data.append(chunk)
+                self.server.messages.append(b"".join(data).decode())
+                self.reply("250 queued")
+            elif command.startswith("QUIT"):
+                self.reply("221 bye")
+                return
+            else:
+                # MAIL, RCPT, NOOP and RSET all succeed
+                self.reply("250 ok")
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Local SMTP server that records every message it receives."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.messages = []
+        self.sessions = 0
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,90 @@
+import asyncio
+from app.db import models
+from app.blockchain.anchoring import ASSET, AnchorBatcher
+from app.blockchain.merkle import build_levels, merkle_proof, merkle_root, verify_proof
+from app.blockchain.web3_client import web3_client
+
+class LocalChain:
+    """Stand-in for the anchoring contract: records every root it is sent."""
+
+    def __init__(self):
+        self.roots = []
+
+    async def anchor(self, root: str, owner: str) -> str:
+        self.roots.append(root)
+        return f"0xtx{len(self.roots)}"
+
+def test_every_leaf_proves_against_root():
+    for size in (1, 2, 3, 7, 64, 1001):
+        hashes = [web3_client.hash_content(str(i)) for i in range(size)]
+        levels = build_levels(hashes)
+        root = merkle_root(levels)
+        for index in (0, size // 2, size - 1):
+            assert verify_proof(hashes[index], merkle_proof(levels, index), root)
+        assert not verify_proof(web3_client.hash_content("other"), merkle_proof(levels, 0), root)
+
+def test_one_anchor_covers_whole_batch(session_factory, db, user):
+    assets = [models.DigitalAsset(owner_id=user.id, blockchain_hash=web3_client.hash_content(f"asset{i}")) for i in range(3000)]
+    # Messages have no served create path, so they are never anchored
+    message = models.ScheduledMessage(owner_id=user.id, blockchain_hash=web3_client.hash_content("message"))
+    db.add_all(assets + [message])
+    db.commit()
+
+    chain = LocalChain()
+    batcher = AnchorBatcher(anchor=chain.anchor, session_factory=session_factory)
+    assert batcher.requeue_unanchored() == 3000
+    root = asyncio.run(batcher.flush())
+    assert chain.roots == [root]
+    assert len(batcher) == 0
+
+    db.expire_all()
+    batch = db.query(models.AnchorBatch).one()
+    assert batch.leaf_count == 3000 and batch.transaction_hash == "0xtx1"
+    for row in (assets[0], assets[1234], assets[-1]):
+        assert row.anchor_batch_id == batch.id
+        assert verify_proof(row.blockchain_hash, row.merkle_proof, batch.merkle_root)
+
+def test_failed_anchor_keeps_items_pending():
+    async def broken_chain(root, owner):
+        raise ConnectionError("rpc down")
+
+    batcher = AnchorBatcher(anchor=broken_chain)
+    batcher.submit(ASSET, 1, web3_client.hash_content("a"))
+    batcher.submit(ASSET, 2, web3_client.hash_content("b"))
+    assert asyncio.run(batcher.flush()) is None
+    assert len(batcher) == 2
+
+def add_unanchored(db, owner, count):
+    db.add_all([models.DigitalAsset(owner_id=owner.id, blockchain_hash=web3_client.hash_content(f"a{i}")) for i in range(count)])
+    db.commit()
+
+def test_only_the_lease_holder_recovers_abandoned_rows(session_factory, db, user):
+    add_unanchored(db, user, 25)
+    first = AnchorBatcher(anchor=LocalChain().anchor, session_factory=session_factory, max_size=10)
+    second = AnchorBatcher(anchor=LocalChain().anchor, session_factory=session_factory, max_size=10)
+    first.recovery_interval = second.recovery_interval = 0
+    assert first.recover() == 25
+    assert second.recover() == 0
+    # Requeueing again does not duplicate what is already pending
+    assert first.requeue_unanchored() == 0 and len(first) == 25
+
+def test_unrecorded_batch_keeps_its_transaction(session_factory, db, user):
+    add_unanchored(db, user, 3)
+    chain = LocalChain()
+    batcher = AnchorBatcher(anchor=chain.anchor, session_factory=session_factory)
+    batcher.requeue_unanchored()
+    record = batcher._record_batch
+
+    def broken_record(*args):
+        raise ConnectionError("db down")
+
+    batcher._record_batch = broken_record
+    root = asyncio.run(batcher.flush())
+    assert root and len(batcher) == 0 and batcher.requeue_unanchored() == 0
+
+    batcher._record_batch = record
+    assert asyncio.run(batcher.flush()) is None
+    assert chain.roots == [root]
+    batch = db.query(models.AnchorBatch).one()
+    assert batch.merkle_root == root and batch.transaction_hash == "0xtx1"
+    assert db.query(models.DigitalAsset).filter(models.DigitalAsset.anchor_batch_id.is_(None)).count() == 0
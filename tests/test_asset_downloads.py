@@ -0,0 +1,27 @@
+from app.db import models
+from app.services.encryption import encryption_service
+
+def test_downloads_revalidate_without_decrypting(client, db, monkeypatch):
+    asset_id = client.post(
+        "/api/v1/assets/upload", files={"file": ("will.txt", b"my last will", "text/plain")}
+    ).json()["asset_id"]
+    response = client.get(f"/api/v1/assets/{asset_id}/download")
+    assert response.content == b"my last will"
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+    assert etag.strip('"') == db.get(models.DigitalAsset, asset_id).ciphertext_digest
+    assert response.headers["cache-control"].startswith("private")
+
+    def no_decrypt(*args, **kwargs):
+        raise AssertionError("decrypted for a revalidation")
+
+    decrypt = encryption_service.decrypt_file
+    monkeypatch.setattr(encryption_service, "decrypt_file", no_decrypt)
+    assert client.get(f"/api/v1/assets/{asset_id}/download", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"/api/v1/assets/{asset_id}/download", headers={"If-Modified-Since": last_modified}).status_code == 304
+    # A stale tag wins over a matching date and gets the full body
+    monkeypatch.setattr(encryption_service, "decrypt_file", decrypt)
+    stale = client.get(
+        f"/api/v1/assets/{asset_id}/download",
+        headers={"If-None-Match": '"stale"', "If-Modified-Since": last_modified}
+    )
+    assert stale.status_code == 200 and stale.content == b"my last will"
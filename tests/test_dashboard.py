@@ -0,0 +1,40 @@
+import re
+
+from app.core.metrics import instrument_engine
+from app.db import models
+
+def query_count(response) -> int:
+    return int(re.search(r'desc="(\d+) queries"', response.headers["server-timing"]).group(1))
+
+def test_dashboard_uses_a_fixed_number_of_queries(client, engine, db, user):
+    instrument_engine(engine)
+    user.full_name = "Dash"
+    db.commit()
+
+    def add_assets(count):
+        for i in range(count):
+            asset = models.DigitalAsset(owner_id=user.id, title=f"asset {i}", file_size=100)
+            db.add(asset)
+            db.flush()
+            db.add_all([
+                models.AccessRule(owner_id=user.id, digital_asset_id=asset.id, is_active=True),
+                models.AccessRule(owner_id=user.id, digital_asset_id=asset.id, is_active=False)
+            ])
+        db.commit()
+
+    add_assets(1)
+    small = client.get(f"/api/v1/users/{user.id}/dashboard")
+    add_assets(30)
+    db.add(models.ScheduledMessage(owner_id=user.id, is_delivered=False))
+    db.commit()
+    large = client.get(f"/api/v1/users/{user.id}/dashboard?limit=10")
+
+    assert small.status_code == large.status_code == 200
+    assert query_count(small) == query_count(large) == 3
+    body = large.json()
+    assert body["profile"]["full_name"] == "Dash"
+    assert len(body["assets"]) == 10 and body["has_more_assets"]
+    assert body["assets"][0]["title"] == "asset 29"
+    assert (body["assets"][0]["access_rules"], body["assets"][0]["active_access_rules"]) == (2, 1)
+    assert body["storage"]["assets"] == 31 and body["storage"]["bytes_used"] == 3100
+    assert body["access_rules"] == 62 and body["messages"] == {"total": 1, "pending": 1}
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+from app.db import models
+from app.services.inactivity import InactivityService, REMINDER, ESCALATION
+
+def test_sweep_only_visits_due_users_and_escalates(db):
+    service = InactivityService()
+    service.max_reminders = 1
+    received = []
+    service.add_listener(received.extend)
+
+    now = datetime(2024, 1, 1)
+    for i in range(5):
+        user = models.User(email=f"user{i}@example.com")
+        service.record_checkin(user, now=now - timedelta(days=service.default_interval.days + 1 - i * 10))
+        db.add(user)
+    db.commit()
+
+    assert service.sweep(db, now=now) == {REMINDER: 1, ESCALATION: 0}
+    # Nothing new is due until the reminder grace period passes
+    assert service.sweep(db, now=now) == {REMINDER: 0, ESCALATION: 0}
+
+    later = now + service.reminder_grace + timedelta(seconds=1)
+    assert service.sweep(db, now=later) == {REMINDER: 0, ESCALATION: 1}
+    assert [event.kind for event in received] == [REMINDER, ESCALATION]
+
+def test_checkin_resets_deadline(db):
+    service = InactivityService()
+    user = models.User(email="alive@example.com", checkin_interval_days=30)
+    service.record_checkin(user, now=datetime(2024, 1, 1))
+    db.add(user)
+    db.commit()
+
+    service.sweep(db, now=datetime(2024, 3, 1))
+    db.refresh(user)
+    assert user.inactivity_stage == 1
+
+    service.record_checkin(user, now=datetime(2024, 3, 2))
+    db.commit()
+    assert user.inactivity_stage == 0
+    assert user.inactivity_deadline == datetime(2024, 4, 1)
+
+def test_backfill_covers_rows_without_a_stage(db):
+    service = InactivityService()
+    fresh = models.User(email="fresh@example.com", last_login=datetime(2024, 1, 1))
+    legacy = models.User(email="legacy@example.com", last_login=datetime(2024, 1, 1))
+    db.add_all([fresh, legacy])
+    db.commit()
+    # What a row from before the inactivity columns existed looks like
+    db.query(models.User).filter(models.User.id == legacy.id).update({"inactivity_stage": None})
+    db.commit()
+
+    assert service.backfill_deadlines(db) == 2
+    db.refresh(legacy)
+    assert legacy.inactivity_stage == 0
+    assert legacy.inactivity_deadline == datetime(2024, 1, 1) + service.checkin_interval(legacy)
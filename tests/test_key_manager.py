@@ -0,0 +1,62 @@
+import pytest
+from cryptography.fernet import Fernet
+from app.core.config import settings
+from app.db import models
+from app.services.encryption import EncryptionService
+from app.services.key_manager import KeyManager, load_master_keys
+
+def test_unwrapped_keys_are_cached():
+    manager = KeyManager(master_keys={"k1": Fernet.generate_key()})
+    data_key = Fernet.generate_key()
+    wrapped, key_id = manager.wrap(data_key)
+    assert key_id == "k1" and data_key.decode() not in wrapped
+
+    assert manager.unwrap(wrapped, key_id) == data_key
+    assert manager.unwrap(wrapped, key_id) == data_key
+    stats = manager.stats()
+    assert stats["unwrapped"] == 1 and stats["cache_hits"] == 1
+
+    # Scans can opt out so they don't evict hot keys
+    other, _ = manager.wrap(Fernet.generate_key())
+    manager.unwrap(other, key_id, cache=False)
+    assert manager.stats()["cached_keys"] == 1
+
+def test_rotation_rewraps_keys_without_touching_data(session_factory, db):
+
+    old_key, new_key = Fernet.generate_key(), Fernet.generate_key()
+    old = KeyManager(master_keys={"old": old_key})
+    data_keys = [Fernet.generate_key() for _ in range(5)]
+    for data_key in data_keys[:3]:
+        wrapped, key_id = old.wrap(data_key)
+        db.add(models.DigitalAsset(wrapped_key=wrapped, key_id=key_id))
+    db.add(models.DigitalAsset(encryption_key=data_keys[3].decode()))  # legacy plaintext key
+    wrapped, key_id = old.wrap(data_keys[4])
+    db.add(models.ScheduledMessage(wrapped_key=wrapped, key_id=key_id))
+    db.commit()
+
+    rotated = KeyManager(master_keys={"old": old_key, "new": new_key}, active_id="new")
+    assert rotated.rotate(session_factory, batch_size=2) == 5
+    assert rotated.rotate(session_factory) == 0
+
+    rows = db.query(models.DigitalAsset).order_by(models.DigitalAsset.id).all() + db.query(models.ScheduledMessage).all()
+    assert all(row.key_id == "new" and row.encryption_key is None for row in rows)
+    # Once rotated, the old master key is no longer needed
+    new_only = KeyManager(master_keys={"new": new_key})
+    assert [new_only.data_key_for(row) for row in rows] == data_keys
+
+def test_derived_keys_match_across_workers():
+    first, second = EncryptionService(), EncryptionService()
+    assert first.derive_key("passphrase") == second.derive_key("passphrase")
+    assert first.derive_key("passphrase", salt=b"s" * 16) != first.derive_key("passphrase")
+
+def test_master_keys_are_required_outside_debug(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "MASTER_KEYS", "")
+    monkeypatch.setattr(settings, "DEBUG", False)
+    with pytest.raises(RuntimeError, match="MASTER_KEYS"):
+        load_master_keys()
+
+    # Even in DEBUG a missing key file is an error, never a freshly generated key
+    missing = EncryptionService(key_path=str(tmp_path / "missing.key"))
+    with pytest.raises(RuntimeError, match="not found"):
+        missing.key
+    assert not (tmp_path / "missing.key").exists()
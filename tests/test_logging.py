@@ -0,0 +1,87 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from fastapi.testclient import TestClient
+from app.core.log_config import (
+    JsonFormatter, RateLimitFilter, SamplingFilter, build_queue_handler, request_id_var
+)
+from app.main import app
+
+def make_record(name="app.api.v1.assets", level=logging.INFO, lineno=10, msg="hello"):
+    return logging.LogRecord(name, level, "assets.py", lineno, msg, None, None)
+
+def test_queued_records_are_json_with_request_id():
+    log_queue = queue.SimpleQueue()
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output)
+    logger = logging.getLogger("test.queued")
+    logger.propagate = False
+    handler = build_queue_handler(log_queue)
+    logger.addHandler(handler)
+    listener.start()
+    token = request_id_var.set("req-1")
+    try:
+        logger.warning("stored %d bytes", 42, extra={"asset_id": 7})
+    finally:
+        request_id_var.reset(token)
+        listener.stop()
+        logger.removeHandler(handler)
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "stored 42 bytes"
+    assert entry["request_id"] == "req-1" and entry["asset_id"] == 7
+    assert entry["level"] == "WARNING" and entry["logger"] == "test.queued"
+
+def test_queued_exceptions_keep_their_traceback_field():
+    log_queue = queue.SimpleQueue()
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output)
+    logger = logging.getLogger("test.queued.errors")
+    logger.propagate = False
+    handler = build_queue_handler(log_queue)
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        try:
+            raise ValueError("bad chunk")
+        except ValueError:
+            logger.exception("upload %s failed", "a1")
+    finally:
+        listener.stop()
+        logger.removeHandler(handler)
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "upload a1 failed"
+    assert "Traceback" in entry["exc_info"] and "ValueError: bad chunk" in entry["exc_info"]
+
+def test_sampling_is_per_logger_and_spares_warnings():
+    sampler = SamplingFilter({"app.api.v1.assets": 0.0, "app.api": 1.0})
+    assert not sampler.filter(make_record())
+    assert not sampler.filter(make_record(name="app.api.v1.assets.child"))
+    assert sampler.filter(make_record(level=logging.WARNING))
+    assert sampler.filter(make_record(name="app.api.v1.auth"))
+
+def test_rate_limit_per_call_site_reports_suppressed():
+    limiter = RateLimitFilter(limit=2, period=0.05)
+    assert [limiter.filter(make_record()) for _ in range(5)] == [True, True, False, False, False]
+    assert limiter.filter(make_record(lineno=11))
+    assert limiter.filter(make_record(level=logging.ERROR))
+
+    time.sleep(0.06)
+    record = make_record()
+    assert limiter.filter(record)
+    assert record.getMessage() == "hello [3 similar messages suppressed]"
+
+def test_request_id_header():
+    client = TestClient(app)
+    generated = client.get("/api/v1/health").headers["X-Request-ID"]
+    assert len(generated) == 32
+    assert client.get("/api/v1/health", headers={"X-Request-ID": "edge-42"}).headers["X-Request-ID"] == "edge-42"
+    assert client.get("/api/v1/health", headers={"X-Request-ID": "bad id\n"}).headers["X-Request-ID"] != "bad id\n"
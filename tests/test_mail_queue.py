@@ -0,0 +1,52 @@
+import asyncio
+from app.services.mail_queue import OTP_TEMPLATE, MailQueue, SMTPConnectionPool
+from tests.smtp_sink import SMTPSink
+
+def test_messages_share_pooled_sessions():
+    with SMTPSink() as sink:
+        queue = MailQueue(SMTPConnectionPool(host="127.0.0.1", port=sink.port, size=1, use_tls=False), batch_size=50)
+
+        async def scenario():
+            for i in range(20):
+                assert queue.enqueue(OTP_TEMPLATE.render(f"user{i}@example.com", otp="123456", ttl_minutes=5))
+            await queue.stop()
+
+        asyncio.run(scenario())
+
+    assert len(sink.messages) == 20
+    assert "123456" in sink.messages[0]
+    # All twenty messages went over a single SMTP session
+    assert sink.sessions == 1
+    assert queue.stats()["sent"] == 20
+
+def test_unreachable_server_is_retried():
+    queue = MailQueue(SMTPConnectionPool(host="127.0.0.1", port=1, size=1, use_tls=False))
+    queue.retry_base_seconds = 0.01
+    queue.max_retries = 2
+
+    async def scenario():
+        queue.enqueue(OTP_TEMPLATE.render("user@example.com", otp="1", ttl_minutes=5))
+        await asyncio.sleep(0.3)
+
+    asyncio.run(scenario())
+    stats = queue.stats()
+    assert stats["retried"] == 2
+    assert stats["failed"] == 1
+
+def test_stop_delivers_messages_waiting_to_retry():
+    with SMTPSink() as sink:
+        queue = MailQueue(SMTPConnectionPool(host="127.0.0.1", port=1, size=1, use_tls=False))
+        queue.retry_base_seconds = 60
+
+        async def scenario():
+            queue.enqueue(OTP_TEMPLATE.render("user@example.com", otp="654321", ttl_minutes=5))
+            while not queue.stats()["retrying"]:
+                await asyncio.sleep(0.01)
+            # The server is back, but the backoff would outlive the process
+            queue.pool.port = sink.port
+            await asyncio.wait_for(queue.stop(), 5)
+
+        asyncio.run(scenario())
+
+    assert len(sink.messages) == 1 and "654321" in sink.messages[0]
+    assert queue.stats()["sent"] == 1 and queue.stats()["retrying"] == 0
@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.core.metrics import DB_QUERIES, MetricsRegistry, instrument_engine
+from app.main import app
+from app.services.health import check_database, check_storage
+
+def test_render_prometheus_text():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.inc(route='/a"b')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+    registry.register_stats("queue", lambda: {"depth": 3, "name": "ignored"})
+
+    text_format = registry.render()
+    assert 'requests_total{route="/a\\"b"} 1' in text_format
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text_format
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text_format
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text_format
+    assert "latency_seconds_count 3" in text_format
+    assert "queue_depth 3" in text_format and "queue_name" not in text_format
+
+def test_requests_are_labelled_by_route_template():
+    client = TestClient(app)
+    client.get("/api/v1/health")
+    client.get("/api/v1/assets/123/download")
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",route="/api/v1/health",status="200"}' in body
+    assert 'route="/api/v1/assets/{asset_id}/download",status="401"' in body
+    assert "/assets/123/" not in body
+
+def test_engine_queries_are_counted(engine):
+    instrument_engine(engine)
+    before = DB_QUERIES.value(operation="SELECT")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    assert DB_QUERIES.value(operation="SELECT") == before + 2
+
+def test_deep_health_checks(engine, tmp_path):
+    assert check_database(engine)["ok"]
+    storage = check_storage(str(tmp_path / "uploads"), min_free_bytes=0)
+    assert storage["ok"] and storage["free_bytes"] > 0
+    assert not check_storage(str(tmp_path), min_free_bytes=10 ** 18)["ok"]
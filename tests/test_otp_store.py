@@ -0,0 +1,46 @@
+from datetime import timedelta
+import time
+from app.services.otp_store import (
+    DatabaseOTPStore, InMemoryOTPStore,
+    OTP_EXPIRED, OTP_INVALID, OTP_LOCKED, OTP_MISSING, OTP_VALID
+)
+
+def check_store(store):
+    store.put("a@example.com", "123456", timedelta(minutes=5))
+    assert store.verify("a@example.com", "000000") == OTP_INVALID
+    assert store.verify("a@example.com", "123456") == OTP_VALID
+    # Codes are single use
+    assert store.verify("a@example.com", "123456") == OTP_MISSING
+
+    store.put("b@example.com", "654321", timedelta(minutes=5))
+    results = [store.verify("b@example.com", "000000") for _ in range(3)]
+    assert results == [OTP_INVALID, OTP_INVALID, OTP_LOCKED]
+    assert store.verify("b@example.com", "654321") == OTP_MISSING
+
+def test_in_memory_store():
+    check_store(InMemoryOTPStore(max_attempts=3))
+
+def test_database_store_is_shared_between_instances(session_factory):
+    check_store(DatabaseOTPStore(session_factory=session_factory, max_attempts=3))
+
+    worker_a = DatabaseOTPStore(session_factory=session_factory)
+    worker_b = DatabaseOTPStore(session_factory=session_factory)
+    worker_a.put("c@example.com", "111111", timedelta(minutes=5))
+    assert worker_b.verify("c@example.com", "111111") == OTP_VALID
+
+    worker_a.put("d@example.com", "222222", timedelta(seconds=-1))
+    assert worker_b.purge_expired() == 1
+
+def test_in_memory_store_expires_actively():
+    store = InMemoryOTPStore(max_entries=10)
+    for i in range(100):
+        store.put(f"user{i}@example.com", "123456", timedelta(minutes=5))
+    assert len(store) == 10
+
+    store = InMemoryOTPStore()
+    store.put("short@example.com", "123456", timedelta(milliseconds=1))
+    time.sleep(0.01)
+    assert store.purge_expired() == 1
+    assert store.verify("short@example.com", "123456") == OTP_MISSING
+    store.put("gone@example.com", "123456", timedelta(seconds=-1))
+    assert store.verify("gone@example.com", "123456") in (OTP_MISSING, OTP_EXPIRED)
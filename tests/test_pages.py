@@ -0,0 +1,35 @@
+import gzip
+from fastapi.testclient import TestClient
+from app.core.pages import PrecompressedAsset, static_assets
+from app.main import app
+
+client = TestClient(app)
+
+def test_pages_are_precompressed_and_revalidated():
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "no-cache"
+    etag = response.headers["etag"]
+
+    assert client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}).status_code == 304
+    # Each encoding has its own tag, so a cached gzip body is never revalidated as identity
+    plain = client.get("/", headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+    assert plain.status_code == 200 and "content-encoding" not in plain.headers
+
+def test_precompressed_variants_match_the_body():
+    asset = PrecompressedAsset(b"<p>legacy</p>" * 100, "text/html; charset=utf-8")
+    body, _ = asset.variants["identity"]
+    assert gzip.decompress(asset.variants["gzip"][0]) == body
+    assert "gzip" not in PrecompressedAsset(b"\x89PNG" * 1000, "image/png").variants
+
+def test_fingerprinted_static_files_are_immutable():
+    url = static_assets.url("favicon.svg")
+    assert url != "/static/favicon.svg" and url.endswith(".svg")
+    assert f'href="{url}"' in client.get("/app").text
+
+    fingerprinted = client.get(url)
+    assert fingerprinted.status_code == 200
+    assert "immutable" in fingerprinted.headers["cache-control"]
+    assert client.get("/static/favicon.svg").headers["cache-control"] == "no-cache"
+    assert client.get("/static/missing.css").status_code == 404
@@ -0,0 +1,28 @@
+import asyncio
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy
+
+def test_hash_verify_and_rehash_on_cost_change():
+    old = PasswordHasher(rounds=4, workers=1)
+    new = PasswordHasher(rounds=5, workers=1)
+
+    async def scenario():
+        hashed = await old.hash("s3cret")
+        assert await old.verify_and_update("s3cret", hashed) == (True, None)
+        assert (await old.verify_and_update("wrong", hashed))[0] is False
+        valid, upgraded = await new.verify_and_update("s3cret", hashed)
+        assert valid and upgraded.startswith("$2b$05$")
+        assert await new.verify_and_update("s3cret", None) == (False, None)
+
+    asyncio.run(scenario())
+    assert new.stats()["rehashed"] == 1
+    assert old.stats()["jobs"] == 3
+
+def test_rejects_when_queue_is_full():
+    hasher = PasswordHasher(rounds=4, workers=1, max_pending=1)
+
+    async def scenario():
+        results = await asyncio.gather(hasher.hash("a"), hasher.hash("b"), return_exceptions=True)
+        assert isinstance(results[1], PasswordHasherBusy)
+
+    asyncio.run(scenario())
+    assert hasher.stats()["rejected"] == 1
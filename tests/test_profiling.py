@@ -0,0 +1,62 @@
+import logging
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.metrics import instrument_engine, track_queries
+from app.core.profiling import ProfileStore, ProfilingMiddleware
+from app.db import models
+
+@pytest.fixture
+def tracked_db(engine, db):
+    instrument_engine(engine)
+    return db
+
+def test_lazy_loads_show_up_as_repeated_statements(tracked_db):
+    db = tracked_db
+    for i in range(5):
+        user = models.User(email=f"user{i}@example.com")
+        db.add(user)
+        db.flush()
+        db.add(models.DigitalAsset(owner_id=user.id, title=f"asset {i}"))
+    db.commit()
+    db.expire_all()
+
+    with track_queries() as stats:
+        owners = [asset.owner.email for asset in db.query(models.DigitalAsset).all()]
+    assert len(owners) == 5
+    assert stats.count == 6
+    (statement, count), = stats.repeated(5)
+    assert count == 5 and "FROM users" in statement
+
+def test_middleware_adds_server_timing_and_stores_profiles(tracked_db, tmp_path, monkeypatch, caplog):
+    db = tracked_db
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, store=ProfileStore(str(tmp_path)))
+
+    @app.get("/loop")
+    def loop():
+        for _ in range(3):
+            db.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "secret")
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 3)
+    client = TestClient(app)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.profiling"):
+        response = client.get("/loop")
+    assert 'desc="3 queries"' in response.headers["server-timing"]
+    assert "X-Profile-Id" not in response.headers
+    assert "Possible N+1 on GET /loop" in caplog.text
+
+    # A profile needs the admin token as well as the header
+    assert "X-Profile-Id" not in client.get("/loop", headers={"X-Profile": "1"}).headers
+    response = client.get("/loop", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+    profile_id = response.headers["X-Profile-Id"]
+    store = ProfileStore(str(tmp_path))
+    assert [profile["id"] for profile in store.list()] == [profile_id]
+    with open(store.path(profile_id)) as f:
+        assert "3 queries, " in f.read()
+    assert store.path("../etc/passwd") is None
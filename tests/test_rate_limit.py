@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.base import Base
+from app.core.rate_limit import (
+    DatabaseRateLimitBackend, InMemoryRateLimitBackend, RateLimit, RateLimiter
+)
+
+LIMIT = RateLimit(name="test", capacity=3, period=60)
+
+def test_bucket_allows_capacity_then_rejects_with_retry_after():
+    backend = InMemoryRateLimitBackend()
+    results = [backend.hit("k", LIMIT) for _ in range(4)]
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    assert results[-1][1] == pytest.approx(20, rel=0.01)
+
+def test_memory_backend_is_bounded():
+    backend = InMemoryRateLimitBackend(max_keys=100)
+    for i in range(1000):
+        backend.hit(f"ip-{i}", LIMIT)
+    assert len(backend) == 100
+
+def test_database_backend_is_shared(session_factory):
+    worker_a = DatabaseRateLimitBackend(session_factory=session_factory)
+    worker_b = DatabaseRateLimitBackend(session_factory=session_factory)
+    assert worker_a.hit("k", LIMIT)[0]
+    assert worker_b.hit("k", LIMIT)[0]
+    assert worker_a.hit("k", LIMIT)[0]
+    assert not worker_b.hit("k", LIMIT)[0]
+
+def test_database_backend_never_overspends_under_concurrency(tmp_path):
+    # A real file, so each thread gets its own connection and they contend for the row
+    engine = create_engine(f"sqlite:///{tmp_path / 'buckets.db'}", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    backend = DatabaseRateLimitBackend(session_factory=sessionmaker(bind=engine))
+    limit = RateLimit(name="burst", capacity=10, period=3600)
+    start = threading.Barrier(8)
+
+    def client(_):
+        start.wait()
+        return [backend.hit("shared", limit)[0] for _ in range(5)]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = [allowed for hits in pool.map(client, range(8)) for allowed in hits]
+    assert results.count(True) == 10
+
+def test_dependency_returns_429():
+    limiter = RateLimiter(InMemoryRateLimitBackend())
+    limiter.enabled = True
+    app = FastAPI()
+
+    @app.post("/expensive", dependencies=[Depends(limiter.per_ip(LIMIT))])
+    async def expensive():
+        return {"ok": True}
+
+    client = TestClient(app)
+    statuses = [client.post("/expensive").status_code for _ in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    assert client.post("/expensive").headers["Retry-After"] == "20"
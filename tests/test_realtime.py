@@ -0,0 +1,37 @@
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route
+from app.core.security import create_user_token
+from app.services.realtime import RealtimeHub
+
+POLLING = "/socket.io/?EIO=4&transport=polling"
+
+def open_session(client, auth=None):
+    sid = json.loads(client.get(POLLING).text[1:])["sid"]
+    client.post(f"{POLLING}&sid={sid}", content="40" + json.dumps(auth or {}))
+    return sid, client.get(f"{POLLING}&sid={sid}").text
+
+def test_events_reach_only_the_owners_sessions():
+    hub = RealtimeHub()
+
+    def publish(request):
+        # A sync endpoint runs in a worker thread, like the inactivity sweep
+        hub.publish(int(request.query_params["user"]), "asset.created", {"asset_id": 7})
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/publish", publish), Mount("/socket.io", app=hub)])
+    with TestClient(app) as client:
+        owner = SimpleNamespace(id=5, email="owner@example.com", wallet_address=None)
+        sid, reply = open_session(client, {"token": create_user_token(owner)})
+        assert reply.startswith("40")
+
+        client.get("/publish?user=6")
+        client.get("/publish?user=5")
+        assert client.get(f"{POLLING}&sid={sid}").text == '42["asset.created",{"asset_id":7}]'
+
+        _, reply = open_session(client)
+        assert reply.startswith("44")  # rejected without a token
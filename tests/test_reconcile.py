@@ -0,0 +1,48 @@
+import os
+import time
+
+from app.db import models
+from app.services.reconcile import Reconciler, walk_sorted
+
+def write(path, data=b"x", age=7200):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return str(path)
+
+def test_walk_matches_string_order(tmp_path):
+    for name in ("ab/cd/x.encrypted", "ab.old.encrypted", "ab-x", "ab0", ".upload-1"):
+        write(tmp_path / name)
+    paths = [entry.path for entry in walk_sorted(str(tmp_path))]
+    assert paths == sorted(paths) and len(paths) == 5
+
+def test_reconcile_reports_then_cleans_up(tmp_path, session_factory, db):
+
+    kept = [write(tmp_path / "ab/cd/kept.encrypted"), write(tmp_path / "ab.legacy.encrypted")]
+    missing = str(tmp_path / "ef/01/gone.encrypted")
+    db.add_all([models.DigitalAsset(file_path=path) for path in kept + [missing]])
+    db.add(models.DigitalAsset(file_path="/elsewhere/other.encrypted"))
+    db.commit()
+
+    orphan = write(tmp_path / "ab/cd/orphan.encrypted", b"cipher")
+    leftovers = [write(tmp_path / ".upload-abc"), write(tmp_path / "ab/cd/kept")]
+    in_flight = write(tmp_path / ".upload-new", age=0)
+
+    reconciler = Reconciler(session_factory, root=str(tmp_path), batch_size=2)
+    report = reconciler.run()
+    assert report["dry_run"] and report["matched"] == 2
+    assert (report["orphaned_ciphertext"], report["orphaned_plaintext"], report["recent_skipped"]) == (1, 2, 1)
+    assert report["missing"] == [missing]
+    assert all(os.path.exists(path) for path in kept + leftovers + [orphan, in_flight])
+
+    report = reconciler.run(apply=True)
+    assert (report["deleted"], report["quarantined"]) == (2, 1)
+    assert all(os.path.exists(path) for path in kept + [in_flight])
+    assert not any(os.path.exists(path) for path in leftovers + [orphan])
+    assert (tmp_path / ".quarantine/ab/cd/orphan.encrypted").read_bytes() == b"cipher"
+    statuses = dict(db.query(models.DigitalAsset.file_path, models.DigitalAsset.integrity_status).all())
+    assert statuses[missing] == "missing" and statuses[kept[0]] is None
+
+    report = reconciler.run(apply=True)
+    assert report["orphaned_ciphertext"] == report["orphaned_plaintext"] == 0
@@ -0,0 +1,113 @@
+import asyncio
+import pytest
+from benchmarks.fake_chain import REGISTRY_ADDRESS, FakeChain
+from app.blockchain.rpc_batch import BatchingRPCClient, RPCError
+from app.blockchain.web3_client import IS_ANCHORED, Web3Client
+
+def run_against_chain(scenario, latency=0.0, **batcher_options):
+    async def main():
+        chain = FakeChain(latency=latency)
+        client = Web3Client()
+        client.rpc_url = await chain.start()
+        client.contract_address = REGISTRY_ADDRESS
+        if batcher_options:
+            client.rpc_batcher = BatchingRPCClient(client._post_batch, **batcher_options)
+        try:
+            await scenario(chain, client)
+        finally:
+            await client.close()
+            await chain.stop()
+
+    asyncio.run(main())
+
+def test_concurrent_reads_share_one_multicall():
+    async def scenario(chain, client):
+        hashes = [client.hash_content(f"asset{i}") for i in range(100)]
+        for content_hash in hashes[::2]:
+            chain.anchor(content_hash)
+
+        results = await client.verify_hashes(hashes)
+        assert [results[h] for h in hashes] == [i % 2 == 0 for i in range(100)]
+        assert chain.http_requests == 1
+        assert chain.calls == {"eth_call": 1}
+
+    run_against_chain(scenario)
+
+def test_plain_batch_without_multicall():
+    async def scenario(chain, client):
+        chain.grant("contract_1_0xabc", "0x" + "11" * 20)
+        allowed, denied, block = await asyncio.gather(
+            client.verify_access("contract_1_0xabc", "0x" + "11" * 20),
+            client.verify_access("contract_1_0xabc", "0x" + "22" * 20),
+            client.rpc("eth_blockNumber", [])
+        )
+        assert (allowed, denied, block) == (True, False, "0x1")
+        assert chain.http_requests == 1
+        assert chain.calls == {"eth_call": 2, "eth_blockNumber": 1}
+
+    run_against_chain(scenario, multicall_address="")
+
+def test_duplicate_calls_are_deduplicated_and_cached():
+    async def scenario(chain, client):
+        results = await asyncio.gather(*(client.rpc("eth_chainId", []) for _ in range(20)))
+        assert set(results) == {hex(chain.chain_id)}
+        assert await client.rpc("eth_chainId", []) == hex(chain.chain_id)
+        assert chain.calls == {"eth_chainId": 1}
+        stats = client.rpc_batcher.stats()
+        assert stats["deduplicated"] == 19 and stats["cache_hits"] == 1
+
+    run_against_chain(scenario)
+
+def test_revert_fails_only_its_own_call():
+    async def scenario(chain, client):
+        good = client.call_contract(IS_ANCHORED, [b"\x00" * 32], ["bool"])
+        bad = client.call_contract("missing(uint256)", [1], ["bool"])
+        results = await asyncio.gather(good, bad, return_exceptions=True)
+        assert results[0] == (False,)
+        assert isinstance(results[1], RPCError) and results[1].code == 3
+        assert chain.http_requests == 1
+
+    run_against_chain(scenario)
+
+def test_transport_failure_reaches_every_caller():
+    async def down(payload):
+        raise ConnectionError("node unreachable")
+
+    async def scenario():
+        batcher = BatchingRPCClient(down, cache_ttl=0)
+        results = await asyncio.gather(batcher.call("eth_blockNumber"), batcher.call("eth_chainId"), return_exceptions=True)
+        assert all(isinstance(r, ConnectionError) for r in results)
+        with pytest.raises(ConnectionError):
+            await batcher.call("eth_blockNumber")
+
+    asyncio.run(scenario())
+
+def test_multicall_without_contract_falls_back_to_plain_calls():
+    multicall, sent = "0x" + "ca" * 20, []
+
+    async def node(payload):
+        sent.append(payload)
+        # No code at the multicall address: eth_call returns empty data
+        return [{"jsonrpc": "2.0", "id": r["id"], "result": "0x" if r["params"][0]["to"] == multicall else "0x01"} for r in payload]
+
+    async def scenario():
+        batcher = BatchingRPCClient(node, cache_ttl=0, multicall_address=multicall)
+        calls = [batcher.call("eth_call", [{"to": "0x" + f"{i:02x}" * 20, "data": "0x"}, "latest"]) for i in range(3)]
+        assert await asyncio.gather(*calls) == ["0x01"] * 3
+        assert len(sent) == 2 and len(sent[1]) == 3
+
+    asyncio.run(scenario())
+
+def test_malformed_batch_response_fails_every_caller():
+    async def node(payload):
+        return {"jsonrpc": "2.0", "error": {"code": -32600, "message": "batch not supported"}}
+
+    async def scenario():
+        batcher = BatchingRPCClient(node, cache_ttl=0)
+        results = await asyncio.wait_for(
+            asyncio.gather(batcher.call("eth_blockNumber"), batcher.call("eth_chainId"), return_exceptions=True), 5
+        )
+        assert all(isinstance(r, RPCError) for r in results)
+        assert batcher._inflight == {}
+
+    asyncio.run(scenario())
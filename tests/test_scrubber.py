@@ -0,0 +1,73 @@
+import os
+from app.db import models
+from app.services.encryption import CHUNK_SIZE, encryption_service
+from app.services.scrubber import CORRUPT, MISSING, OK, IntegrityScrubber
+
+def make_asset(db, owner_id, path, size, record_digest=True):
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    encrypted_path, key, digest = encryption_service.encrypt_file(path)
+    os.remove(path)
+    asset = models.DigitalAsset(
+        owner_id=owner_id,
+        file_path=encrypted_path,
+        encryption_key=key.decode(),
+        ciphertext_digest=digest if record_digest else None
+    )
+    db.add(asset)
+    db.commit()
+    return asset
+
+def test_scrub_detects_corruption_and_resumes(tmp_path, session_factory, db, user):
+
+    healthy = make_asset(db, user.id, str(tmp_path / "healthy.bin"), CHUNK_SIZE * 2 + 10)
+    flipped = make_asset(db, user.id, str(tmp_path / "flipped.bin"), 1000)
+    missing = make_asset(db, user.id, str(tmp_path / "missing.bin"), 1000)
+    legacy = make_asset(db, user.id, str(tmp_path / "legacy.bin"), 1000, record_digest=False)
+
+    with open(flipped.file_path, "r+b") as f:
+        f.seek(100)
+        byte = f.read(1)
+        f.seek(100)
+        f.write(b"A" if byte != b"A" else b"B")
+    os.remove(missing.file_path)
+
+    scrubber = IntegrityScrubber(session_factory=session_factory, max_bytes_per_second=10 ** 9, batch_size=2)
+    # One batch, then the checkpoint lets the next call pick up where it stopped
+    assert scrubber.run_batch() == 2
+    assert db.query(models.ScrubCheckpoint).one().last_asset_id == flipped.id
+    assert scrubber.run_pass() == 2
+
+    db.expire_all()
+    assert healthy.integrity_status == OK
+    assert flipped.integrity_status == CORRUPT
+    assert missing.integrity_status == MISSING
+    assert legacy.integrity_status == OK and legacy.ciphertext_digest is not None
+
+    checkpoint = db.query(models.ScrubCheckpoint).one()
+    assert checkpoint.last_asset_id == 0 and checkpoint.last_pass_completed_at is not None
+    stats = scrubber.stats()
+    assert stats["files_checked"] == 4 and stats["corrupt"] == 1 and stats["missing"] == 1
+    assert stats["digests_recorded"] == 1 and stats["passes_completed"] == 1
+
+def test_decrypt_round_trips_multi_chunk_files(tmp_path):
+    path = tmp_path / "large.bin"
+    payload = os.urandom(CHUNK_SIZE * 3 + 123)
+    path.write_bytes(payload)
+    encrypted_path, key, _ = encryption_service.encrypt_file(str(path))
+    os.remove(path)
+    assert open(encryption_service.decrypt_file(encrypted_path, key), "rb").read() == payload
+
+def test_only_one_process_scrubs_and_only_when_due(tmp_path, session_factory, db, user):
+    make_asset(db, user.id, str(tmp_path / "one.bin"), 1000)
+
+    busy = IntegrityScrubber(session_factory=session_factory, max_bytes_per_second=10 ** 9)
+    idle = IntegrityScrubber(session_factory=session_factory, max_bytes_per_second=10 ** 9)
+    assert busy.lease.acquire()
+    assert idle.run_due() is None
+    busy.lease.release()
+
+    assert idle.run_due() == 1
+    # The pass just finished, so nobody starts another before SCRUB_INTERVAL_SECONDS
+    assert busy.run_due() is None and idle.run_due() is None
+    assert busy.stats()["files_checked"] == 0
@@ -0,0 +1,55 @@
+from datetime import timedelta
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from app.core.security import CurrentUser, InvalidToken, TokenVerifier, get_current_user
+
+def test_key_rotation_and_cache():
+    old = TokenVerifier(keys={"k1": "first-secret"}, cache_size=2)
+    token = old.create_token({"sub": "7", "email": "a@example.com"})
+
+    # A verifier that signs with the new key still accepts tokens from the old one
+    rotated = TokenVerifier(keys={"k1": "first-secret", "k2": "second-secret"}, active_kid="k2", cache_size=2)
+    assert rotated.verify(token) == CurrentUser(id=7, email="a@example.com")
+    assert rotated.verify(rotated.create_token({"sub": "8"})).id == 8
+
+    # Once the old key is retired its tokens are rejected
+    retired = TokenVerifier(keys={"k2": "second-secret"})
+    with pytest.raises(InvalidToken):
+        retired.verify(token)
+
+    for i in range(5):
+        rotated.verify(rotated.create_token({"sub": str(i)}))
+    assert len(rotated._cache) == 2
+
+def test_expired_token_is_rejected():
+    verifier = TokenVerifier(keys={"k1": "secret"})
+    token = verifier.create_token({"sub": "1"}, expires_delta=timedelta(seconds=-1))
+    with pytest.raises(InvalidToken):
+        verifier.verify(token)
+
+def test_token_without_expiry_is_rejected():
+    from jose import jwt
+
+    verifier = TokenVerifier(keys={"k1": "secret"})
+    token = jwt.encode({"sub": "1"}, "secret", algorithm=verifier.algorithm, headers={"kid": "k1"})
+    with pytest.raises(InvalidToken):
+        verifier.verify(token)
+    assert verifier._cache == {}
+
+def test_dependency_reads_header_or_cookie():
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(user: CurrentUser = Depends(get_current_user)):
+        return {"id": user.id}
+
+    from app.core.security import create_access_token
+    token = create_access_token({"sub": "42"})
+    client = TestClient(app)
+    assert client.get("/me").status_code == 401
+    assert client.get("/me", headers={"Authorization": f"Bearer {token}"}).json() == {"id": 42}
+    client.cookies.set("access_token", token)
+    assert client.get("/me").json() == {"id": 42}
+    client.cookies.set("access_token", "garbage")
+    assert client.get("/me").status_code == 401
@@ -0,0 +1,74 @@
+import pytest
+from eth_account import Account
+from eth_account.messages import encode_defunct
+from app.blockchain.signatures import SignatureVerifier, WalletChallengeService, coincurve
+
+def sign(account, message):
+    return account.sign_message(encode_defunct(text=message)).signature.hex()
+
+@pytest.mark.parametrize("backend", ["python", pytest.param("coincurve", marks=pytest.mark.skipif(coincurve is None, reason="coincurve not installed"))])
+def test_recovers_signer(backend):
+    account = Account.create()
+    verifier = SignatureVerifier(backend=backend, cache_size=1)
+    signature = sign(account, "hello")
+    assert verifier.recover("hello", signature) == account.address.lower()
+    assert verifier.verify("hello", signature, account.address)
+    assert not verifier.verify("tampered", signature, account.address)
+    assert not verifier.verify("hello", "0x1234", account.address)
+    assert len(verifier._cache) == 1
+
+def test_challenge_can_only_be_used_once():
+    account = Account.create()
+    challenges = WalletChallengeService(SignatureVerifier(backend="python"))
+    nonce, message = challenges.issue(account.address)
+    signature = sign(account, message)
+
+    other = Account.create()
+    assert not challenges.verify(account.address, nonce, sign(other, message))
+    assert challenges.verify(account.address, nonce, signature)
+    # Replaying the same signed challenge is rejected
+    assert not challenges.verify(account.address, nonce, signature)
+
+def connect_wallet(client, account, **fields):
+    challenge = client.get("/api/v1/auth/wallet-challenge", params={"wallet_address": account.address}).json()
+    return client.post("/api/v1/auth/connect-wallet", json={
+        "wallet_address": account.address,
+        "nonce": challenge["nonce"],
+        "signature": sign(account, challenge["message"]),
+        **fields
+    })
+
+def test_wallet_login_is_served_by_the_auth_router(anonymous_client):
+    client = anonymous_client
+    account = Account.create()
+
+    def login(**fields):
+        return connect_wallet(client, account, **fields)
+
+    created = login(username="satoshi")
+    assert created.status_code == 200 and created.json()["user"]["username"] == "satoshi"
+    again = login()
+    assert again.json()["message"] == "Login successful" and again.json()["user"]["username"] == "satoshi"
+    assert client.post("/api/v1/auth/connect-wallet", json={
+        "wallet_address": account.address, "nonce": "0" * 32, "signature": "0x1234"
+    }).status_code == 401
+
+def test_wallet_links_only_to_the_signed_in_account(client, db, user):
+    from fastapi.testclient import TestClient
+    from app.core.security import create_user_token
+    from app.db import models
+
+    # A stranger's own wallet and signature say nothing about whose email they send
+    assert connect_wallet(TestClient(client.app), Account.create(), email=user.email).status_code == 401
+    other = models.User(email="intruder@example.com")
+    db.add(other)
+    db.commit()
+    client.headers["Authorization"] = f"Bearer {create_user_token(other)}"
+    assert connect_wallet(client, Account.create(), email=user.email).status_code == 403
+    db.refresh(user)
+    assert user.wallet_address is None
+
+    client.headers["Authorization"] = f"Bearer {create_user_token(user)}"
+    account = Account.create()
+    linked = connect_wallet(client, account, email=user.email)
+    assert linked.status_code == 200 and linked.json()["user"]["wallet_address"] == account.address
@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, inspect
+from sqlalchemy.pool import StaticPool
+from app import DEFERRED_MODULES
+from app.db.base import Base
+from app.db.schema import SchemaOutOfDate, applied_fingerprint, ensure_schema, metadata_fingerprint
+
+def test_importing_app_has_no_side_effects(tmp_path):
+    database = tmp_path / "import.db"
+    code = (
+        "import json, sys, app.main; "
+        f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))"
+    )
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}"}
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+    assert not database.exists()
+
+@pytest.fixture
+def bare_engine():
+    """Unlike the shared `engine` fixture, no tables: these tests create the schema themselves."""
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+def test_schema_is_applied_once_per_fingerprint(bare_engine):
+    engine = bare_engine
+    assert applied_fingerprint(engine) is None
+    assert ensure_schema(engine) is True
+    assert applied_fingerprint(engine) == metadata_fingerprint()
+    assert "users" in inspect(engine).get_table_names()
+    # Later workers find the fingerprint and skip the DDL
+    assert ensure_schema(engine) is False
+
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    Table("extra", metadata, Column("id", Integer, primary_key=True))
+    assert metadata_fingerprint(metadata) != metadata_fingerprint()
+    assert ensure_schema(engine, metadata) is True
+    assert "extra" in inspect(engine).get_table_names()
+
+def test_schema_update_adds_columns_to_existing_tables(bare_engine):
+    engine = bare_engine
+    old = MetaData()
+    Table("things", old, Column("id", Integer, primary_key=True))
+    old.create_all(engine)
+
+    metadata = MetaData()
+    Table("things", metadata, Column("id", Integer, primary_key=True),
+          Column("label", String(20), index=True), Column("stage", Integer, nullable=False, server_default="0"))
+    assert ensure_schema(engine, metadata) is True
+    assert {c["name"] for c in inspect(engine).get_columns("things")} == {"id", "label", "stage"}
+    assert [i["name"] for i in inspect(engine).get_indexes("things")] == ["ix_things_label"]
+    assert applied_fingerprint(engine) == metadata_fingerprint(metadata)
+
+def test_schema_is_not_recorded_while_columns_are_missing(bare_engine):
+    engine = bare_engine
+    old = MetaData()
+    Table("things", old, Column("id", Integer, primary_key=True))
+    old.create_all(engine)
+
+    metadata = MetaData()
+    Table("things", metadata, Column("id", Integer, primary_key=True), Column("required", Integer, nullable=False))
+    with pytest.raises(SchemaOutOfDate, match="things.required"):
+        ensure_schema(engine, metadata)
+    assert applied_fingerprint(engine) is None
@@ -0,0 +1,55 @@
+import os
+
+from app.db import models
+from app.services.storage import ObjectStore
+
+def test_objects_are_sharded_and_renamed_into_place(tmp_path):
+    store = ObjectStore(str(tmp_path))
+    paths = set()
+    for _ in range(3):
+        source = tmp_path / ".upload-x.encrypted"
+        source.write_bytes(b"ciphertext")
+        path = store.put(str(source))
+        assert not source.exists() and open(path, "rb").read() == b"ciphertext"
+        assert store.is_sharded(path)
+        assert os.path.relpath(path, tmp_path).count(os.sep) == 2
+        paths.add(path)
+    # Same source name every time, still three distinct objects
+    assert len(paths) == 3
+
+def test_migration_moves_flat_files_in_batches(tmp_path, session_factory, db):
+    store = ObjectStore(str(tmp_path))
+
+    flat = []
+    for i in range(5):
+        path = tmp_path / f"20240101_000000_file{i}.txt.encrypted"
+        path.write_bytes(f"data {i}".encode())
+        flat.append(str(path))
+    db.add_all([models.DigitalAsset(file_path=path) for path in flat])
+    db.add(models.DigitalAsset(file_path=str(tmp_path / "gone.encrypted")))
+    db.commit()
+
+    assert store.migrate(session_factory, batch_size=2) == 5
+    assert store.migrate(session_factory) == 0
+
+    db.expire_all()
+    assets = db.query(models.DigitalAsset).order_by(models.DigitalAsset.id).all()
+    for i, asset in enumerate(assets[:5]):
+        assert store.is_sharded(asset.file_path)
+        assert open(asset.file_path, "rb").read() == f"data {i}".encode()
+        assert not os.path.exists(flat[i])
+    # A row whose file is missing is left for the scrubber to report
+    assert assets[5].file_path == str(tmp_path / "gone.encrypted")
+
+def test_sizes_are_backfilled_for_legacy_assets(tmp_path, session_factory, db):
+    stored = tmp_path / "old.encrypted"
+    stored.write_bytes(b"x" * 120)
+    recorded = models.DigitalAsset(title="recorded", asset_metadata={"file_size": 100}, file_path=str(stored))
+    unrecorded = models.DigitalAsset(title="unrecorded", asset_metadata={}, file_path=str(stored))
+    lost = models.DigitalAsset(title="lost", file_path=str(tmp_path / "gone.encrypted"))
+    db.add_all([recorded, unrecorded, lost])
+    db.commit()
+
+    assert ObjectStore(str(tmp_path)).backfill_sizes(session_factory, batch_size=2) == 2
+    db.expire_all()
+    assert (recorded.file_size, unrecorded.file_size, lost.file_size) == (100, 120, None)
@@ -0,0 +1,103 @@
+import os
+
+from app.core.config import settings
+from app.db import models
+from app.api.v1 import assets
+from app.services.ingest import ingest_queue
+
+def upload(client, name, data, content_type, **fields):
+    return client.post("/api/v1/assets/upload", files={"file": (name, data, content_type)}, data=fields)
+
+def test_upload_stores_sniffed_type(client):
+    response = upload(client, "report", b"%PDF-1.7\n" + b"x" * 20000, "application/octet-stream")
+    assert response.status_code == 200
+    assert response.json()["content_type"] == "application/pdf"
+    assert response.json()["original_filename"] == "report.pdf"
+    assert response.json()["file_size"] == 20009
+
+def test_oversized_upload_is_rejected_without_leftovers(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 16 * 1024)
+    response = upload(client, "big.txt", b"a" * (64 * 1024), "text/plain")
+    assert response.status_code == 413
+    assert os.listdir(tmp_path) == []
+
+def test_disallowed_type_is_rejected_despite_declared_type(client, tmp_path):
+    response = upload(client, "notes.txt", b"\x7fELF\x02\x01\x01" + bytes(200), "text/plain")
+    assert response.status_code == 415
+    assert os.listdir(tmp_path) == []
+
+def test_quota_limits_uploads(client, monkeypatch):
+    monkeypatch.setattr(settings, "USER_STORAGE_QUOTA_BYTES", 1000)
+    assert upload(client, "a.txt", b"a" * 600, "text/plain").status_code == 200
+    assert upload(client, "b.txt", b"b" * 600, "text/plain").status_code == 413
+    assert upload(client, "c.txt", b"c" * 400, "text/plain").status_code == 200
+    assert upload(client, "d.txt", b"d", "text/plain").status_code == 413
+
+def test_quota_is_rechecked_when_the_asset_is_saved(client, db, tmp_path, monkeypatch):
+    # As if another upload had finished while this one was streaming
+    monkeypatch.setattr(settings, "USER_STORAGE_QUOTA_BYTES", 1000)
+    monkeypatch.setattr(assets, "upload_limit", lambda db, user_id: settings.MAX_UPLOAD_SIZE)
+    assert upload(client, "a.txt", b"a" * 600, "text/plain").status_code == 200
+    assert upload(client, "b.txt", b"b" * 600, "text/plain").status_code == 413
+    assert db.query(models.DigitalAsset).count() == 1
+    assert len([name for _, _, names in os.walk(tmp_path) for name in names]) == 1
+
+def test_form_user_id_must_match_token(client, user):
+    assert upload(client, "a.txt", b"hello", "text/plain", user_id=str(user.id)).status_code == 200
+    assert upload(client, "a.txt", b"hello", "text/plain", user_id=str(user.id + 1)).status_code == 403
+    assert upload(client, "a.txt", b"hello", "text/plain", user_id="abc").status_code == 400
+
+def test_uploads_are_stored_under_opaque_ids(client, tmp_path):
+    first = upload(client, "same.txt", b"first", "text/plain").json()["asset_id"]
+    second = upload(client, "same.txt", b"second", "text/plain").json()["asset_id"]
+    stored = [name for _, _, names in os.walk(tmp_path) for name in names]
+    assert len(stored) == 2 and not any("same" in name for name in stored)
+    assert client.get(f"/api/v1/assets/{first}/download").content == b"first"
+    assert client.get(f"/api/v1/assets/{second}/download").content == b"second"
+
+def test_async_ingest_acknowledges_then_processes(client, session_factory, tmp_path, monkeypatch):
+    queued = []
+    monkeypatch.setattr(ingest_queue, "session_factory", session_factory)
+    monkeypatch.setattr(ingest_queue, "enqueue", queued.append)
+    response = client.post(
+        "/api/v1/assets/upload",
+        files={"file": ("later.txt", b"process me later", "text/plain")},
+        headers={"Prefer": "respond-async"}
+    )
+    assert response.status_code == 202
+    asset_id = response.json()["asset_id"]
+    assert queued == [asset_id] and response.headers["location"] == f"/api/v1/assets/{asset_id}/status"
+    assert client.get(f"/api/v1/assets/{asset_id}/status").json()["status"] == "processing"
+    assert client.get(f"/api/v1/assets/{asset_id}/download").status_code == 409
+
+    assert ingest_queue.process(asset_id)
+    assert client.get(f"/api/v1/assets/{asset_id}/status?wait=5").json()["status"] == "ready"
+    assert client.get(f"/api/v1/assets/{asset_id}/download").content == b"process me later"
+    # Only the stored ciphertext is left; the spooled plaintext is gone
+    stored = [name for _, _, names in os.walk(tmp_path) for name in names]
+    assert len(stored) == 1 and stored[0].endswith(".encrypted")
+
+def test_ingest_claims_keep_workers_from_overwriting_each_other(client, db, session_factory, monkeypatch):
+    monkeypatch.setattr(ingest_queue, "session_factory", session_factory)
+    monkeypatch.setattr(ingest_queue, "enqueue", lambda asset_id: None)
+    asset_id = client.post(
+        "/api/v1/assets/upload",
+        files={"file": ("race.txt", b"only once", "text/plain")},
+        headers={"Prefer": "respond-async"}
+    ).json()["asset_id"]
+
+    first = ingest_queue.claim(db, asset_id)
+    assert first and ingest_queue.claim(db, asset_id) is None
+    # The first worker stalls past the timeout and another takes over and finishes
+    monkeypatch.setattr(settings, "INGEST_CLAIM_TIMEOUT_SECONDS", -1)
+    assert ingest_queue.requeue_processing() == 1
+    assert ingest_queue.process(asset_id)
+    stored = db.get(models.DigitalAsset, asset_id)
+    db.refresh(stored)
+    assert stored.ingest_status is None and stored.ingest_claim is None
+
+    # The stale worker's late result is refused
+    assert not ingest_queue._finish(db, asset_id, first, ingest_status="failed", file_path=None)
+    db.refresh(stored)
+    assert stored.ingest_status is None and stored.file_path
+    assert client.get(f"/api/v1/assets/{asset_id}/download").content == b"only once"
@@ -0,0 +1,25 @@
+import asyncio
+import subprocess
+import sys
+from app.blockchain.web3_client import Web3Client
+
+def test_importing_client_does_not_import_web3():
+    code = "import sys, app.blockchain.web3_client; print('web3' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
+
+def test_hash_content_matches_web3_keccak():
+    from web3 import Web3
+    assert Web3Client().hash_content("hello") == Web3.keccak(text="hello").hex()
+
+def test_async_provider_is_created_once_and_closed():
+    client = Web3Client()
+
+    async def scenario():
+        first, second = await asyncio.gather(client.get_async_w3(), client.get_async_w3())
+        assert first is second
+        session = client._session
+        await client.close()
+        assert session.closed
+
+    asyncio.run(scenario())